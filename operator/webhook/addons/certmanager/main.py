@@ -1,8 +1,25 @@
 import logging
-from typing import Mapping, List, Any
+from typing import Any, Hashable, List, Mapping, Optional
+
+from webhook import metrics
+from webhook.decoding import ANY, OBJECT_METADATA_SHAPE
 
 _LOGGER = logging.getLogger(__name__)
 
+# The parts of a sync request read by sync_certificate(), see webhook.decoding
+REQUEST_SHAPE = {"object": {"metadata": OBJECT_METADATA_SHAPE, "spec": ANY}}
+
+
+def coalescing_key(body: Mapping) -> Optional[Hashable]:
+    """Identifies concurrent sync requests for the same object state, see webhook.coalescing."""
+    try:
+        metadata = body["object"]["metadata"]
+    except (KeyError, TypeError):
+        return None
+    if metadata.get("resourceVersion") is None:
+        return None
+    return metadata.get("uid"), metadata["resourceVersion"]
+
 
 def _new_certificate(obj) -> Mapping[str, Any]:
     metadata = obj["metadata"]
@@ -156,7 +173,8 @@ def _get_keystore_type(keystore) -> str:
 def sync_certificate(body) -> Mapping[str, List[Mapping[str, Any]]]:
     # Request API at for DecoratorController at https://metacontroller.github.io/metacontroller/api/decoratorcontroller.html#sync-hook-request
     obj = body["object"]
-    certificate = _new_certificate(obj)
+    with metrics.phase("generate"):
+        certificate = _new_certificate(obj)
     attachments = [certificate] if certificate else []
     desired_state = {"attachments": attachments}
     return desired_state
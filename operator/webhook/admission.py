@@ -0,0 +1,151 @@
+"""
+Admission control of webhook sync requests.
+
+When the webhook is overloaded, requests queue up (on the event loop in the inline execution mode, or for the pool
+otherwise) until Metacontroller's hook timeout fires, wasting the work already done on them and triggering retries.
+Instead, the completion time of each request is estimated, and the request is shed with a fast 503 once that
+estimate exceeds the deadline. The estimate adds up:
+    - the event loop lag, measured by a probe sleeping for ADMISSION_PROBE_INTERVAL_SECONDS and checking how late
+      it wakes up. This is the queue delay of new requests, that are not yet visible to the endpoints while queued
+      on the event loop.
+    - the number of requests in flight (e.g. waiting for the pool) times the moving average of the service time per
+      request: the time from a request's start, or from the previous completion if it is later, to its completion.
+      While the webhook is busy, that is the interval between completions, i.e. the time the webhook takes per
+      request in any execution mode. The average decays while no request is in flight, so a slow burst does not
+      keep requests shed once the webhook is idle (shed requests are not completions, and never lower it).
+
+Requests have one of two priorities:
+    - high: parents that are not Ready yet, whose sync makes progress
+    - low: resyncs of Ready parents, shed as soon as the estimate exceeds ADMISSION_LOW_PRIORITY_FRACTION of the
+      deadline, keeping the rest for high priority requests
+
+The /status, /ready and /metrics endpoints are not subject to admission control.
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Iterator, Optional
+
+from webhook import config as cfg
+from webhook import metrics
+
+PRIORITY_HIGH = "high"
+
+PRIORITY_LOW = "low"
+
+# Weight of the latest sample in the moving average of the service time per request
+_SMOOTHING = 0.1
+
+# Half-life of the decay of the moving average while no request is in flight
+_IDLE_HALF_LIFE_SECONDS = 1.0
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed because it is not expected to complete before the admission deadline."""
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        deadline: float = cfg.ADMISSION_DEADLINE_SECONDS,
+        low_priority_fraction: float = cfg.ADMISSION_LOW_PRIORITY_FRACTION,
+        probe_interval: float = cfg.ADMISSION_PROBE_INTERVAL_SECONDS,
+        clock=time.perf_counter,
+    ) -> None:
+        self._deadline = deadline
+        self._low_priority_deadline = deadline * low_priority_fraction
+        self._probe_interval = probe_interval
+        self._clock = clock
+        self._in_flight = 0
+        self._interval = 0.0
+        self._loop_lag = 0.0
+        self._probe: Optional[asyncio.Task] = None
+        self._last_completion: Optional[float] = None
+        # Time since which no request is in flight
+        self._idle_since: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._deadline > 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def interval(self) -> float:
+        """Moving average of the service time per request."""
+        return self._interval
+
+    @property
+    def loop_lag(self) -> float:
+        return self._loop_lag
+
+    def estimated_delay(self) -> float:
+        """Estimated time to complete a new request, given the event loop lag and the requests already in flight."""
+        return self._loop_lag + max(self._in_flight, 1) * self._interval
+
+    def start(self) -> None:
+        """Starts probing the event loop lag, if enabled. Must be called from the event loop."""
+        if self.enabled and self._probe is None:
+            self._probe = asyncio.get_running_loop().create_task(self._probe_loop_lag())
+
+    async def stop(self) -> None:
+        if self._probe is not None:
+            self._probe.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._probe
+            self._probe = None
+            self._loop_lag = 0.0
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[None]:
+        """
+        Counts a request as in flight, from the time it is received until it is answered. Only requests that
+        complete without an error are counted as completions.
+        """
+        start = self._clock()
+        if self._in_flight == 0 and self._idle_since is not None:
+            idle = start - self._idle_since
+            self._interval *= 0.5 ** (idle / _IDLE_HALF_LIFE_SECONDS)
+        self._in_flight += 1
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            self._in_flight -= 1
+            end = self._clock()
+            if completed:
+                self._complete(start, end)
+            if self._in_flight == 0:
+                self._idle_since = end
+
+    def admit(self, priority: str) -> None:
+        """Raises Overloaded if a tracked request of the given priority should be shed."""
+        if not self.enabled:
+            return
+
+        deadline = (
+            self._low_priority_deadline if priority == PRIORITY_LOW else self._deadline
+        )
+        estimate = self.estimated_delay()
+        if estimate > deadline:
+            metrics.SHED_REQUESTS.labels(metrics.current_route.get(), priority).inc()
+            raise Overloaded(
+                f"Estimated completion in {estimate:.3f}s exceeds the {deadline:.3f}s deadline"
+            )
+
+    async def _probe_loop_lag(self) -> None:
+        while True:
+            start = self._clock()
+            await asyncio.sleep(self._probe_interval)
+            self._loop_lag = max(self._clock() - start - self._probe_interval, 0.0)
+
+    def _complete(self, start: float, end: float) -> None:
+        if self._last_completion is not None:
+            start = max(start, self._last_completion)
+        # Smoothed from 0, so a single slow first sample does not shed the following requests
+        self._interval = _SMOOTHING * (end - start) + (1 - _SMOOTHING) * self._interval
+        self._last_completion = end
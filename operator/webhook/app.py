@@ -1,64 +1,463 @@
-import json
+import asyncio
+import contextlib
+import functools
 import logging.config
+import signal
+import time
 from json import JSONDecodeError
-from typing import Callable, Mapping
+from typing import Callable, Hashable, Mapping, Optional
 
 from starlette.applications import Starlette
 from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from starlette.routing import Route
-from starlette.status import HTTP_400_BAD_REQUEST
+from starlette.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_503_SERVICE_UNAVAILABLE,
+    HTTP_504_GATEWAY_TIMEOUT,
+)
 
 from webhook import config as cfg
-from webhook.core.sync import sync
-from webhook.addons.certmanager.main import sync_certificate
+from webhook import deadlines
+from webhook import metrics
+from webhook import profiling
+from webhook import readiness
+from webhook.core.sync import (
+    REQUEST_SHAPE as SYNC_REQUEST_SHAPE,
+    admission_priority as sync_admission_priority,
+    coalescing_key as sync_coalescing_key,
+    sync,
+)
+from webhook.addons.certmanager.main import (
+    REQUEST_SHAPE as CERTIFICATE_REQUEST_SHAPE,
+    coalescing_key as certificate_coalescing_key,
+    sync_certificate,
+)
+from webhook.admission import PRIORITY_HIGH, AdmissionController, Overloaded
+from webhook.coalescing import SingleFlight
+from webhook.compression import CompressionMiddleware
+from webhook.decoding import FullDecoder, get_decoder, msgspec_installed
+from webhook.encoding import codec, dumps, encode_response
+from webhook.executor import ExecutorSaturated, SyncExecutor
 from webhook.logconf import LOG_CONF
+from webhook.payload_log import PayloadLogger
 
 _LOGGER = logging.getLogger(__name__)
 
+_PAYLOAD_LOGGER = PayloadLogger(_LOGGER)
+
+_SYNC_EXECUTOR = SyncExecutor()
+
+# Requests coalesced with one abandoned past its deadline retry under their own deadlines, see webhook.deadlines
+_SINGLE_FLIGHT = SingleFlight(unshared=(deadlines.DeadlineExceeded,))
+
+_ADMISSION = AdmissionController()
+
+metrics.CallbackMetric(
+    "webhook_admission_estimated_delay_seconds",
+    "Estimated time to complete a new sync request, used by admission control",
+    "gauge",
+    _ADMISSION.estimated_delay,
+)
+
+_WARMUP_REQUESTS = [
+    (
+        sync,
+        {
+            "parent": {
+                "metadata": {"name": "keip-warmup", "namespace": "keip"},
+                "spec": {"routeConfigMap": "keip-warmup", "replicas": 1},
+            },
+            "children": {"Deployment.apps/v1": {}},
+        },
+    ),
+    (
+        sync_certificate,
+        {"object": {"metadata": {"name": "keip-warmup", "namespace": "keip"}}},
+    ),
+]
+
+
+def _instrumented(endpoint):
+    """Records request count, latency and in-flight metrics for a webhook endpoint."""
+
+    @functools.wraps(endpoint)
+    async def instrumented_endpoint(request: Request):
+        route = request.url.path
+        metrics.current_route.set(route)
+        in_flight = metrics.REQUESTS_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await endpoint(request)
+            status_code = response.status_code
+            return response
+        except HTTPException as e:
+            status_code = e.status_code
+            raise
+        finally:
+            in_flight.dec()
+            metrics.REQUEST_DURATION.labels(route).observe(time.perf_counter() - start)
+            metrics.REQUESTS.labels(route, str(status_code)).inc()
+
+    return instrumented_endpoint
+
+
+class RequestTooLarge(Exception):
+    """Raised when a request body exceeds REQUEST_MAX_BYTES."""
+
+
+async def _read_body(request: Request) -> bytes:
+    max_bytes = cfg.REQUEST_MAX_BYTES
+
+    # Rejected before reading anything when the declared length is too large, otherwise while streaming the body
+    content_length = request.headers.get("content-length", "")
+    if max_bytes and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _body_too_large(request, int(content_length))
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise _body_too_large(request, size)
+        chunks.append(chunk)
+
+    raw_body = b"".join(chunks)
+    metrics.REQUEST_SIZE.labels(request.url.path).observe(len(raw_body))
+    return raw_body
+
+
+def _body_too_large(request: Request, size: int) -> HTTPException:
+    _LOGGER.warning(
+        "Rejecting %s request body of %s+ bytes (max %s)",
+        request.url.path,
+        size,
+        cfg.REQUEST_MAX_BYTES,
+    )
+    return _rejected(
+        request,
+        RequestTooLarge(),
+        HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        f"Request body exceeds {cfg.REQUEST_MAX_BYTES} bytes",
+    )
+
+
+def _rejected(
+    request: Request, cause: Exception, status_code: int, detail: str, headers=None
+):
+    metrics.REQUEST_ERRORS.labels(request.url.path, type(cause).__name__).inc()
+    return HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+
+def _request_timeout(request: Request) -> float:
+    """Returns the request's timeout in seconds, from the deadline header if valid or SYNC_DEADLINE_SECONDS."""
+    header = request.headers.get(cfg.SYNC_DEADLINE_HEADER)
+    if header:
+        try:
+            timeout = float(header)
+        except ValueError:
+            timeout = 0
+        if timeout > 0:
+            return timeout
+    return cfg.SYNC_DEADLINE_SECONDS
+
+
+def _profiled(sync_func: Callable[[Mapping], Mapping]) -> Callable[[Mapping], Mapping]:
+    return profiling.Profiled(sync_func) if cfg.PROFILING_ENABLED else sync_func
+
+
+def build_webhook(
+    sync_func: Callable[[Mapping], Mapping],
+    request_shape: Mapping,
+    coalescing_key: Optional[Callable[[Mapping], Optional[Hashable]]] = None,
+    admission_priority: Optional[Callable[[Mapping], str]] = None,
+):
+    """
+    Builds a sync endpoint. If a coalescing_key function is given, concurrent requests with the same (non-None) key
+    share a single sync call and encoded response. Only done in the pooled execution modes, since inline sync calls
+    never overlap.
+
+    Requests are shed by admission control when overloaded, with the priority given by admission_priority (high if
+    not given), see webhook.admission. Each request gets a deadline past which its work is abandoned with a 504, see
+    webhook.deadlines.
+    """
+    sync_func = _profiled(sync_func)
+    decoder = get_decoder(request_shape, cfg.JSON_SELECTIVE_DECODE)
+    if _SYNC_EXECUTOR.mode == "inline" or not cfg.SYNC_COALESCING_ENABLED:
+        coalescing_key = None
+
+    async def sync_and_encode(body: Mapping) -> bytes:
+        response = await _SYNC_EXECUTOR.run(sync_func, body)
+        deadlines.check("encode")
+        with metrics.phase("encode"):
+            return encode_response(response)
 
-def build_webhook(sync_func: Callable[[Mapping], Mapping]):
     async def webhook(request: Request):
+        timeout = _request_timeout(request)
+        if timeout:
+            # The event loop lag approximates the time the request was queued before reaching the endpoint
+            deadline_token = deadlines.set_deadline(timeout, _ADMISSION.loop_lag)
         try:
-            body = await request.json()
-            _LOGGER.debug(f"Webhook request:\n {json.dumps(body)}")
-            response = sync_func(body)
+            with _ADMISSION.track():
+                raw_body = await _read_body(request)
+                _PAYLOAD_LOGGER.log("Webhook request", raw_body)
+                with metrics.phase("decode"):
+                    body = decoder.loads(raw_body)
+                _ADMISSION.admit(
+                    admission_priority(body) if admission_priority else PRIORITY_HIGH
+                )
+                key = coalescing_key(body) if coalescing_key else None
+                content = await _SINGLE_FLIGHT.run(key, lambda: sync_and_encode(body))
         except JSONDecodeError as e:
-            raise HTTPException(
-                status_code=HTTP_400_BAD_REQUEST,
-                detail=f"Failed to parse request body: {repr(e)}",
+            raise _rejected(
+                request,
+                e,
+                HTTP_400_BAD_REQUEST,
+                f"Failed to parse request body: {repr(e)}",
             )
         except KeyError as e:
-            raise HTTPException(
-                status_code=HTTP_400_BAD_REQUEST,
-                detail=f"Missing field from request: {repr(e)}",
+            raise _rejected(
+                request,
+                e,
+                HTTP_400_BAD_REQUEST,
+                f"Missing field from request: {repr(e)}",
+            )
+        except ExecutorSaturated as e:
+            _LOGGER.warning("Rejecting webhook request: %s", e)
+            raise _rejected(
+                request,
+                e,
+                HTTP_503_SERVICE_UNAVAILABLE,
+                "Webhook is saturated, retry later",
+                headers={"Retry-After": str(cfg.SYNC_RETRY_AFTER_SECONDS)},
+            )
+        except Overloaded as e:
+            _LOGGER.warning("Shedding webhook request: %s", e)
+            raise _rejected(
+                request,
+                e,
+                HTTP_503_SERVICE_UNAVAILABLE,
+                "Webhook is overloaded, retry later",
+                headers={"Retry-After": str(cfg.SYNC_RETRY_AFTER_SECONDS)},
+            )
+        except deadlines.DeadlineExceeded as e:
+            _LOGGER.warning("Abandoning webhook request: %s", e)
+            raise _rejected(request, e, HTTP_504_GATEWAY_TIMEOUT, str(e))
+        finally:
+            if timeout:
+                deadlines.reset_deadline(deadline_token)
+
+        metrics.RESPONSE_SIZE.labels(request.url.path).observe(len(content))
+        _PAYLOAD_LOGGER.log("Webhook response", content)
+        return Response(content, media_type="application/json")
+
+    return _instrumented(webhook)
+
+
+def build_batch_webhook(
+    sync_func: Callable[[Mapping], Mapping],
+    request_shape: Mapping,
+    admission_priority: Optional[Callable[[Mapping], str]] = None,
+):
+    """
+    Builds an endpoint accepting a JSON array of sync requests, and streaming back the array of corresponding
+    responses in the same order. A request that fails is answered by an {"error": ...} item without failing the
+    rest of the batch.
+
+    Each request in the batch goes through admission control, and is abandoned past the batch's deadline, counted
+    from when the batch was received (see build_webhook).
+    """
+    sync_func = _profiled(sync_func)
+    decoder = get_decoder(request_shape, cfg.JSON_SELECTIVE_DECODE)
+
+    async def batch_webhook(request: Request):
+        timeout = _request_timeout(request)
+        received = time.monotonic() - _ADMISSION.loop_lag
+        try:
+            raw_body = await _read_body(request)
+            _PAYLOAD_LOGGER.log("Webhook batch request", raw_body)
+            with metrics.phase("decode"):
+                items = decoder.split_batch(raw_body)
+        except JSONDecodeError as e:
+            raise _rejected(
+                request,
+                e,
+                HTTP_400_BAD_REQUEST,
+                f"Failed to parse request body: {repr(e)}",
+            )
+
+        if not isinstance(items, list):
+            raise _rejected(
+                request,
+                TypeError(),
+                HTTP_400_BAD_REQUEST,
+                "Batch request body must be a JSON array",
             )
 
-        _LOGGER.debug(f"Webhook response:\n {json.dumps(response)}")
-        return JSONResponse(response)
+        async def sync_item(item) -> bytes:
+            # Items are synced while the response streams, after this endpoint returned
+            if timeout:
+                deadline_token = deadlines.set_deadline(
+                    timeout, time.monotonic() - received
+                )
+            try:
+                return await _sync_batch_item(
+                    sync_func, decoder, item, admission_priority
+                )
+            finally:
+                if timeout:
+                    deadlines.reset_deadline(deadline_token)
+
+        async def stream_responses():
+            yield b"["
+            for i, item in enumerate(items):
+                if i:
+                    yield b","
+                yield await sync_item(item)
+            yield b"]"
+
+        return StreamingResponse(stream_responses(), media_type="application/json")
+
+    return _instrumented(batch_webhook)
+
+
+async def _sync_batch_item(
+    sync_func: Callable[[Mapping], Mapping],
+    decoder: FullDecoder,
+    item,
+    admission_priority: Optional[Callable[[Mapping], str]],
+) -> bytes:
+    try:
+        with _ADMISSION.track():
+            with metrics.phase("decode"):
+                body = decoder.decode_item(item)
+            _ADMISSION.admit(
+                admission_priority(body) if admission_priority else PRIORITY_HIGH
+            )
+            response = await _SYNC_EXECUTOR.run(sync_func, body)
+            deadlines.check("encode")
+            with metrics.phase("encode"):
+                content = encode_response(response)
+    except JSONDecodeError as e:
+        return dumps({"error": f"Failed to parse request: {repr(e)}"})
+    except KeyError as e:
+        return dumps({"error": f"Missing field from request: {repr(e)}"})
+    except ExecutorSaturated:
+        return dumps({"error": "Webhook is saturated, retry later"})
+    except Overloaded:
+        return dumps({"error": "Webhook is overloaded, retry later"})
+    except deadlines.DeadlineExceeded as e:
+        return dumps({"error": str(e)})
+    except Exception as e:
+        _LOGGER.exception("Failed to sync batch item")
+        return dumps({"error": f"Failed to sync request: {repr(e)}"})
+
+    _PAYLOAD_LOGGER.log("Webhook batch response item", content)
+    return content
+
+
+async def _warm_up():
+    # Exercises the sync functions, codec and executor pool before the worker reports ready
+    for sync_func, body in _WARMUP_REQUESTS:
+        encode_response(await _SYNC_EXECUTOR.run(sync_func, body))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    await _warm_up()
+    if cfg.PROFILING_ENABLED:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1, _arm_signal_capture
+        )
+    _ADMISSION.start()
+    readiness.mark_warm()
+    yield
+    await _ADMISSION.stop()
+    _SYNC_EXECUTOR.shutdown()
 
-    return webhook
+
+def _arm_signal_capture():
+    try:
+        profiling.arm(cfg.PROFILING_SIGNAL_REQUESTS)
+    except RuntimeError as e:
+        _LOGGER.warning("Ignoring SIGUSR1: %s", e)
 
 
 async def status(request):
     return JSONResponse({"status": "UP"})
 
 
+async def ready(request):
+    if readiness.is_ready():
+        return JSONResponse({"status": "READY"})
+    return JSONResponse(
+        {"status": "NOT_READY"}, status_code=HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+async def metrics_endpoint(request):
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 routes = [
-    Route("/sync", endpoint=build_webhook(sync), methods=["POST"]),
+    Route(
+        "/sync",
+        endpoint=build_webhook(
+            sync, SYNC_REQUEST_SHAPE, sync_coalescing_key, sync_admission_priority
+        ),
+        methods=["POST"],
+    ),
+    Route(
+        "/sync/batch",
+        endpoint=build_batch_webhook(sync, SYNC_REQUEST_SHAPE, sync_admission_priority),
+        methods=["POST"],
+    ),
     Route(
         "/addons/certmanager/sync",
-        endpoint=build_webhook(sync_certificate),
+        endpoint=build_webhook(
+            sync_certificate, CERTIFICATE_REQUEST_SHAPE, certificate_coalescing_key
+        ),
+        methods=["POST"],
+    ),
+    Route(
+        "/addons/certmanager/sync/batch",
+        endpoint=build_batch_webhook(sync_certificate, CERTIFICATE_REQUEST_SHAPE),
         methods=["POST"],
     ),
     Route("/status", endpoint=status, methods=["GET"]),
+    Route("/ready", endpoint=ready, methods=["GET"]),
+    Route("/metrics", endpoint=metrics_endpoint, methods=["GET"]),
 ]
 
 
+if cfg.PROFILING_ENABLED:
+    routes.extend(profiling.routes)
+
 logging.config.dictConfig(LOG_CONF)
 
+_LOGGER.info("Using JSON codec: %s", codec.name)
+_LOGGER.info("Using sync execution mode: %s", _SYNC_EXECUTOR.mode)
+if not _ADMISSION.enabled:
+    _LOGGER.info("Admission control disabled")
+if cfg.JSON_SELECTIVE_DECODE and not msgspec_installed():
+    _LOGGER.warning("msgspec is not installed, request bodies are decoded in full")
+
+if cfg.PROFILING_ENABLED:
+    _LOGGER.warning("Profiling endpoints enabled. NOT SUITABLE FOR PRODUCTION!")
+
 if cfg.DEBUG:
     _LOGGER.warning("Running server with debug mode. NOT SUITABLE FOR PRODUCTION!")
 
-app = Starlette(debug=cfg.DEBUG, routes=routes)
+middleware = []
+
+if cfg.COMPRESSION_ENABLED:
+    middleware.append(Middleware(CompressionMiddleware, routes=routes))
+
+app = Starlette(
+    debug=cfg.DEBUG, routes=routes, middleware=middleware, lifespan=lifespan
+)
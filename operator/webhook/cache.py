@@ -0,0 +1,120 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, Set
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+
+def retained_size(value: Any, _seen: Optional[Set[int]] = None) -> int:
+    """
+    Returns the approximate memory retained by a JSON-like value (dicts, lists, tuples and scalars), in bytes.
+
+    Python objects take several times the length of their JSON encoding (about 5x for generated children), so cache
+    sizes are measured with this rather than the encoded length. Objects shared within the value are counted once.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            retained_size(k, _seen) + retained_size(v, _seen) for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple)):
+        size += sum(retained_size(v, _seen) for v in value)
+    return size
+
+
+class LRUCache:
+    """
+    A bounded least-recently-used cache with an optional time-to-live per entry.
+
+    The cache is bounded both by number of entries and by the total of the caller-supplied entry sizes, so
+    memory usage can be kept well below the webhook pod's limit. A max_entries of zero disables the cache.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at and expires_at <= self._clock():
+                self._remove(key, size)
+                self._stats.evictions += 1
+                self._stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int = 0) -> None:
+        if not self.enabled or (self._max_bytes and size > self._max_bytes):
+            return
+
+        expires_at = self._clock() + self._ttl_seconds if self._ttl_seconds else 0
+
+        with self._lock:
+            if (existing := self._entries.get(key)) is not None:
+                self._remove(key, existing[1])
+
+            self._entries[key] = (value, size, expires_at)
+            self._stats.entries += 1
+            self._stats.bytes += size
+
+            while len(self._entries) > self._max_entries or (
+                self._max_bytes and self._stats.bytes > self._max_bytes
+            ):
+                oldest_key, (_, oldest_size, _) = next(iter(self._entries.items()))
+                self._remove(oldest_key, oldest_size)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**vars(self._stats))
+
+    def _remove(self, key: Hashable, size: int) -> None:
+        del self._entries[key]
+        self._stats.entries -= 1
+        self._stats.bytes -= size
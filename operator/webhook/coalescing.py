@@ -0,0 +1,62 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, Type, TypeVar
+
+from webhook import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: while a call is in flight, callers with an equal key wait for it
+    and share its result (or exception) instead of starting their own.
+
+    The call is not shared when it is cancelled, or raises one of the `unshared` exceptions (e.g. a deadline specific
+    to the caller that made it): the waiting callers then retry, one of them making the call again.
+    """
+
+    def __init__(self, unshared: Tuple[Type[BaseException], ...] = ()) -> None:
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._unshared = unshared
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self, key: Optional[Hashable], func: Callable[[], Awaitable[T]]) -> T:
+        if key is None:
+            return await func()
+
+        coalesced = False
+        while (future := self._in_flight.get(key)) is not None:
+            if not coalesced:
+                metrics.COALESCED_REQUESTS.labels(metrics.current_route.get()).inc()
+                coalesced = True
+            try:
+                # Shielded, so a waiting caller going away does not cancel the shared call
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only retried when the shared call was given up, rather than this caller cancelled
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if isinstance(e, self._unshared):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Marks the exception as retrieved, in case no other caller was waiting for it
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
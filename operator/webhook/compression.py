@@ -0,0 +1,378 @@
+"""
+Compression of webhook request and response bodies.
+
+Request bodies sent with a gzip (or zstd) Content-Encoding are decompressed before reaching the endpoints, and
+responses of at least COMPRESSION_MIN_BYTES are compressed with the best encoding accepted by the client's
+Accept-Encoding header. Metacontroller's HTTP client accepts gzip responses by default. zstd is only supported when
+the zstandard package is installed. Requests to paths the webhook does not route are passed through untouched.
+"""
+
+import importlib.util
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.routing import BaseRoute, Match
+from starlette.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from webhook import config as cfg
+from webhook import metrics
+
+
+class DecompressionError(Exception):
+    """Raised when a compressed request body is corrupt or truncated."""
+
+
+class _DecompressedTooLarge(Exception):
+    pass
+
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # A sync flush sends the data compressed so far, so streamed responses are not held back
+        mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+class GzipCodec:
+    name = "gzip"
+
+    def __init__(self, level: int) -> None:
+        self._level = level
+
+    def compressor(self) -> _GzipCompressor:
+        return _GzipCompressor(self._level)
+
+    def decompress(self, data: bytes, max_size: int) -> bytes:
+        decompressor = zlib.decompressobj(31)
+        try:
+            # Decompressing at most one byte more than the limit is enough to tell if the limit is exceeded
+            content = decompressor.decompress(data, max_size + 1 if max_size else 0)
+        except zlib.error as e:
+            raise DecompressionError(str(e)) from e
+
+        if max_size and len(content) > max_size:
+            raise _DecompressedTooLarge()
+        if not decompressor.eof:
+            raise DecompressionError("Truncated gzip body")
+        return content
+
+
+class _ZstdCompressor:
+    def __init__(self, compressor) -> None:
+        import zstandard
+
+        self._compressor = compressor.compressobj()
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if final:
+            return self._compressor.compress(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(
+            self._flush_block
+        )
+
+
+class ZstdCodec:
+    name = "zstd"
+
+    def __init__(self, level: int) -> None:
+        import zstandard
+
+        self._zstandard = zstandard
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compressor(self) -> _ZstdCompressor:
+        return _ZstdCompressor(self._compressor)
+
+    def decompress(self, data: bytes, max_size: int) -> bytes:
+        try:
+            with self._decompressor.stream_reader(data) as reader:
+                content = reader.read(max_size + 1) if max_size else reader.readall()
+        except self._zstandard.ZstdError as e:
+            raise DecompressionError(str(e)) from e
+
+        if max_size and len(content) > max_size:
+            raise _DecompressedTooLarge()
+        return content
+
+
+def installed_codecs(gzip_level: int, zstd_level: int) -> Dict[str, object]:
+    """Returns the supported codecs by encoding name, in order of preference."""
+    codecs = {}
+    if importlib.util.find_spec("zstandard"):
+        codecs["zstd"] = ZstdCodec(zstd_level)
+    codecs["gzip"] = GzipCodec(gzip_level)
+    return codecs
+
+
+def negotiate(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """Returns the first supported encoding accepted by an Accept-Encoding header value, if any."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        encoding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[encoding.strip().lower()] = quality
+
+    for encoding in supported:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_size: int = cfg.COMPRESSION_MIN_BYTES,
+        gzip_level: int = cfg.COMPRESSION_GZIP_LEVEL,
+        zstd_level: int = cfg.COMPRESSION_ZSTD_LEVEL,
+        routes: Optional[Sequence[BaseRoute]] = None,
+    ) -> None:
+        self.app = app
+        self.min_size = min_size
+        # Requests not matching any of the routes (answered with a 404) are passed through untouched, so they are
+        # neither decompressed nor labelled in the metrics. None compresses the requests to every path.
+        self.routes = routes
+        self.codecs = installed_codecs(gzip_level, zstd_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = self._route_path(scope) if scope["type"] == "http" else None
+        if path is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+
+        content_encoding = headers.get("content-encoding", "identity").lower()
+        if content_encoding != "identity":
+            decompressed = await self._decompress_request(
+                scope, receive, send, content_encoding, path
+            )
+            if decompressed is None:
+                return
+            scope, receive = decompressed
+
+        encoding = negotiate(headers.get("accept-encoding", ""), list(self.codecs))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(
+            send, self.codecs[encoding], self.min_size, path
+        )
+        await self.app(scope, receive, responder.send)
+
+    def _route_path(self, scope: Scope) -> Optional[str]:
+        """Returns the path template of the route matching a request, used as its metrics label."""
+        if self.routes is None:
+            return scope["path"]
+        for route in self.routes:
+            if route.matches(scope)[0] != Match.NONE:
+                return getattr(route, "path", scope["path"])
+        return None
+
+    async def _decompress_request(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        content_encoding: str,
+        path: str,
+    ):
+        codec = self.codecs.get(content_encoding)
+        if codec is None:
+            await _reject(
+                scope,
+                receive,
+                send,
+                path,
+                "UnsupportedContentEncoding",
+                HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                f"Unsupported Content-Encoding '{content_encoding}', expected one of: {', '.join(self.codecs)}",
+            )
+            return None
+
+        max_bytes = cfg.REQUEST_MAX_BYTES
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                return None
+            size += len(message.get("body", b""))
+            more_body = message.get("more_body", False)
+            chunks.append(message.get("body", b""))
+            if max_bytes and size > max_bytes:
+                break
+
+        try:
+            if max_bytes and size > max_bytes:
+                raise _DecompressedTooLarge()
+            start = time.thread_time()
+            body = codec.decompress(b"".join(chunks), max_bytes)
+            _record(path, "request", codec.name, size, len(body), start)
+        except _DecompressedTooLarge:
+            await _reject(
+                scope,
+                receive,
+                send,
+                path,
+                "RequestTooLarge",
+                HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"Request body exceeds {max_bytes} bytes",
+            )
+            return None
+        except DecompressionError as e:
+            await _reject(
+                scope,
+                receive,
+                send,
+                path,
+                "DecompressionError",
+                HTTP_400_BAD_REQUEST,
+                f"Failed to decompress request body: {repr(e)}",
+            )
+            return None
+
+        request_headers = MutableHeaders(scope=dict(scope))
+        del request_headers["content-encoding"]
+        request_headers["content-length"] = str(len(body))
+        scope = dict(scope, headers=request_headers.raw)
+
+        body_sent = False
+
+        async def receive_decompressed() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return scope, receive_decompressed
+
+
+class _CompressingResponder:
+    """Compresses the response body sent by the app, unless it is smaller than min_size or already encoded."""
+
+    def __init__(self, send: Send, codec, min_size: int, path: str) -> None:
+        self._send = send
+        self._codec = codec
+        self._min_size = min_size
+        self._path = path
+        self._start_message: Optional[Message] = None
+        self._compressor = None
+        self._passthrough = False
+        self._uncompressed_size = 0
+        self._compressed_size = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start_message is not None:
+            start_message, self._start_message = self._start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if "content-encoding" in headers or (
+                not more_body and len(body) < self._min_size
+            ):
+                self._passthrough = True
+                await self._send(start_message)
+                await self._send(message)
+                return
+
+            self._compressor = self._codec.compressor()
+            content = self._compress(body, final=not more_body)
+
+            headers["Content-Encoding"] = self._codec.name
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["content-length"]
+            else:
+                headers["Content-Length"] = str(len(content))
+
+            await self._send(start_message)
+            await self._send(
+                {"type": "http.response.body", "body": content, "more_body": more_body}
+            )
+            return
+
+        content = self._compress(body, final=not more_body)
+        await self._send(
+            {"type": "http.response.body", "body": content, "more_body": more_body}
+        )
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        start = time.thread_time()
+        content = self._compressor.compress(body, final)
+        self._uncompressed_size += len(body)
+        self._compressed_size += len(content)
+        if final:
+            _record(
+                self._path,
+                "response",
+                self._codec.name,
+                self._compressed_size,
+                self._uncompressed_size,
+                start,
+            )
+        else:
+            metrics.COMPRESSION_CPU.labels(
+                self._path, "response", self._codec.name
+            ).inc(time.thread_time() - start)
+        return content
+
+
+def _record(
+    path: str,
+    direction: str,
+    encoding: str,
+    compressed_size: int,
+    uncompressed_size: int,
+    cpu_start: float,
+) -> None:
+    metrics.COMPRESSION_CPU.labels(path, direction, encoding).inc(
+        time.thread_time() - cpu_start
+    )
+    metrics.COMPRESSED_BYTES.labels(path, direction, encoding).inc(compressed_size)
+    metrics.UNCOMPRESSED_BYTES.labels(path, direction, encoding).inc(uncompressed_size)
+
+
+async def _reject(
+    scope: Scope,
+    receive: Receive,
+    send: Send,
+    path: str,
+    cause: str,
+    status_code: int,
+    detail: str,
+) -> None:
+    metrics.REQUEST_ERRORS.labels(path, cause).inc()
+    await PlainTextResponse(detail, status_code=status_code)(scope, receive, send)
@@ -5,7 +5,119 @@ cfg = Config(".env")
 # Server
 DEBUG = cfg("DEBUG", cast=bool, default=False)
 
+# Serving, see webhook.server. Multiple workers each bind the port with SO_REUSEPORT and keep their own caches.
+SERVER_HOST = cfg("SERVER_HOST", cast=str, default="0.0.0.0")
+SERVER_PORT = cfg("SERVER_PORT", cast=int, default=7080)
+SERVER_WORKERS = cfg("SERVER_WORKERS", cast=int, default=1)
+# On SIGTERM, time spent reporting not-ready before workers stop accepting connections, and the max time workers
+# then wait for in-flight requests to complete.
+SERVER_DRAIN_SECONDS = cfg("SERVER_DRAIN_SECONDS", cast=float, default=0)
+SERVER_GRACEFUL_TIMEOUT_SECONDS = cfg(
+    "SERVER_GRACEFUL_TIMEOUT_SECONDS", cast=int, default=10
+)
+# Connection handling, validated by webhook.server. SERVER_LIMIT_CONCURRENCY caps the concurrent connections and
+# requests per worker, beyond which requests are answered with a 503 (0 means no limit). SERVER_HTTP is one of auto,
+# h11 or httptools and SERVER_LOOP one of auto, asyncio or uvloop, where 'auto' prefers httptools and uvloop.
+SERVER_BACKLOG = cfg("SERVER_BACKLOG", cast=int, default=2048)
+SERVER_LIMIT_CONCURRENCY = cfg("SERVER_LIMIT_CONCURRENCY", cast=int, default=0)
+SERVER_KEEP_ALIVE_SECONDS = cfg("SERVER_KEEP_ALIVE_SECONDS", cast=int, default=5)
+SERVER_HTTP = cfg("SERVER_HTTP", cast=str, default="auto")
+SERVER_LOOP = cfg("SERVER_LOOP", cast=str, default="auto")
+
+# How sync functions are run: inline (on the event loop), thread or process. SYNC_MAX_PENDING bounds the number of
+# queued and running pooled calls, beyond which requests are rejected with a 503.
+SYNC_EXECUTION_MODE = cfg("SYNC_EXECUTION_MODE", cast=str, default="inline")
+SYNC_WORKERS = cfg("SYNC_WORKERS", cast=int, default=4)
+SYNC_MAX_PENDING = cfg("SYNC_MAX_PENDING", cast=int, default=64)
+SYNC_RETRY_AFTER_SECONDS = cfg("SYNC_RETRY_AFTER_SECONDS", cast=int, default=1)
+# Concurrent requests for the same parent state share one sync call. Only applies to the pooled execution modes.
+SYNC_COALESCING_ENABLED = cfg("SYNC_COALESCING_ENABLED", cast=bool, default=True)
+
+# Sync requests not expected to complete within the deadline (seconds) are shed with a 503, see webhook.admission.
+# Should be below Metacontroller's hook timeout (10s by default), 0 disables admission control. Resyncs of Ready
+# parents are shed once the estimate exceeds ADMISSION_LOW_PRIORITY_FRACTION of the deadline. The event loop lag is
+# measured every ADMISSION_PROBE_INTERVAL_SECONDS.
+ADMISSION_DEADLINE_SECONDS = cfg("ADMISSION_DEADLINE_SECONDS", cast=float, default=8)
+ADMISSION_LOW_PRIORITY_FRACTION = cfg(
+    "ADMISSION_LOW_PRIORITY_FRACTION", cast=float, default=0.5
+)
+ADMISSION_PROBE_INTERVAL_SECONDS = cfg(
+    "ADMISSION_PROBE_INTERVAL_SECONDS", cast=float, default=0.1
+)
+
+# One of: auto, orjson, msgspec, stdlib. 'auto' uses the fastest installed codec.
+JSON_CODEC = cfg("JSON_CODEC", cast=str, default="auto")
+
+# Request bodies larger than this (bytes) are rejected with a 413. Applies to batch requests as a whole.
+REQUEST_MAX_BYTES = cfg("REQUEST_MAX_BYTES", cast=int, default=4 * 1024 * 1024)
+
+# Compression of request and response bodies, see webhook.compression. Smaller responses are sent uncompressed.
+COMPRESSION_ENABLED = cfg("COMPRESSION_ENABLED", cast=bool, default=True)
+COMPRESSION_MIN_BYTES = cfg("COMPRESSION_MIN_BYTES", cast=int, default=1024)
+COMPRESSION_GZIP_LEVEL = cfg("COMPRESSION_GZIP_LEVEL", cast=int, default=1)
+COMPRESSION_ZSTD_LEVEL = cfg("COMPRESSION_ZSTD_LEVEL", cast=int, default=3)
+
+# Sync work on a request is abandoned with a 504 once it has taken longer than this (seconds), see webhook.deadlines.
+# Matches Metacontroller's hook timeout by default, 0 disables it. Callers can send a shorter or longer timeout in
+# seconds with the SYNC_DEADLINE_HEADER request header.
+SYNC_DEADLINE_SECONDS = cfg("SYNC_DEADLINE_SECONDS", cast=float, default=10)
+SYNC_DEADLINE_HEADER = cfg(
+    "SYNC_DEADLINE_HEADER", cast=str, default="X-Request-Timeout"
+)
+
+# Only decode the parts of sync requests read by the sync functions, see webhook.decoding
+JSON_SELECTIVE_DECODE = cfg("JSON_SELECTIVE_DECODE", cast=bool, default=True)
+
+# Fraction of webhook payloads logged at DEBUG level, and the size (bytes) at which logged payloads are truncated
+LOG_PAYLOAD_SAMPLE_RATE = cfg("LOG_PAYLOAD_SAMPLE_RATE", cast=float, default=1.0)
+LOG_PAYLOAD_MAX_BYTES = cfg("LOG_PAYLOAD_MAX_BYTES", cast=int, default=0)
+
+# Profiling admin endpoints, see webhook.profiling. NOT SUITABLE FOR PRODUCTION unless the endpoints are protected.
+PROFILING_ENABLED = cfg("PROFILING_ENABLED", cast=bool, default=False)
+PROFILING_OUTPUT_DIR = cfg(
+    "PROFILING_OUTPUT_DIR", cast=str, default="/tmp/keip-profiles"
+)
+# Number of requests profiled by a capture triggered with SIGUSR1
+PROFILING_SIGNAL_REQUESTS = cfg("PROFILING_SIGNAL_REQUESTS", cast=int, default=10)
+
 # Application
 INTEGRATION_CONTAINER_IMAGE = cfg(
     "INTEGRATION_IMAGE", cast=str, default="keip-integration"
 )
+
+# Desired-state cache. Sizes are measured by the memory retained by the cached children and their JSON encoding. The
+# limits apply to each server worker process, so the cache can use up to SERVER_WORKERS * SYNC_CACHE_MAX_BYTES.
+SYNC_CACHE_MAX_ENTRIES = cfg("SYNC_CACHE_MAX_ENTRIES", cast=int, default=2048)
+SYNC_CACHE_MAX_BYTES = cfg("SYNC_CACHE_MAX_BYTES", cast=int, default=8 * 1024 * 1024)
+SYNC_CACHE_TTL_SECONDS = cfg("SYNC_CACHE_TTL_SECONDS", cast=float, default=600)
+
+# Steady-state index of the last desired state per route, returned as is when a resync carries no changes.
+SYNC_FASTPATH_MAX_ENTRIES = cfg("SYNC_FASTPATH_MAX_ENTRIES", cast=int, default=2048)
+
+# Adaptive resyncAfterSeconds in /sync responses. Routes that are rolling out are resynced after
+# SYNC_RESYNC_ROLLOUT_SECONDS, steady routes after an exponential backoff from SYNC_RESYNC_STEADY_BASE_SECONDS up to
+# SYNC_RESYNC_STEADY_MAX_SECONDS, reduced by up to a SYNC_RESYNC_JITTER fraction.
+SYNC_RESYNC_ADAPTIVE = cfg("SYNC_RESYNC_ADAPTIVE", cast=bool, default=False)
+SYNC_RESYNC_ROLLOUT_SECONDS = cfg("SYNC_RESYNC_ROLLOUT_SECONDS", cast=float, default=5)
+SYNC_RESYNC_STEADY_BASE_SECONDS = cfg(
+    "SYNC_RESYNC_STEADY_BASE_SECONDS", cast=float, default=30
+)
+SYNC_RESYNC_STEADY_MAX_SECONDS = cfg(
+    "SYNC_RESYNC_STEADY_MAX_SECONDS", cast=float, default=1800
+)
+SYNC_RESYNC_JITTER = cfg("SYNC_RESYNC_JITTER", cast=float, default=0.1)
+
+# Staggered rollouts of INTEGRATION_IMAGE changes across SYNC_ROLLOUT_WAVES waves of routes (0 disables), see
+# webhook.core.rollout. Waiting routes are resynced after SYNC_RESYNC_ROLLOUT_SECONDS.
+SYNC_ROLLOUT_WAVES = cfg("SYNC_ROLLOUT_WAVES", cast=int, default=0)
+SYNC_ROLLOUT_MAX_CONCURRENT = cfg("SYNC_ROLLOUT_MAX_CONCURRENT", cast=int, default=10)
+SYNC_ROLLOUT_WAVE_MIN_SECONDS = cfg(
+    "SYNC_ROLLOUT_WAVE_MIN_SECONDS", cast=float, default=60
+)
+SYNC_ROLLOUT_STALL_SECONDS = cfg("SYNC_ROLLOUT_STALL_SECONDS", cast=float, default=600)
+
+# Last emitted status per route, so a Ready condition is only regenerated on a real readiness transition. Also
+# bounds the number of routes whose adaptive resync backoff is tracked.
+SYNC_STATUS_INDEX_MAX_ENTRIES = cfg(
+    "SYNC_STATUS_INDEX_MAX_ENTRIES", cast=int, default=2048
+)
@@ -0,0 +1,207 @@
+"""
+JVM tuning profiles of IntegrationRoute containers.
+
+Without tuning, the JVM sizes itself with its default ergonomics: a heap of 25% of the container memory limit (or of
+the node's memory, without a limit), and the Serial GC below 2 CPUs or 1792MB. A route can instead set
+spec.jvm.profile to one of the profiles below, whose options are derived from spec.resources.limits:
+    - throughput: Parallel GC and a large, fixed-size heap, for batch-like routes
+    - latency: G1 GC with a pause time goal and a fixed-size heap
+    - small: Serial GC, a C1-only JIT and small thread stacks and code cache, for the smallest footprint
+
+The heap percentage is lowered for small memory limits, so the metaspace, code cache and thread stacks still fit
+within the limit. Heap and memory pool options are only set with a memory limit, and the active processor count
+only with a CPU limit.
+
+Independently of the profile, spec.jvm.classDataSharing speeds up the JVM startup with an AppCDS archive of the
+application classes, see cds_init_container.
+"""
+
+import hashlib
+import json
+import math
+import re
+from typing import List, Mapping, NamedTuple, Optional
+
+MIB = 1024 * 1024
+
+
+class _Profile(NamedTuple):
+    gc_options: List[str]
+    # Upper bound of the heap, as a percentage of the memory limit
+    heap_percent: int
+    # Whether the heap is committed up front, rather than grown as needed
+    fixed_heap: bool
+    code_cache_mb: int
+    extra_options: List[str]
+
+
+PROFILES = {
+    "throughput": _Profile(
+        gc_options=["-XX:+UseParallelGC"],
+        heap_percent=75,
+        fixed_heap=True,
+        code_cache_mb=240,
+        extra_options=[],
+    ),
+    "latency": _Profile(
+        gc_options=["-XX:+UseG1GC", "-XX:MaxGCPauseMillis=50"],
+        heap_percent=70,
+        fixed_heap=True,
+        code_cache_mb=240,
+        extra_options=[],
+    ),
+    "small": _Profile(
+        gc_options=["-XX:+UseSerialGC"],
+        heap_percent=60,
+        fixed_heap=False,
+        code_cache_mb=48,
+        extra_options=["-XX:TieredStopAtLevel=1", "-Xss512k"],
+    ),
+}
+
+# Memory used outside of the heap, metaspace and code cache (thread stacks, GC structures, direct buffers)
+_NATIVE_OVERHEAD_MB = 64
+
+# The heap percentage is never lowered below the JVM's default
+_MIN_HEAP_PERCENT = 25
+
+_QUANTITY_RE = re.compile(r"^([0-9]+(?:\.[0-9]+)?(?:[eE][0-9]+)?)([a-zA-Z]*)$")
+
+_QUANTITY_SUFFIXES = {
+    "": 1,
+    "m": 1e-3,
+    "k": 1e3,
+    "M": 1e6,
+    "G": 1e9,
+    "T": 1e12,
+    "P": 1e15,
+    "E": 1e18,
+    "Ki": 2**10,
+    "Mi": 2**20,
+    "Gi": 2**30,
+    "Ti": 2**40,
+    "Pi": 2**50,
+    "Ei": 2**60,
+}
+
+
+def tuning_options(profile_name: str, limits: Optional[Mapping]) -> List[str]:
+    """Returns the JVM options of a tuning profile, for a container with the given resource limits."""
+    profile = PROFILES[profile_name]
+    options = list(profile.gc_options)
+
+    memory = _parse_quantity((limits or {}).get("memory"))
+    if memory:
+        memory_mb = memory / MIB
+        metaspace_mb = min(max(int(memory_mb / 8), 128), 512)
+        non_heap_mb = metaspace_mb + profile.code_cache_mb + _NATIVE_OVERHEAD_MB
+        heap_percent = min(
+            profile.heap_percent,
+            math.floor(100 * (memory_mb - non_heap_mb) / memory_mb),
+        )
+        heap_percent = max(heap_percent, _MIN_HEAP_PERCENT)
+
+        options.append(f"-XX:MaxRAMPercentage={heap_percent}.0")
+        if profile.fixed_heap:
+            options.append(f"-XX:InitialRAMPercentage={heap_percent}.0")
+        options += [
+            f"-XX:MaxMetaspaceSize={metaspace_mb}m",
+            f"-XX:ReservedCodeCacheSize={profile.code_cache_mb}m",
+        ]
+
+    cpu = _parse_quantity((limits or {}).get("cpu"))
+    if cpu:
+        options.append(f"-XX:ActiveProcessorCount={max(math.ceil(cpu), 1)}")
+
+    return options + profile.extra_options
+
+
+def _parse_quantity(quantity) -> Optional[float]:
+    """Parses a Kubernetes resource quantity (e.g. 512Mi, 1G, 500m), None if it is missing or invalid."""
+    if isinstance(quantity, (int, float)):
+        return float(quantity)
+    if not isinstance(quantity, str):
+        return None
+
+    match = _QUANTITY_RE.match(quantity.strip())
+    if match is None or match.group(2) not in _QUANTITY_SUFFIXES:
+        return None
+    return float(match.group(1)) * _QUANTITY_SUFFIXES[match.group(2)]
+
+
+# Application class data sharing (AppCDS) archives, see cds_init_container
+CDS_ARCHIVE_VOLUME = "jvm-cds"
+
+CDS_ARCHIVE_DIR = "/var/jvm/cds"
+
+CDS_OPTIONS_VOLUME = "jvm-options"
+
+CDS_OPTIONS_DIR = "/var/jvm/options"
+
+# Startup probe settings of routes using class data sharing. The probe runs more often, so accelerated starts are
+# detected sooner, with the same two minute budget as the default probe, as starts without an archive are not faster.
+CDS_STARTUP_PROBE = {"periodSeconds": 2, "failureThreshold": 60}
+
+# Removes the route's archives for other keys, promotes an archive recorded by a previous pod (named after it) and
+# picks the JVM options: use the archive, or record one when the JVM exits.
+_CDS_INIT_SCRIPT = f"""\
+cd {CDS_ARCHIVE_DIR}
+archive="${{CDS_ROUTE}}_${{CDS_KEY}}.jsa"
+for f in "${{CDS_ROUTE}}"_*; do
+  case "$f" in "$archive"*) ;; *) rm -f "$f" ;; esac
+done
+if [ ! -s "$archive" ]; then
+  for f in "$archive".*; do
+    [ -s "$f" ] && mv "$f" "$archive" && break
+  done
+fi
+if [ -s "$archive" ]; then
+  echo "-XX:SharedArchiveFile={CDS_ARCHIVE_DIR}/$archive"
+else
+  echo "-XX:ArchiveClassesAtExit={CDS_ARCHIVE_DIR}/$archive.$HOSTNAME"
+fi > {CDS_OPTIONS_DIR}/cds
+"""
+
+
+def cds_enabled(spec: Mapping) -> bool:
+    return "classDataSharing" in spec.get("jvm", {})
+
+
+def cds_options() -> List[str]:
+    return [f"-XX:VMOptionsFile={CDS_OPTIONS_DIR}/cds"]
+
+
+def cds_init_container(route_name: str, spec: Mapping, image: str) -> Mapping:
+    """
+    Returns the init container preparing a route's class data sharing archive, on the PersistentVolumeClaim shared
+    by the route's pods.
+
+    An archive is only valid for the classes it was recorded with, so archives are keyed by the integration image,
+    the route ConfigMap and the JVM settings. The first pod started for a key records the archive when its JVM exits
+    (on a graceful shutdown), and later pods use it. Recordings are named after the pod and promoted by the next
+    init container, so pods sharing the claim never write the same file. The JVM falls back to starting without an
+    archive if it is invalid.
+    """
+    key_inputs = json.dumps(
+        [image, spec["routeConfigMap"], spec.get("jvm")],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return {
+        "name": "jvm-cds",
+        "image": image,
+        "command": ["sh", "-c", _CDS_INIT_SCRIPT],
+        "env": [
+            {"name": "CDS_ROUTE", "value": route_name},
+            {
+                "name": "CDS_KEY",
+                "value": hashlib.blake2b(
+                    key_inputs.encode(), digest_size=8
+                ).hexdigest(),
+            },
+        ],
+        "volumeMounts": [
+            {"name": CDS_ARCHIVE_VOLUME, "mountPath": CDS_ARCHIVE_DIR},
+            {"name": CDS_OPTIONS_VOLUME, "mountPath": CDS_OPTIONS_DIR},
+        ],
+    }
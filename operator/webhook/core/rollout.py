@@ -0,0 +1,185 @@
+"""
+Staggered rollouts of integration image changes.
+
+Every IntegrationRoute Deployment runs INTEGRATION_IMAGE, so changing it would roll every route in the cluster at once,
+pulling the new image on every node and starting every JVM at the same time. When enabled, the RolloutScheduler keeps
+the routes still running a previous image on it until their rollout wave is admitted:
+    - routes are split into waves by a hash of their uid, so every webhook worker puts a route in the same wave
+    - wave 0 is admitted when the first route running a previous image is synced. Each following wave is admitted
+      once no route of the admitted waves is still waiting or rolling out (i.e. not yet Ready on the new image), and
+      min_wave_seconds after the previous wave, giving resyncs time to visit the routes of the admitted waves
+    - at most max_concurrent routes roll out at once
+
+A route that does not become Ready on the new image holds back the following waves. Routes that are not synced for
+stall_seconds (e.g. deleted routes) stop holding them back. The waves start over from wave 0 when the target image
+changes, or once no route has been waiting or rolling out for stall_seconds, so every rollout is staggered. The scheduler state is kept per worker process, so with
+multiple server workers or webhook replicas each applies the limits to the routes it syncs.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Dict, Hashable, Mapping, NamedTuple, Optional, Tuple
+
+ROLLOUT_WAVE_CONDITION = "RolloutWave"
+
+
+class RolloutDecision(NamedTuple):
+    # The image the route's Deployment should run
+    image: str
+    # The RolloutWave condition to report, None if the route is not part of a rollout
+    condition: Optional[Mapping[str, str]]
+
+    @property
+    def waiting(self) -> bool:
+        return self.condition is not None and self.condition["status"] == "False"
+
+
+class RolloutScheduler:
+    def __init__(
+        self,
+        waves: int,
+        max_concurrent: int,
+        min_wave_seconds: float,
+        stall_seconds: float,
+        clock=time.monotonic,
+    ) -> None:
+        self._waves = waves
+        self._max_concurrent = max_concurrent
+        self._min_wave_seconds = min_wave_seconds
+        self._stall_seconds = stall_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # The image being rolled out, None until a rollout starts
+        self._target_image: Optional[str] = None
+        # -1 until a rollout starts
+        self._admitted_wave = -1
+        self._admitted_at = 0.0
+        # Last time a route was waiting or rolling out
+        self._active_at = 0.0
+        # (wave, last synced) of the routes waiting for their wave, and of the admitted routes not yet Ready
+        self._waiting: Dict[Hashable, Tuple[int, float]] = {}
+        self._rolling: Dict[Hashable, Tuple[int, float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._waves > 0
+
+    @property
+    def admitted_wave(self) -> int:
+        return self._admitted_wave
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def rolling(self) -> int:
+        return len(self._rolling)
+
+    def wave_of(self, route_key: Hashable) -> int:
+        digest = hashlib.blake2b(str(route_key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self._waves
+
+    def schedule(
+        self,
+        route_key: Hashable,
+        observed_image: Optional[str],
+        target_image: str,
+        ready: bool,
+    ) -> RolloutDecision:
+        """
+        Returns the image a route's Deployment should run, given the image it currently runs (None if it has no
+        Deployment yet) and whether it is Ready on that image.
+        """
+        with self._lock:
+            now = self._clock()
+
+            if target_image != self._target_image:
+                self._reset(target_image)
+
+            if observed_image is None or observed_image == target_image:
+                self._waiting.pop(route_key, None)
+                rolling = self._rolling.pop(route_key, None)
+                if rolling is None or ready:
+                    return RolloutDecision(target_image, None)
+                self._rolling[route_key] = (rolling[0], now)
+                self._active_at = now
+                return RolloutDecision(
+                    target_image, _admitted(rolling[0], target_image)
+                )
+
+            wave = self.wave_of(route_key)
+            self._expire_stalled(now)
+            if route_key in self._rolling:
+                # Admitted, but the new image was not applied yet
+                self._rolling[route_key] = (wave, now)
+                self._active_at = now
+                return RolloutDecision(target_image, _admitted(wave, target_image))
+
+            if (
+                not self._waiting
+                and not self._rolling
+                and now - self._active_at > self._stall_seconds
+            ):
+                # The previous rollout to this image is over, e.g. a route was reverted to a previous image
+                self._admitted_wave = -1
+            self._active_at = now
+            if self._admitted_wave < 0:
+                self._admitted_wave = 0
+                self._admitted_at = now
+            self._waiting[route_key] = (wave, now)
+            self._advance(now)
+
+            if (
+                wave <= self._admitted_wave
+                and len(self._rolling) < self._max_concurrent
+            ):
+                del self._waiting[route_key]
+                self._rolling[route_key] = (wave, now)
+                return RolloutDecision(target_image, _admitted(wave, target_image))
+
+            return RolloutDecision(
+                observed_image,
+                {
+                    "type": ROLLOUT_WAVE_CONDITION,
+                    "status": "False",
+                    "reason": "WaitingForWave",
+                    "message": f"Waiting for rollout wave {wave} to roll out image {target_image}",
+                },
+            )
+
+    def _reset(self, target_image: str) -> None:
+        self._target_image = target_image
+        self._admitted_wave = -1
+        # Routes waiting for or rolling out a previous target image
+        self._waiting.clear()
+        self._rolling.clear()
+
+    def _expire_stalled(self, now: float) -> None:
+        for routes in (self._waiting, self._rolling):
+            for key, (_, last_synced) in list(routes.items()):
+                if now - last_synced > self._stall_seconds:
+                    del routes[key]
+
+    def _advance(self, now: float) -> None:
+        while (
+            self._admitted_wave < self._waves - 1
+            and now - self._admitted_at >= self._min_wave_seconds
+            and not any(
+                wave <= self._admitted_wave
+                for routes in (self._waiting, self._rolling)
+                for wave, _ in routes.values()
+            )
+        ):
+            self._admitted_wave += 1
+            self._admitted_at = now
+
+
+def _admitted(wave: int, image: str) -> Mapping[str, str]:
+    return {
+        "type": ROLLOUT_WAVE_CONDITION,
+        "status": "True",
+        "reason": "WaveAdmitted",
+        "message": f"Rolling out image {image} in wave {wave}",
+    }
@@ -1,9 +1,21 @@
+import functools
+import hashlib
 import json
+import sys
 from datetime import datetime, timezone
 from pathlib import PurePosixPath
-from typing import List, Mapping, Optional, Any
+from typing import Any, Hashable, List, Mapping, NamedTuple, Optional, Tuple
 
 from webhook import config as cfg
+from webhook import deadlines
+from webhook import metrics
+from webhook.profiling import span
+from webhook.cache import LRUCache, retained_size
+from webhook.admission import PRIORITY_HIGH, PRIORITY_LOW
+from webhook.decoding import ANY, EACH, OBJECT_METADATA_SHAPE
+from webhook.encoding import PreEncodedList
+from webhook.core import jvm
+from webhook.core.rollout import RolloutDecision, RolloutScheduler
 
 SECRETS_ROOT = "/etc/secrets"
 
@@ -15,6 +27,101 @@ HTTPS_PORT = 8443
 
 HTTP_PORT = 8080
 
+JDK_JAVA_OPTIONS_ENV_NAME = "JDK_JAVA_OPTIONS"
+
+# The parts of a sync request read by sync(), see webhook.decoding
+REQUEST_SHAPE = {
+    "parent": {"metadata": OBJECT_METADATA_SHAPE, "spec": ANY, "status": ANY},
+    "children": {
+        "Deployment.apps/v1": {
+            EACH: {
+                "metadata": {"generation": ANY},
+                "spec": {"replicas": ANY, "template": {"spec": {"containers": ANY}}},
+                "status": ANY,
+            }
+        }
+    },
+}
+
+_children_cache = LRUCache(
+    max_entries=cfg.SYNC_CACHE_MAX_ENTRIES,
+    max_bytes=cfg.SYNC_CACHE_MAX_BYTES,
+    ttl_seconds=cfg.SYNC_CACHE_TTL_SECONDS,
+)
+
+metrics.register_cache("sync_children", _children_cache)
+
+# Last desired state per route, keyed by (namespace, name)
+_steady_state_index = LRUCache(max_entries=cfg.SYNC_FASTPATH_MAX_ENTRIES)
+
+SYNC_FASTPATH = metrics.Counter(
+    "webhook_sync_fastpath_total",
+    "Sync requests by steady-state fast path result (hit, changed, miss)",
+    ["result"],
+)
+
+
+class _TrackedStatus(NamedTuple):
+    # The inputs the status was computed from, and the status itself
+    inputs: tuple
+    status: Mapping
+
+
+# Last status emitted per route, see _compute_status
+_status_index = LRUCache(max_entries=cfg.SYNC_STATUS_INDEX_MAX_ENTRIES)
+
+READY_CONDITIONS = metrics.Counter(
+    "webhook_sync_ready_condition_total",
+    "Ready conditions emitted by source (parent, tracked, new). 'new' conditions are readiness transitions",
+    ["source"],
+)
+
+# Consecutive syncs of each route found steady, keyed like _status_index, see _resync_after
+_steady_streaks = LRUCache(max_entries=cfg.SYNC_STATUS_INDEX_MAX_ENTRIES)
+
+# Past this many steady syncs, the backoff is at its cap for any setting
+_MAX_BACKOFF_STEPS = 32
+
+RESYNC_AFTER = metrics.Histogram(
+    "webhook_sync_resync_after_seconds",
+    "resyncAfterSeconds returned by /sync, when adaptive resyncs are enabled",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+
+_rollout_scheduler = RolloutScheduler(
+    waves=cfg.SYNC_ROLLOUT_WAVES,
+    max_concurrent=cfg.SYNC_ROLLOUT_MAX_CONCURRENT,
+    min_wave_seconds=cfg.SYNC_ROLLOUT_WAVE_MIN_SECONDS,
+    stall_seconds=cfg.SYNC_ROLLOUT_STALL_SECONDS,
+)
+
+metrics.CallbackMetric(
+    "webhook_rollout_admitted_wave",
+    "Highest admitted wave of the image rollout, -1 before a rollout starts",
+    "gauge",
+    lambda: _rollout_scheduler.admitted_wave,
+)
+metrics.CallbackMetric(
+    "webhook_rollout_waiting_routes",
+    "Routes kept on a previous image until their rollout wave is admitted",
+    "gauge",
+    lambda: _rollout_scheduler.waiting,
+)
+metrics.CallbackMetric(
+    "webhook_rollout_rolling_routes",
+    "Routes rolling out the integration image that are not Ready yet",
+    "gauge",
+    lambda: _rollout_scheduler.rolling,
+)
+
+_DEFAULT_AUTOSCALING_METRIC = {
+    "type": "Resource",
+    "resource": {
+        "name": "cpu",
+        "target": {"type": "Utilization", "averageUtilization": 80},
+    },
+}
+
 ACTUATOR_CONFIG_BLOCK = {
     "management": {
         "endpoint": {"health": {"enabled": True}, "prometheus": {"enabled": True}},
@@ -23,6 +130,66 @@ ACTUATOR_CONFIG_BLOCK = {
 }
 
 
+# The actuator config's JSON members, without the enclosing braces
+_ACTUATOR_CONFIG_JSON = json.dumps(ACTUATOR_CONFIG_BLOCK)[1:-1]
+
+
+class _CompiledPodTemplate(NamedTuple):
+    scheme: str
+    management_port: int
+    container: Mapping[str, Any]
+    probes: Mapping[str, Mapping]
+    # The probes of routes using class data sharing, see webhook.core.jvm
+    cds_probes: Mapping[str, Mapping]
+    service_port: Mapping[str, Any]
+
+
+@functools.lru_cache(maxsize=8)
+def _compile_pod_template(
+    has_tls: bool, integration_image: str
+) -> _CompiledPodTemplate:
+    """
+    Builds the parts of the integration route children that only depend on TLS being enabled and on the image.
+
+    The probes and service port are shared by every generated Deployment and Service, so they must not be mutated
+    (like the cached children, generated children are read-only). The container skeleton is copied for each route.
+    """
+    scheme = _get_scheme(has_tls)
+    management_port = _get_management_port(has_tls)
+
+    def probe(path: str, failure_threshold: int) -> Mapping[str, Any]:
+        return {
+            "httpGet": {
+                "path": path,
+                "port": management_port,
+                "scheme": scheme.upper(),
+            },
+            "failureThreshold": failure_threshold,
+            "timeoutSeconds": 3,
+        }
+
+    probes = {
+        "livenessProbe": probe("/actuator/health/liveness", 3),
+        "readinessProbe": probe("/actuator/health/readiness", 2),
+        "startupProbe": probe("/actuator/health/liveness", 12),
+    }
+
+    return _CompiledPodTemplate(
+        scheme=scheme,
+        management_port=management_port,
+        container={"name": "integration-app", "image": integration_image},
+        probes=probes,
+        cds_probes=probes
+        | {"startupProbe": probes["startupProbe"] | jvm.CDS_STARTUP_PROBE},
+        service_port={
+            "name": scheme,
+            "port": management_port,
+            "protocol": "TCP",
+            "targetPort": management_port,
+        },
+    )
+
+
 class VolumeConfig:
     """
     Handles creating a pod's volumes and volumeMounts based on the following IntegrationRoute inputs:
@@ -39,6 +206,7 @@ class VolumeConfig:
         - persistentVolumeClaims
         - tls
         - services
+        - jvm
     """
 
     _route_vol_name = "integration-route-config"
@@ -51,7 +219,9 @@ class VolumeConfig:
         self._pvcs = parent_spec.get("persistentVolumeClaims", [])
         self._config_maps = parent_spec.get("configMaps", [])
         self._tls_config = parent_spec.get("tls")
+        self._cds_config = parent_spec.get("jvm", {}).get("classDataSharing")
 
+    @span
     def get_volumes(self) -> List[Mapping]:
         volumes = [
             {
@@ -115,8 +285,20 @@ class VolumeConfig:
                     }
                 )
 
+        if self._cds_config:
+            volumes += [
+                {
+                    "name": jvm.CDS_ARCHIVE_VOLUME,
+                    "persistentVolumeClaim": {
+                        "claimName": self._cds_config["claimName"]
+                    },
+                },
+                {"name": jvm.CDS_OPTIONS_VOLUME, "emptyDir": {}},
+            ]
+
         return volumes
 
+    @span
     def get_mounts(self) -> List[dict]:
         volume_mounts = [
             {
@@ -167,6 +349,17 @@ class VolumeConfig:
                     }
                 )
 
+        if self._cds_config:
+            volume_mounts += [
+                # Writable, for the JVM to record an archive when it exits
+                {"name": jvm.CDS_ARCHIVE_VOLUME, "mountPath": jvm.CDS_ARCHIVE_DIR},
+                {
+                    "name": jvm.CDS_OPTIONS_VOLUME,
+                    "readOnly": True,
+                    "mountPath": jvm.CDS_OPTIONS_DIR,
+                },
+            ]
+
         return volume_mounts
 
 
@@ -247,11 +440,10 @@ def _spring_app_config_env_var(parent) -> Optional[Mapping]:
         app_config["spring"]["config.import"] = "kubernetes:"
         app_config["spring"]["cloud"] = cloud_config
 
-    app_config.update(ACTUATOR_CONFIG_BLOCK)
-
+    # Same as json.dumps(app_config | ACTUATOR_CONFIG_BLOCK), splicing in the pre-encoded actuator config
     return {
         "name": "SPRING_APPLICATION_JSON",
-        "value": json.dumps(app_config),
+        "value": f"{json.dumps(app_config)[:-1]}, {_ACTUATOR_CONFIG_JSON}}}",
     }
 
 
@@ -286,39 +478,77 @@ def _get_java_jdk_options(tls) -> Optional[Mapping[str, str]]:
     truststore_password = "changeit" if truststore_type == "jks" else ""
 
     return {
-        "name": "JDK_JAVA_OPTIONS",
+        "name": JDK_JAVA_OPTIONS_ENV_NAME,
         "value": f"-Djavax.net.ssl.trustStore={str(PurePosixPath(TRUSTSTORE_PATH, truststore[truststore_type]['key']))} -Djavax.net.ssl.trustStorePassword={truststore_password} -Djavax.net.ssl.trustStoreType={truststore_type.upper()}",
     }
 
 
+def _merge_jdk_java_options(spec, user_env) -> Optional[Mapping[str, str]]:
+    """
+    Merges the JVM tuning profile's options, the class data sharing options, the truststore options and a
+    user-supplied JDK_JAVA_OPTIONS value, in that order so later options take precedence. Returns None without any
+    generated options, leaving a user-supplied value as is. A user-supplied JDK_JAVA_OPTIONS set with valueFrom
+    cannot be merged, and replaces the generated options.
+    """
+    options = []
+
+    if profile := spec.get("jvm", {}).get("profile"):
+        options += jvm.tuning_options(profile, spec.get("resources", {}).get("limits"))
+
+    if jvm.cds_enabled(spec):
+        options += jvm.cds_options()
+
+    if tls := spec.get("tls"):
+        if truststore_options := _get_java_jdk_options(tls):
+            options.append(truststore_options["value"])
+
+    if not options:
+        return None
+
+    user_options = next(
+        (e for e in user_env if e["name"] == JDK_JAVA_OPTIONS_ENV_NAME), None
+    )
+    if user_options is not None and "value" in user_options:
+        options.append(user_options["value"])
+
+    return {"name": JDK_JAVA_OPTIONS_ENV_NAME, "value": " ".join(options)}
+
+
 def _generate_container_env_vars(parent) -> List[Mapping[str, str]]:
     env_vars = []
+    spec = parent["spec"]
+    user_env = spec.get("env", [])
 
     if spring_app_config := _spring_app_config_env_var(parent):
         env_vars.append(spring_app_config)
 
-    if tls := parent["spec"].get("tls"):
-        if jdk_options := _get_java_jdk_options(tls):
-            env_vars.append(jdk_options)
+    if jdk_options := _merge_jdk_java_options(spec, user_env):
+        env_vars.append(jdk_options)
+        # The user-supplied value was merged in
+        user_env = [
+            e
+            for e in user_env
+            if e["name"] != JDK_JAVA_OPTIONS_ENV_NAME or "value" not in e
+        ]
 
+    if tls := spec.get("tls"):
         if keystore_password_env := _get_keystore_password_env(tls):
             env_vars.append(keystore_password_env)
 
     env_vars.append(_service_name_env_var(parent))
 
-    env_vars.extend(parent["spec"].get("env", []))
+    env_vars.extend(user_env)
 
     return env_vars
 
 
+@span
 def _create_pod_template(parent, labels, integration_image) -> Mapping[str, Any]:
 
     vol_config = VolumeConfig(parent["spec"])
 
-    has_tls = _has_tls(parent)
-
-    scheme = _get_scheme(has_tls).upper()
-    management_port = _get_management_port(has_tls)
+    compiled = _compile_pod_template(_has_tls(parent), integration_image)
+    cds_enabled = jvm.cds_enabled(parent["spec"])
 
     pod_template = {
         "metadata": {"labels": labels},
@@ -326,42 +556,22 @@ def _create_pod_template(parent, labels, integration_image) -> Mapping[str, Any]
             "serviceAccountName": "integrationroute-service",
             "containers": [
                 {
-                    "name": "integration-app",
-                    "image": integration_image,
+                    **compiled.container,
                     "volumeMounts": vol_config.get_mounts(),
-                    "livenessProbe": {
-                        "httpGet": {
-                            "path": "/actuator/health/liveness",
-                            "port": management_port,
-                            "scheme": scheme,
-                        },
-                        "failureThreshold": 3,
-                        "timeoutSeconds": 3,
-                    },
-                    "readinessProbe": {
-                        "httpGet": {
-                            "path": "/actuator/health/readiness",
-                            "port": management_port,
-                            "scheme": scheme,
-                        },
-                        "failureThreshold": 2,
-                        "timeoutSeconds": 3,
-                    },
-                    "startupProbe": {
-                        "httpGet": {
-                            "path": "/actuator/health/liveness",
-                            "port": management_port,
-                            "scheme": scheme,
-                        },
-                        "failureThreshold": 12,
-                        "timeoutSeconds": 3,
-                    },
+                    **(compiled.cds_probes if cds_enabled else compiled.probes),
                 },
             ],
             "volumes": vol_config.get_volumes(),
         },
     }
 
+    if cds_enabled:
+        pod_template["spec"]["initContainers"] = [
+            jvm.cds_init_container(
+                parent["metadata"]["name"], parent["spec"], integration_image
+            )
+        ]
+
     annotations = parent["spec"].get("annotations")
     if annotations:
         pod_template["metadata"]["annotations"] = annotations
@@ -379,7 +589,7 @@ def _create_pod_template(parent, labels, integration_image) -> Mapping[str, Any]
     return pod_template
 
 
-def _new_deployment(parent):
+def _new_deployment(parent, integration_image: Optional[str] = None):
     parent_metadata = parent["metadata"]
 
     autogenerated_labels = {
@@ -404,22 +614,116 @@ def _new_deployment(parent):
                     "app.kubernetes.io/name": labels["app.kubernetes.io/name"]
                 }
             },
-            "replicas": parent["spec"]["replicas"],
             "template": _create_pod_template(
-                parent, labels, cfg.INTEGRATION_CONTAINER_IMAGE
+                parent, labels, integration_image or cfg.INTEGRATION_CONTAINER_IMAGE
             ),
         },
     }
 
+    # Left to the autoscaler otherwise
+    if "autoscaling" not in parent["spec"]:
+        deployment["spec"]["replicas"] = parent["spec"]["replicas"]
+
     return deployment
 
 
+def _new_autoscaler(parent) -> Mapping:
+    """
+    Returns the HorizontalPodAutoscaler scaling the route's Deployment, or the KEDA ScaledObject when the route sets
+    autoscaling.keda (KEDA then manages the HorizontalPodAutoscaler itself). Without any target, the CPU utilization
+    target defaults to 80%.
+    """
+    parent_metadata = parent["metadata"]
+    autoscaling = parent["spec"]["autoscaling"]
+    min_replicas, max_replicas = _autoscaling_bounds(autoscaling)
+    resource_targets = [
+        (resource, autoscaling[field])
+        for resource, field in (
+            ("cpu", "targetCPUUtilization"),
+            ("memory", "targetMemoryUtilization"),
+        )
+        if field in autoscaling
+    ]
+    scale_target = {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "name": parent_metadata["name"],
+    }
+    metadata = {
+        "name": parent_metadata["name"],
+        "labels": {"integration-route": parent_metadata["name"]},
+    }
+
+    if keda := autoscaling.get("keda"):
+        scaled_object = {
+            "apiVersion": "keda.sh/v1alpha1",
+            "kind": "ScaledObject",
+            "metadata": metadata,
+            "spec": {
+                "scaleTargetRef": scale_target,
+                "minReplicaCount": min_replicas,
+                "maxReplicaCount": max_replicas,
+                "triggers": [
+                    {
+                        "type": resource,
+                        "metricType": "Utilization",
+                        "metadata": {"value": str(target)},
+                    }
+                    for resource, target in resource_targets
+                ]
+                + keda.get("triggers", []),
+            },
+        }
+        for field in ("pollingInterval", "cooldownPeriod"):
+            if field in keda:
+                scaled_object["spec"][field] = keda[field]
+        return scaled_object
+
+    metrics = [
+        {
+            "type": "Resource",
+            "resource": {
+                "name": resource,
+                "target": {"type": "Utilization", "averageUtilization": target},
+            },
+        }
+        for resource, target in resource_targets
+    ] + [
+        {
+            "type": "Pods",
+            "pods": {
+                "metric": {"name": pod_metric["name"]},
+                "target": {
+                    "type": "AverageValue",
+                    "averageValue": pod_metric["averageValue"],
+                },
+            },
+        }
+        for pod_metric in autoscaling.get("podMetrics", [])
+    ]
+
+    return {
+        "apiVersion": "autoscaling/v2",
+        "kind": "HorizontalPodAutoscaler",
+        "metadata": metadata,
+        "spec": {
+            "scaleTargetRef": scale_target,
+            "minReplicas": min_replicas,
+            "maxReplicas": max_replicas,
+            "metrics": metrics or [_DEFAULT_AUTOSCALING_METRIC],
+        },
+    }
+
+
+def _autoscaling_bounds(autoscaling: Mapping) -> Tuple[int, int]:
+    min_replicas = autoscaling.get("minReplicas", 1)
+    return min_replicas, max(autoscaling["maxReplicas"], min_replicas)
+
+
 def _new_actuator_service(parent):
     parent_metadata = parent["metadata"]
 
-    has_tls = _has_tls(parent)
-    scheme = _get_scheme(has_tls)
-    management_port = _get_management_port(has_tls)
+    compiled = _compile_pod_template(_has_tls(parent), cfg.INTEGRATION_CONTAINER_IMAGE)
 
     service = {
         "apiVersion": "v1",
@@ -432,14 +736,7 @@ def _new_actuator_service(parent):
             "name": f'{parent_metadata["name"]}-actuator',
         },
         "spec": {
-            "ports": [
-                {
-                    "name": scheme,
-                    "port": management_port,
-                    "protocol": "TCP",
-                    "targetPort": management_port,
-                }
-            ],
+            "ports": [compiled.service_port],
             "selector": {"app.kubernetes.io/name": parent_metadata["name"]},
         },
     }
@@ -447,22 +744,34 @@ def _new_actuator_service(parent):
     return service
 
 
+@span
 def _compute_status(parent: Mapping, children: Mapping) -> Mapping:
-    route_name = parent["metadata"]["name"]
-    expected_replicas = parent["spec"]["replicas"]
+    """
+    Computes the route status from the observed Deployment status. Autoscaled routes also report their min, max and
+    current replicas, the current replicas being the Deployment's replicas as set by the autoscaler.
+
+    The last status emitted for each route is tracked, so that a stale parent status (Metacontroller's informer
+    may not have seen the previous status update yet) does not cause a new Ready condition with a new
+    lastTransitionTime to be generated. A new Ready condition is only created on a real readiness transition, and
+    the previous status object is returned as is while none of its inputs changed.
+    """
+    metadata = parent["metadata"]
+    route_name = metadata["name"]
+    deployment = children["Deployment.apps/v1"].get(route_name)
+    expected_replicas = _expected_replicas(parent, deployment)
+    autoscaling_status = _autoscaling_status(parent, expected_replicas)
 
     init_status = {
         "expectedReplicas": expected_replicas,
         "readyReplicas": 0,
         "runningReplicas": 0,
+        **autoscaling_status,
     }
 
-    deployments = children["Deployment.apps/v1"]
-
-    if route_name not in deployments:
+    if deployment is None:
         return init_status
 
-    deployment_status = deployments[route_name].get("status")
+    deployment_status = deployment.get("status")
 
     if not deployment_status:
         return init_status
@@ -473,33 +782,106 @@ def _compute_status(parent: Mapping, children: Mapping) -> Mapping:
         c for c in deployment_status["conditions"] if c["type"] == "Available"
     ]
 
-    ready_conditions = [
-        _get_status_ready_condition(
-            parent.get("status", {}), expected_replicas == ready_replicas
-        )
-    ]
+    route_key = _status_index_key(metadata)
+    tracked = _status_index.get(route_key) if _status_index.enabled else None
+    last_ready_condition = tracked.status["conditions"][-1] if tracked else None
 
-    return {
+    ready_condition = _get_status_ready_condition(
+        parent.get("status", {}),
+        expected_replicas == ready_replicas,
+        last_ready_condition,
+    )
+
+    inputs = (
+        expected_replicas,
+        ready_replicas,
+        deployment_status.get("replicas", 0),
+        available_conditions,
+        autoscaling_status,
+    )
+    # The Ready condition is compared by value, as it may be an equal copy read back from the parent status
+    if tracked and tracked.inputs == inputs and ready_condition == last_ready_condition:
+        return tracked.status
+
+    status = {
         "expectedReplicas": expected_replicas,
         "readyReplicas": ready_replicas,
         "runningReplicas": deployment_status.get("replicas", 0),
-        "conditions": available_conditions + ready_conditions,
+        **autoscaling_status,
+        "conditions": available_conditions + [ready_condition],
     }
+    _status_index.put(route_key, _TrackedStatus(inputs, status))
+    return status
+
+
+def _expected_replicas(parent: Mapping, deployment: Optional[Mapping]) -> int:
+    """The spec's replicas, or for autoscaled routes the observed Deployment's replicas within the bounds."""
+    autoscaling = parent["spec"].get("autoscaling")
+    if not autoscaling:
+        return parent["spec"]["replicas"]
 
+    min_replicas, max_replicas = _autoscaling_bounds(autoscaling)
+    replicas = (deployment or {}).get("spec", {}).get("replicas")
+    if replicas is None:
+        return min_replicas
+    return min(max(replicas, min_replicas), max_replicas)
 
-def _get_status_ready_condition(parent_status: Mapping, is_ready: bool) -> Mapping:
+
+def _autoscaling_status(parent: Mapping, current_replicas: int) -> Mapping:
+    autoscaling = parent["spec"].get("autoscaling")
+    if not autoscaling:
+        return {}
+
+    min_replicas, max_replicas = _autoscaling_bounds(autoscaling)
+    return {
+        "minReplicas": min_replicas,
+        "maxReplicas": max_replicas,
+        "currentReplicas": current_replicas,
+    }
+
+
+def _status_index_key(metadata: Mapping) -> Hashable:
+    # The uid distinguishes a route from an earlier, deleted route with the same name
+    return metadata.get("uid") or (metadata.get("namespace"), metadata["name"])
+
+
+def _get_status_ready_condition(
+    parent_status: Mapping,
+    is_ready: bool,
+    last_ready_condition: Optional[Mapping] = None,
+) -> Mapping:
     condition_type = "Ready"
 
-    ready_condition_list = (
-        [c for c in parent_status["conditions"] if c["type"] == condition_type]
-        if parent_status
-        else []
+    ready_condition = next(
+        (
+            c
+            for c in (parent_status or {}).get("conditions", [])
+            if c["type"] == condition_type
+        ),
+        None,
     )
-
-    ready_condition = ready_condition_list[0] if ready_condition_list else None
-    if ready_condition and ready_condition.get("status") == str(is_ready):
+    parent_current = ready_condition and ready_condition.get("status") == str(is_ready)
+    if (
+        parent_current
+        and last_ready_condition
+        and last_ready_condition.get("status") != str(is_ready)
+    ):
+        # The readiness flipped since the last emitted condition, so a parent condition older than it predates the
+        # flip (e.g. True -> False -> True, read from a stale parent status). The timestamps are both in the format
+        # generated below, so they compare as strings.
+        parent_current = ready_condition.get(
+            "lastTransitionTime", ""
+        ) >= last_ready_condition.get("lastTransitionTime", "")
+
+    if parent_current:
+        READY_CONDITIONS.labels("parent").inc()
         return ready_condition
 
+    if last_ready_condition and last_ready_condition.get("status") == str(is_ready):
+        READY_CONDITIONS.labels("tracked").inc()
+        return last_ready_condition
+
+    READY_CONDITIONS.labels("new").inc()
     updated_condition = {
         "lastTransitionTime": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
         "status": str(is_ready),
@@ -520,6 +902,102 @@ def _get_status_ready_condition(parent_status: Mapping, is_ready: bool) -> Mappi
     return updated_condition
 
 
+def _is_steady(status: Mapping) -> bool:
+    """A route is steady once all of its replicas are ready and running, and all of its conditions are True."""
+    expected_replicas = status["expectedReplicas"]
+    conditions = status.get("conditions")
+    return (
+        bool(conditions)
+        and status["readyReplicas"] == expected_replicas
+        and status["runningReplicas"] == expected_replicas
+        and all(c.get("status") == "True" for c in conditions)
+    )
+
+
+@span
+def _resync_after(metadata: Mapping, status: Mapping) -> float:
+    """
+    Returns the resyncAfterSeconds for a route with the given status: SYNC_RESYNC_ROLLOUT_SECONDS while it is not
+    steady, then exponentially backed off from SYNC_RESYNC_STEADY_BASE_SECONDS up to SYNC_RESYNC_STEADY_MAX_SECONDS
+    for each consecutive steady sync. The delay is reduced by up to a SYNC_RESYNC_JITTER fraction, derived from the
+    route and backoff step so it is stable across workers, to spread out the resyncs of routes that became steady
+    together.
+    """
+    route_key = _status_index_key(metadata)
+    if not _is_steady(status):
+        _steady_streaks.put(route_key, 0)
+        return cfg.SYNC_RESYNC_ROLLOUT_SECONDS
+
+    streak = _steady_streaks.get(route_key) or 0
+    _steady_streaks.put(route_key, min(streak + 1, _MAX_BACKOFF_STEPS))
+
+    delay = min(
+        cfg.SYNC_RESYNC_STEADY_BASE_SECONDS * 2**streak,
+        cfg.SYNC_RESYNC_STEADY_MAX_SECONDS,
+    )
+    digest = hashlib.blake2b(f"{route_key}:{streak}".encode(), digest_size=8).digest()
+    jitter = cfg.SYNC_RESYNC_JITTER * int.from_bytes(digest, "big") / 2**64
+    return round(delay * (1 - jitter), 3)
+
+
+def _with_resync_after(parent: Mapping, desired_state: Mapping) -> Mapping:
+    if not cfg.SYNC_RESYNC_ADAPTIVE:
+        return desired_state
+    resync_after = _resync_after(parent["metadata"], desired_state["status"])
+    RESYNC_AFTER.observe(resync_after)
+    return {**desired_state, "resyncAfterSeconds": resync_after}
+
+
+def _schedule_rollout(parent: Mapping, children: Mapping) -> RolloutDecision:
+    """
+    Picks the image of the route's Deployment, see webhook.core.rollout. The observed Deployment is Ready once its
+    status is up to date and all of its expected replicas are updated and ready.
+    """
+    metadata = parent["metadata"]
+    deployment = children["Deployment.apps/v1"].get(metadata["name"]) or {}
+    pod_spec = deployment.get("spec", {}).get("template", {}).get("spec", {})
+    containers = pod_spec.get("containers") or [{}]
+
+    expected_replicas = _expected_replicas(parent, deployment)
+    status = deployment.get("status") or {}
+    ready = status.get("observedGeneration") == deployment.get("metadata", {}).get(
+        "generation"
+    ) and all(
+        status.get(field, 0) == expected_replicas
+        for field in ("replicas", "updatedReplicas", "readyReplicas")
+    )
+
+    return _rollout_scheduler.schedule(
+        _status_index_key(metadata),
+        containers[0].get("image"),
+        cfg.INTEGRATION_CONTAINER_IMAGE,
+        ready,
+    )
+
+
+def _with_rollout(
+    desired_state: Mapping, rollout: Optional[RolloutDecision]
+) -> Mapping:
+    """
+    Reports the route's RolloutWave condition while it is part of a rollout. Routes waiting for their wave are
+    resynced after SYNC_RESYNC_ROLLOUT_SECONDS, as nothing else triggers a sync once it is admitted.
+    """
+    if rollout is None or rollout.condition is None:
+        return desired_state
+
+    status = desired_state["status"]
+    desired_state = {
+        **desired_state,
+        "status": {
+            **status,
+            "conditions": [*status.get("conditions", []), rollout.condition],
+        },
+    }
+    if rollout.waiting:
+        desired_state["resyncAfterSeconds"] = cfg.SYNC_RESYNC_ROLLOUT_SECONDS
+    return desired_state
+
+
 def _has_tls(parent) -> bool:
     return "tls" in parent["spec"] and "keystore" in parent["spec"]["tls"]
 
@@ -532,17 +1010,145 @@ def _get_management_port(has_tls) -> int:
     return HTTPS_PORT if has_tls else HTTP_PORT
 
 
-def _gen_children(parent) -> List[Mapping]:
-    return [_new_deployment(parent), _new_actuator_service(parent)]
+def _gen_children(parent, integration_image: Optional[str] = None) -> List[Mapping]:
+    children = [
+        _new_deployment(parent, integration_image),
+        _new_actuator_service(parent),
+    ]
+    if "autoscaling" in parent["spec"]:
+        children.append(_new_autoscaler(parent))
+    return children
+
+
+def _children_cache_key(parent, integration_image: Optional[str] = None) -> str:
+    # Only the inputs read by _new_deployment, _new_actuator_service and _new_autoscaler are part of the key
+    metadata = parent["metadata"]
+    fingerprint = json.dumps(
+        [
+            parent["spec"],
+            metadata["name"],
+            metadata.get("namespace"),
+            integration_image or cfg.INTEGRATION_CONTAINER_IMAGE,
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest()
+
+
+def _get_children(parent, integration_image: Optional[str] = None) -> List[Mapping]:
+    if not _children_cache.enabled:
+        return _gen_children(parent, integration_image)
+
+    key = _children_cache_key(parent, integration_image)
+    children = _children_cache.get(key)
+    if children is None:
+        # Encoded once on insertion, the cached bytes are reused by every response containing these children
+        children = PreEncodedList(_gen_children(parent, integration_image))
+        _children_cache.put(
+            key,
+            children,
+            size=retained_size(children) + sys.getsizeof(children.encoded()),
+        )
+    return children
+
+
+def _steady_state_fingerprint(
+    parent, children, integration_image: Optional[str] = None
+) -> Optional[str]:
+    """
+    Fingerprints the inputs of a sync request that the desired state depends on. The parent's resourceVersion
+    changes on any spec, metadata or status update, so together with the observed Deployment status and the
+    integration image it identifies a request that would produce the same desired state as the last one.
+    """
+    metadata = parent["metadata"]
+    resource_version = metadata.get("resourceVersion")
+    if resource_version is None:
+        return None
+
+    deployment = children["Deployment.apps/v1"].get(metadata["name"]) or {}
+    fingerprint = json.dumps(
+        [
+            metadata.get("generation"),
+            resource_version,
+            integration_image or cfg.INTEGRATION_CONTAINER_IMAGE,
+            deployment.get("status"),
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest()
+
+
+def coalescing_key(body: Mapping) -> Optional[Hashable]:
+    """Identifies concurrent sync requests that would produce the same desired state, see webhook.coalescing."""
+    try:
+        parent = body["parent"]
+        fingerprint = _steady_state_fingerprint(parent, body["children"])
+    except (KeyError, TypeError, AttributeError):
+        # Left for sync() to reject
+        return None
+    if fingerprint is None:
+        return None
+    return parent["metadata"].get("uid"), fingerprint
+
+
+def admission_priority(body: Mapping) -> str:
+    """Resyncs of Ready routes are low priority, see webhook.admission."""
+    try:
+        conditions = body["parent"].get("status", {}).get("conditions", [])
+        ready = any(c["type"] == "Ready" and c["status"] == "True" for c in conditions)
+    except (KeyError, TypeError, AttributeError):
+        return PRIORITY_HIGH
+    return PRIORITY_LOW if ready else PRIORITY_HIGH
 
 
 def sync(body) -> Mapping:
     # Request API at https://metacontroller.github.io/metacontroller/api/compositecontroller.html#sync-hook-request
     parent = body["parent"]
     curr_children = body["children"]
+
+    rollout = None
+    integration_image = None
+    if _rollout_scheduler.enabled:
+        rollout = _schedule_rollout(parent, curr_children)
+        integration_image = rollout.image
+
+    fingerprint = None
+    if _steady_state_index.enabled:
+        fingerprint = _steady_state_fingerprint(
+            parent, curr_children, integration_image
+        )
+
+    if fingerprint is not None:
+        route_key = (parent["metadata"].get("namespace"), parent["metadata"]["name"])
+        if (indexed := _steady_state_index.get(route_key)) is None:
+            SYNC_FASTPATH.labels("miss").inc()
+        elif indexed[0] == fingerprint:
+            SYNC_FASTPATH.labels("hit").inc()
+            return _with_resync_after(parent, _with_rollout(indexed[1], rollout))
+        else:
+            SYNC_FASTPATH.labels("changed").inc()
+
     # Status can be filled in with useful about the state of managed children
+    with metrics.phase("status"):
+        status = _compute_status(parent, curr_children)
+
+    deadlines.check("generate")
+    with metrics.phase("generate"):
+        children = _get_children(parent, integration_image)
+
     desired_state = {
-        "status": _compute_status(parent, curr_children),
-        "children": _gen_children(parent),
+        "status": status,
+        "children": children,
     }
-    return desired_state
+
+    if fingerprint is not None:
+        _steady_state_index.put(route_key, (fingerprint, desired_state))
+
+    return _with_resync_after(parent, _with_rollout(desired_state, rollout))
+
+
+# Compile both TLS variants for the configured image up front
+_compile_pod_template(False, cfg.INTEGRATION_CONTAINER_IMAGE)
+_compile_pod_template(True, cfg.INTEGRATION_CONTAINER_IMAGE)
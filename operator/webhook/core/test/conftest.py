@@ -5,6 +5,18 @@ from typing import Mapping
 
 import pytest
 
+from webhook.core.sync import _status_index, _steady_streaks
+
+
+@pytest.fixture(autouse=True)
+def clear_status_index():
+    # Tracked statuses would otherwise leak Ready conditions (and steady streaks resync backoffs) between tests
+    _status_index.clear()
+    _steady_streaks.clear()
+    yield
+    _status_index.clear()
+    _steady_streaks.clear()
+
 
 @pytest.fixture()
 def full_route(full_route_load: dict):
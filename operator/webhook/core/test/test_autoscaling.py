@@ -0,0 +1,141 @@
+import pytest
+
+from webhook.core.sync import _compute_status, _gen_children, sync
+
+
+@pytest.fixture()
+def autoscaled_route(full_route):
+    full_route["parent"]["spec"]["autoscaling"] = {"minReplicas": 2, "maxReplicas": 6}
+    return full_route
+
+
+def test_autoscaled_deployment_replicas_unmanaged(autoscaled_route):
+    deployment, _, autoscaler = _gen_children(autoscaled_route["parent"])
+
+    assert "replicas" not in deployment["spec"]
+    assert autoscaler["kind"] == "HorizontalPodAutoscaler"
+
+
+def test_no_autoscaler_without_autoscaling(full_route):
+    children = _gen_children(full_route["parent"])
+
+    assert [c["kind"] for c in children] == ["Deployment", "Service"]
+    assert children[0]["spec"]["replicas"] == 2
+
+
+def test_autoscaler_default_cpu_target(autoscaled_route):
+    autoscaler = _gen_children(autoscaled_route["parent"])[2]
+
+    assert autoscaler["apiVersion"] == "autoscaling/v2"
+    assert autoscaler["metadata"]["name"] == "testroute"
+    assert autoscaler["spec"] == {
+        "scaleTargetRef": {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "name": "testroute",
+        },
+        "minReplicas": 2,
+        "maxReplicas": 6,
+        "metrics": [
+            {
+                "type": "Resource",
+                "resource": {
+                    "name": "cpu",
+                    "target": {"type": "Utilization", "averageUtilization": 80},
+                },
+            }
+        ],
+    }
+
+
+def test_autoscaler_metrics(autoscaled_route):
+    autoscaled_route["parent"]["spec"]["autoscaling"] |= {
+        "targetMemoryUtilization": 70,
+        "podMetrics": [
+            {"name": "http_server_requests_per_second", "averageValue": "50"}
+        ],
+    }
+
+    metrics = _gen_children(autoscaled_route["parent"])[2]["spec"]["metrics"]
+
+    assert metrics == [
+        {
+            "type": "Resource",
+            "resource": {
+                "name": "memory",
+                "target": {"type": "Utilization", "averageUtilization": 70},
+            },
+        },
+        {
+            "type": "Pods",
+            "pods": {
+                "metric": {"name": "http_server_requests_per_second"},
+                "target": {"type": "AverageValue", "averageValue": "50"},
+            },
+        },
+    ]
+
+
+def test_keda_scaled_object(autoscaled_route):
+    queue_trigger = {
+        "type": "rabbitmq",
+        "metadata": {"queueName": "orders", "mode": "QueueLength", "value": "20"},
+    }
+    autoscaled_route["parent"]["spec"]["autoscaling"] |= {
+        "targetCPUUtilization": 60,
+        "keda": {"triggers": [queue_trigger], "cooldownPeriod": 120},
+    }
+
+    scaled_object = _gen_children(autoscaled_route["parent"])[2]
+
+    assert scaled_object["apiVersion"] == "keda.sh/v1alpha1"
+    assert scaled_object["kind"] == "ScaledObject"
+    assert scaled_object["spec"]["minReplicaCount"] == 2
+    assert scaled_object["spec"]["maxReplicaCount"] == 6
+    assert scaled_object["spec"]["cooldownPeriod"] == 120
+    assert "pollingInterval" not in scaled_object["spec"]
+    assert scaled_object["spec"]["triggers"] == [
+        {"type": "cpu", "metricType": "Utilization", "metadata": {"value": "60"}},
+        queue_trigger,
+    ]
+
+
+def test_autoscaled_status_reports_replica_bounds(autoscaled_route):
+    deployment = autoscaled_route["children"]["Deployment.apps/v1"]["testroute"]
+    deployment["spec"] = {"replicas": 3}
+    deployment["status"] |= {"replicas": 3, "readyReplicas": 2}
+
+    status = _compute_status(autoscaled_route["parent"], autoscaled_route["children"])
+
+    assert status["minReplicas"] == 2
+    assert status["maxReplicas"] == 6
+    assert status["currentReplicas"] == 3
+    assert status["expectedReplicas"] == 3
+    assert status["conditions"][-1]["status"] == "False"
+
+
+def test_autoscaled_status_ready_at_current_replicas(autoscaled_route):
+    # The parent spec still asks for 2 replicas, which the autoscaler overrides
+    autoscaled_route["parent"]["spec"]["replicas"] = 1
+    deployment = autoscaled_route["children"]["Deployment.apps/v1"]["testroute"]
+    deployment["spec"] = {"replicas": 2}
+
+    status = sync(autoscaled_route)["status"]
+
+    assert status["currentReplicas"] == 2
+    assert status["conditions"][-1]["status"] == "True"
+
+
+def test_autoscaled_status_without_deployment(autoscaled_route):
+    autoscaled_route["children"]["Deployment.apps/v1"] = {}
+
+    status = _compute_status(autoscaled_route["parent"], autoscaled_route["children"])
+
+    assert status == {
+        "expectedReplicas": 2,
+        "readyReplicas": 0,
+        "runningReplicas": 0,
+        "minReplicas": 2,
+        "maxReplicas": 6,
+        "currentReplicas": 2,
+    }
@@ -0,0 +1,86 @@
+import pytest
+
+from webhook.core.jvm import _parse_quantity, cds_init_container, tuning_options
+
+
+@pytest.mark.parametrize(
+    "quantity, expected",
+    [
+        ("512Mi", 512 * 2**20),
+        ("2Gi", 2 * 2**30),
+        ("1G", 1e9),
+        ("500m", 0.5),
+        ("1.5", 1.5),
+        ("1e3", 1000),
+        (2, 2),
+        ("lots", None),
+        ("12Xi", None),
+        (None, None),
+    ],
+)
+def test_parse_quantity(quantity, expected):
+    assert _parse_quantity(quantity) == expected
+
+
+def test_throughput_profile():
+    options = tuning_options("throughput", {"memory": "4Gi", "cpu": "1500m"})
+
+    assert options == [
+        "-XX:+UseParallelGC",
+        "-XX:MaxRAMPercentage=75.0",
+        "-XX:InitialRAMPercentage=75.0",
+        "-XX:MaxMetaspaceSize=512m",
+        "-XX:ReservedCodeCacheSize=240m",
+        "-XX:ActiveProcessorCount=2",
+    ]
+
+
+def test_latency_profile():
+    options = tuning_options("latency", {"memory": "2Gi"})
+
+    assert options[:2] == ["-XX:+UseG1GC", "-XX:MaxGCPauseMillis=50"]
+    assert "-XX:MaxRAMPercentage=70.0" in options
+    assert not any(o.startswith("-XX:ActiveProcessorCount") for o in options)
+
+
+def test_small_profile_grows_heap_as_needed():
+    options = tuning_options("small", {"memory": "1Gi", "cpu": "250m"})
+
+    assert options == [
+        "-XX:+UseSerialGC",
+        "-XX:MaxRAMPercentage=60.0",
+        "-XX:MaxMetaspaceSize=128m",
+        "-XX:ReservedCodeCacheSize=48m",
+        "-XX:ActiveProcessorCount=1",
+        "-XX:TieredStopAtLevel=1",
+        "-Xss512k",
+    ]
+
+
+@pytest.mark.parametrize(
+    "memory, heap_percent", [("1Gi", 57), ("512Mi", 25), ("64Mi", 25)]
+)
+def test_heap_percent_leaves_room_for_non_heap_memory(memory, heap_percent):
+    options = tuning_options("throughput", {"memory": memory})
+
+    assert f"-XX:MaxRAMPercentage={heap_percent}.0" in options
+
+
+@pytest.mark.parametrize("limits", [None, {}, {"memory": "invalid"}])
+def test_no_memory_limit_keeps_default_heap_sizing(limits):
+    assert tuning_options("latency", limits) == [
+        "-XX:+UseG1GC",
+        "-XX:MaxGCPauseMillis=50",
+    ]
+
+
+def test_cds_key_changes_with_image_and_route_config():
+    spec = {"routeConfigMap": "route-xml", "jvm": {"classDataSharing": {}}}
+
+    def key(image, spec):
+        env = cds_init_container("route", spec, image)["env"]
+        return next(e["value"] for e in env if e["name"] == "CDS_KEY")
+
+    assert key("image:1", spec) == key("image:1", dict(spec, replicas=3))
+    assert key("image:1", spec) != key("image:2", spec)
+    assert key("image:1", spec) != key("image:1", spec | {"routeConfigMap": "other"})
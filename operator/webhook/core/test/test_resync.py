@@ -0,0 +1,96 @@
+import pytest
+
+import webhook.core.sync
+from webhook.core.sync import _resync_after, sync
+
+METADATA = {"name": "route", "namespace": "default", "uid": "1234"}
+
+STEADY_STATUS = {
+    "expectedReplicas": 2,
+    "readyReplicas": 2,
+    "runningReplicas": 2,
+    "conditions": [
+        {"type": "Available", "status": "True"},
+        {"type": "Ready", "status": "True"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def adaptive_resync(monkeypatch):
+    cfg = webhook.core.sync.cfg
+    monkeypatch.setattr(cfg, "SYNC_RESYNC_ADAPTIVE", True)
+    monkeypatch.setattr(cfg, "SYNC_RESYNC_ROLLOUT_SECONDS", 5)
+    monkeypatch.setattr(cfg, "SYNC_RESYNC_STEADY_BASE_SECONDS", 30)
+    monkeypatch.setattr(cfg, "SYNC_RESYNC_STEADY_MAX_SECONDS", 300)
+    monkeypatch.setattr(cfg, "SYNC_RESYNC_JITTER", 0.1)
+    webhook.core.sync._steady_state_index.clear()
+    yield
+    webhook.core.sync._steady_state_index.clear()
+
+
+@pytest.mark.parametrize(
+    "status",
+    [
+        {"expectedReplicas": 2, "readyReplicas": 0, "runningReplicas": 0},
+        STEADY_STATUS | {"readyReplicas": 1},
+        STEADY_STATUS | {"runningReplicas": 3},
+        STEADY_STATUS
+        | {
+            "conditions": [
+                {"type": "Available", "status": "True"},
+                {"type": "Ready", "status": "False"},
+            ]
+        },
+    ],
+)
+def test_rolling_out_route_resyncs_quickly(status):
+    assert _resync_after(METADATA, status) == 5
+    assert _resync_after(METADATA, status) == 5
+
+
+def test_steady_route_backs_off_up_to_cap():
+    delays = [_resync_after(METADATA, STEADY_STATUS) for _ in range(6)]
+
+    for delay, expected in zip(delays, [30, 60, 120, 240, 300, 300]):
+        assert expected * 0.9 <= delay <= expected
+
+
+def test_rollout_resets_backoff():
+    for _ in range(4):
+        _resync_after(METADATA, STEADY_STATUS)
+    _resync_after(METADATA, STEADY_STATUS | {"readyReplicas": 1})
+
+    assert _resync_after(METADATA, STEADY_STATUS) <= 30
+
+
+def test_jitter_is_deterministic_per_route():
+    first = _resync_after(METADATA, STEADY_STATUS)
+    webhook.core.sync._steady_streaks.clear()
+    other_route = _resync_after(METADATA | {"uid": "5678"}, STEADY_STATUS)
+    webhook.core.sync._steady_streaks.clear()
+
+    assert _resync_after(METADATA, STEADY_STATUS) == first
+    assert other_route != first
+
+
+def test_sync_returns_resync_after(full_route):
+    response = sync(full_route)
+
+    assert 27 <= response["resyncAfterSeconds"] <= 30
+
+
+def test_fastpath_hit_still_backs_off(full_route):
+    full_route["parent"]["metadata"]["resourceVersion"] = "1517000"
+
+    first = sync(full_route)
+    second = sync(full_route)
+
+    assert second["children"] is first["children"]
+    assert 54 <= second["resyncAfterSeconds"] <= 60
+
+
+def test_resync_after_disabled(monkeypatch, full_route):
+    monkeypatch.setattr(webhook.core.sync.cfg, "SYNC_RESYNC_ADAPTIVE", False)
+
+    assert "resyncAfterSeconds" not in sync(full_route)
@@ -0,0 +1,238 @@
+import pytest
+
+import webhook.core.sync
+from webhook.core.rollout import ROLLOUT_WAVE_CONDITION, RolloutScheduler
+from webhook.core.sync import sync
+
+OLD_IMAGE = "keip-integration:1"
+
+NEW_IMAGE = "keip-integration:2"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def new_scheduler(clock, waves=3, max_concurrent=10, stall_seconds=600):
+    return RolloutScheduler(
+        waves=waves,
+        max_concurrent=max_concurrent,
+        min_wave_seconds=60,
+        stall_seconds=stall_seconds,
+        clock=clock,
+    )
+
+
+def routes_in_wave(scheduler, wave, count=2):
+    routes = (f"route-{i}" for i in range(1000))
+    return [r for r in routes if scheduler.wave_of(r) == wave][:count]
+
+
+def test_routes_not_rolling_out_are_not_scheduled():
+    scheduler = new_scheduler(FakeClock())
+
+    for observed_image in (None, NEW_IMAGE):
+        decision = scheduler.schedule("route", observed_image, NEW_IMAGE, ready=False)
+        assert decision.image == NEW_IMAGE
+        assert decision.condition is None
+
+    assert scheduler.admitted_wave == -1
+
+
+def test_waves_are_deterministic():
+    scheduler = new_scheduler(FakeClock(), waves=4)
+    other = new_scheduler(FakeClock(), waves=4)
+
+    waves = [scheduler.wave_of(f"route-{i}") for i in range(100)]
+
+    assert waves == [other.wave_of(f"route-{i}") for i in range(100)]
+    assert set(waves) == {0, 1, 2, 3}
+
+
+def test_later_waves_wait():
+    scheduler = new_scheduler(FakeClock())
+    first, second = routes_in_wave(scheduler, 0)[0], routes_in_wave(scheduler, 1)[0]
+
+    admitted = scheduler.schedule(first, OLD_IMAGE, NEW_IMAGE, ready=True)
+    waiting = scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True)
+
+    assert admitted.image == NEW_IMAGE
+    assert admitted.condition["type"] == ROLLOUT_WAVE_CONDITION
+    assert admitted.condition["status"] == "True"
+    assert not admitted.waiting
+    assert waiting.image == OLD_IMAGE
+    assert waiting.condition["reason"] == "WaitingForWave"
+    assert "wave 1" in waiting.condition["message"]
+    assert waiting.waiting
+    assert (scheduler.admitted_wave, scheduler.rolling, scheduler.waiting) == (0, 1, 1)
+
+
+def test_wave_admitted_once_previous_waves_ready():
+    clock = FakeClock()
+    scheduler = new_scheduler(clock)
+    first, second = routes_in_wave(scheduler, 0)[0], routes_in_wave(scheduler, 1)[0]
+    scheduler.schedule(first, OLD_IMAGE, NEW_IMAGE, ready=True)
+
+    # The admitted route is not Ready on the new image yet
+    clock.now = 120
+    scheduler.schedule(first, NEW_IMAGE, NEW_IMAGE, ready=False)
+    assert scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).waiting
+
+    assert scheduler.schedule(first, NEW_IMAGE, NEW_IMAGE, ready=True).condition is None
+    assert (
+        scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).image == NEW_IMAGE
+    )
+    assert scheduler.admitted_wave == 1
+
+
+def test_wave_admitted_after_min_seconds():
+    clock = FakeClock()
+    scheduler = new_scheduler(clock)
+    first, second = routes_in_wave(scheduler, 0)[0], routes_in_wave(scheduler, 1)[0]
+    scheduler.schedule(first, OLD_IMAGE, NEW_IMAGE, ready=True)
+    scheduler.schedule(first, NEW_IMAGE, NEW_IMAGE, ready=True)
+
+    clock.now = 30
+    assert scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).waiting
+
+    clock.now = 60
+    assert not scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).waiting
+
+
+def test_max_concurrent_rollouts():
+    scheduler = new_scheduler(FakeClock(), max_concurrent=1)
+    first, second = routes_in_wave(scheduler, 0)
+
+    assert (
+        scheduler.schedule(first, OLD_IMAGE, NEW_IMAGE, ready=True).image == NEW_IMAGE
+    )
+    assert scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).waiting
+    # Resynced before the new image was applied, the admitted route keeps its slot
+    assert (
+        scheduler.schedule(first, OLD_IMAGE, NEW_IMAGE, ready=True).image == NEW_IMAGE
+    )
+
+    scheduler.schedule(first, NEW_IMAGE, NEW_IMAGE, ready=True)
+    assert (
+        scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).image == NEW_IMAGE
+    )
+
+
+def test_stalled_routes_stop_holding_back_waves():
+    clock = FakeClock()
+    scheduler = new_scheduler(clock, stall_seconds=300)
+    deleted, second = routes_in_wave(scheduler, 0)[0], routes_in_wave(scheduler, 1)[0]
+    scheduler.schedule(deleted, OLD_IMAGE, NEW_IMAGE, ready=True)
+
+    clock.now = 200
+    assert scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).waiting
+
+    clock.now = 400
+    assert (
+        scheduler.schedule(second, OLD_IMAGE, NEW_IMAGE, ready=True).image == NEW_IMAGE
+    )
+    assert scheduler.rolling == 1
+
+
+def roll_out(scheduler, clock, images, target_image):
+    """Syncs every route once a minute until all run the target image, returns the routes admitted per minute."""
+    admitted = []
+    while any(image != target_image for image in images.values()):
+        clock.now += 60
+        admitted.append(0)
+        for route, image in images.items():
+            decision = scheduler.schedule(route, image, target_image, ready=True)
+            if decision.image != image:
+                images[route] = decision.image
+                admitted[-1] += 1
+    return admitted
+
+
+def test_consecutive_rollouts_are_staggered():
+    clock = FakeClock()
+    scheduler = new_scheduler(clock, waves=4, max_concurrent=100)
+    images = {f"route-{i}": OLD_IMAGE for i in range(40)}
+    first_wave = sum(scheduler.wave_of(route) == 0 for route in images)
+
+    first = roll_out(scheduler, clock, images, NEW_IMAGE)
+    second = roll_out(scheduler, clock, images, "keip-integration:3")
+
+    assert first[0] == second[0] == first_wave
+    assert len(second) == len(first) > 4
+
+
+def test_reverted_route_starts_a_new_rollout():
+    clock = FakeClock()
+    scheduler = new_scheduler(clock, waves=4, max_concurrent=100)
+    images = {f"route-{i}": OLD_IMAGE for i in range(40)}
+    roll_out(scheduler, clock, images, NEW_IMAGE)
+    assert scheduler.admitted_wave == 3
+
+    clock.now += 1000
+    reverted = routes_in_wave(scheduler, 3)[0]
+    decision = scheduler.schedule(reverted, OLD_IMAGE, NEW_IMAGE, ready=True)
+
+    assert decision.waiting
+    assert scheduler.admitted_wave == 0
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    monkeypatch.setattr(webhook.core.sync.cfg, "INTEGRATION_CONTAINER_IMAGE", NEW_IMAGE)
+    monkeypatch.setattr(webhook.core.sync.cfg, "SYNC_RESYNC_ROLLOUT_SECONDS", 5)
+    clock = FakeClock()
+    # The test route is in the last of the 3 waves
+    monkeypatch.setattr(webhook.core.sync, "_rollout_scheduler", new_scheduler(clock))
+    return clock
+
+
+def route_on_image(full_route, image):
+    deployment = full_route["children"]["Deployment.apps/v1"]["testroute"]
+    deployment["spec"] = {"template": {"spec": {"containers": [{"image": image}]}}}
+    deployment["metadata"]["generation"] = 1
+    return full_route
+
+
+def deployment_image(response):
+    return response["children"][0]["spec"]["template"]["spec"]["containers"][0]["image"]
+
+
+def rollout_condition(response):
+    conditions = response["status"]["conditions"]
+    return next((c for c in conditions if c["type"] == ROLLOUT_WAVE_CONDITION), None)
+
+
+def test_sync_keeps_waiting_route_on_previous_image(full_route, clock):
+    for clock.now in (0, 60):
+        response = sync(route_on_image(full_route, OLD_IMAGE))
+
+        assert deployment_image(response) == OLD_IMAGE
+        assert rollout_condition(response)["status"] == "False"
+        assert response["resyncAfterSeconds"] == 5
+
+
+def test_sync_rolls_out_admitted_route(full_route, clock):
+    for clock.now in (0, 60, 120):
+        response = sync(route_on_image(full_route, OLD_IMAGE))
+
+    assert deployment_image(response) == NEW_IMAGE
+    assert rollout_condition(response)["status"] == "True"
+    assert "resyncAfterSeconds" not in response
+
+    response = sync(route_on_image(full_route, NEW_IMAGE))
+
+    assert deployment_image(response) == NEW_IMAGE
+    assert rollout_condition(response) is None
+    assert webhook.core.sync._rollout_scheduler.rolling == 0
+
+
+def test_sync_without_rollout(full_route, clock):
+    response = sync(full_route)
+
+    assert deployment_image(response) == NEW_IMAGE
+    assert rollout_condition(response) is None
+    assert webhook.core.sync._rollout_scheduler.admitted_wave == -1
@@ -11,6 +11,8 @@ from webhook.core.sync import (
 
 FIXED_ISO_TIMESTAMP = "2023-09-06T12:34:56Z"
 
+LATER_ISO_TIMESTAMP = "2023-09-06T12:40:00Z"
+
 STATUS_NOT_READY_CONDITION = {
     "lastTransitionTime": FIXED_ISO_TIMESTAMP,
     "message": "Some IntegrationRoute pod replicas are not ready",
@@ -174,6 +176,93 @@ def test_ready_status_with_parent_different_ready_condition_generate_new_status(
         assert ready_condition == STATUS_NOT_READY_CONDITION
 
 
+def test_stale_parent_status_reuses_last_emitted_ready_condition(
+    monkeypatch, full_route
+):
+    del full_route["parent"]["status"]
+    monkeypatch.setattr(webhook.core.sync, "datetime", MockDateTime)
+    first = _compute_status(full_route["parent"], full_route["children"])
+
+    # The parent status has not been updated with the first status yet
+    monkeypatch.setattr(webhook.core.sync, "datetime", LaterMockDateTime)
+    second = _compute_status(full_route["parent"], full_route["children"])
+
+    assert get_ready_condition(second["conditions"]) == STATUS_READY_CONDITION
+    assert second is first
+
+
+def test_readiness_transition_generates_new_ready_condition(monkeypatch, full_route):
+    del full_route["parent"]["status"]
+    monkeypatch.setattr(webhook.core.sync, "datetime", MockDateTime)
+    _compute_status(full_route["parent"], full_route["children"])
+
+    monkeypatch.setattr(webhook.core.sync, "datetime", LaterMockDateTime)
+    get_child_deployment(full_route)["status"]["readyReplicas"] = 1
+    status = _compute_status(full_route["parent"], full_route["children"])
+
+    assert get_ready_condition(status["conditions"]) == STATUS_NOT_READY_CONDITION | {
+        "lastTransitionTime": LATER_ISO_TIMESTAMP
+    }
+
+
+def test_replica_change_without_transition_keeps_ready_condition(
+    monkeypatch, full_route
+):
+    del full_route["parent"]["status"]
+    monkeypatch.setattr(webhook.core.sync, "datetime", MockDateTime)
+    first = _compute_status(full_route["parent"], full_route["children"])
+
+    monkeypatch.setattr(webhook.core.sync, "datetime", LaterMockDateTime)
+    get_child_deployment(full_route)["status"]["replicas"] = 3
+    second = _compute_status(full_route["parent"], full_route["children"])
+
+    assert second is not first
+    assert second["runningReplicas"] == 3
+    assert get_ready_condition(second["conditions"]) == STATUS_READY_CONDITION
+
+
+def test_parent_ready_condition_preferred_over_tracked_condition(full_route):
+    _compute_status(full_route["parent"], full_route["children"])
+    parent_condition = get_ready_condition(full_route["parent"]["status"]["conditions"])
+    parent_condition["lastTransitionTime"] = LATER_ISO_TIMESTAMP
+
+    status = _compute_status(full_route["parent"], full_route["children"])
+
+    assert get_ready_condition(status["conditions"]) == parent_condition
+
+
+def test_stale_parent_condition_ignored_after_readiness_flip_flop(
+    monkeypatch, full_route
+):
+    # The parent status is Ready since before the webhook's first sync, and is not updated during the test
+    monkeypatch.setattr(webhook.core.sync, "datetime", MockDateTime)
+    get_child_deployment(full_route)["status"]["readyReplicas"] = 1
+    not_ready = _compute_status(full_route["parent"], full_route["children"])
+
+    monkeypatch.setattr(webhook.core.sync, "datetime", LaterMockDateTime)
+    get_child_deployment(full_route)["status"]["readyReplicas"] = 2
+    ready = _compute_status(full_route["parent"], full_route["children"])
+
+    assert get_ready_condition(not_ready["conditions"]) == STATUS_NOT_READY_CONDITION
+    assert get_ready_condition(ready["conditions"]) == STATUS_READY_CONDITION | {
+        "lastTransitionTime": LATER_ISO_TIMESTAMP
+    }
+
+
+def test_recreated_route_does_not_reuse_tracked_condition(monkeypatch, full_route):
+    del full_route["parent"]["status"]
+    monkeypatch.setattr(webhook.core.sync, "datetime", MockDateTime)
+    _compute_status(full_route["parent"], full_route["children"])
+
+    monkeypatch.setattr(webhook.core.sync, "datetime", LaterMockDateTime)
+    full_route["parent"]["metadata"]["uid"] = "c8a3f2e4-7d1b-4a4e-9a57-1f4225b06d4d"
+    status = _compute_status(full_route["parent"], full_route["children"])
+
+    assert get_ready_condition(status["conditions"]) == STATUS_READY_CONDITION | {
+        "lastTransitionTime": LATER_ISO_TIMESTAMP
+    }
+
+
 @pytest.fixture()
 def patch_datetime(monkeypatch):
     monkeypatch.setattr(webhook.core.sync, "datetime", MockDateTime)
@@ -185,6 +274,12 @@ class MockDateTime(datetime):
         return datetime.fromisoformat(FIXED_ISO_TIMESTAMP)
 
 
+class LaterMockDateTime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.fromisoformat(LATER_ISO_TIMESTAMP)
+
+
 def get_child_deployment(route_request: Mapping):
     return route_request["children"]["Deployment.apps/v1"]["testroute"]
 
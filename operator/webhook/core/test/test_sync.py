@@ -1,3 +1,4 @@
+import copy
 import json
 import os
 from pathlib import PurePosixPath
@@ -5,8 +6,11 @@ from typing import Mapping
 
 import pytest
 
+from webhook import deadlines
+from webhook.admission import PRIORITY_HIGH, PRIORITY_LOW
 from webhook.core.sync import (
     sync,
+    admission_priority,
     VolumeConfig,
     _spring_cloud_k8s_config,
     SECRETS_ROOT,
@@ -227,6 +231,73 @@ def test_jdk_options_jks_truststore_type(full_route):
     assert options["value"] == expected_options
 
 
+def jdk_options_env(env_vars):
+    return [e for e in env_vars if e["name"] == JDK_OPTIONS_ENV_NAME]
+
+
+def test_jdk_options_jvm_profile_before_truststore(full_route):
+    full_route["parent"]["spec"]["jvm"] = {"profile": "throughput"}
+
+    options = jdk_options_env(_generate_container_env_vars(full_route["parent"]))
+
+    assert len(options) == 1
+    assert options[0]["value"].startswith(
+        "-XX:+UseParallelGC -XX:MaxRAMPercentage=75.0"
+    )
+    assert options[0]["value"].endswith("-Djavax.net.ssl.trustStoreType=PKCS12")
+
+
+def test_jdk_options_jvm_profile_without_tls(full_route):
+    del full_route["parent"]["spec"]["tls"]
+    full_route["parent"]["spec"]["jvm"] = {"profile": "small"}
+
+    options = jdk_options_env(_generate_container_env_vars(full_route["parent"]))
+
+    assert len(options) == 1
+    assert "-XX:+UseSerialGC" in options[0]["value"]
+    assert "trustStore" not in options[0]["value"]
+
+
+def test_jdk_options_user_value_merged_last(full_route):
+    full_route["parent"]["spec"]["jvm"] = {"profile": "latency"}
+    full_route["parent"]["spec"]["env"].append(
+        {"name": JDK_OPTIONS_ENV_NAME, "value": "-XX:MaxGCPauseMillis=20"}
+    )
+
+    env_vars = _generate_container_env_vars(full_route["parent"])
+    options = jdk_options_env(env_vars)
+
+    assert len(options) == 1
+    assert options[0]["value"].startswith("-XX:+UseG1GC -XX:MaxGCPauseMillis=50")
+    assert options[0]["value"].endswith(
+        "-Djavax.net.ssl.trustStoreType=PKCS12 -XX:MaxGCPauseMillis=20"
+    )
+    assert env_vars[-1]["name"] == "ADDITIONAL_ENV_VAR_2"
+
+
+def test_jdk_options_user_value_kept_without_generated_options(full_route):
+    del full_route["parent"]["spec"]["tls"]
+    env = full_route["parent"]["spec"]["env"]
+    env.insert(0, {"name": JDK_OPTIONS_ENV_NAME, "value": "-Xmx1g"})
+
+    env_vars = _generate_container_env_vars(full_route["parent"])
+
+    assert env_vars[-len(env) :] == env
+
+
+def test_jdk_options_user_value_from_replaces_generated(full_route):
+    user_options = {
+        "name": JDK_OPTIONS_ENV_NAME,
+        "valueFrom": {"configMapKeyRef": {"name": "jvm", "key": "options"}},
+    }
+    full_route["parent"]["spec"]["env"].append(user_options)
+
+    options = jdk_options_env(_generate_container_env_vars(full_route["parent"]))
+
+    # Kubernetes uses the last definition of an environment variable
+    assert options[-1] == user_options
+
+
 def test_env_vars_no_keystore(full_route):
     del full_route["parent"]["spec"]["tls"]["keystore"]
 
@@ -583,6 +654,56 @@ def check_volume_absent(deployment: Mapping, name: str):
     assert name not in vol_names
 
 
+def test_pod_templates_share_compiled_probes(full_route):
+    other_route = copy.deepcopy(full_route)
+    other_route["parent"]["metadata"]["name"] = "otherroute"
+
+    container = get_container(_new_deployment(full_route["parent"]))
+    other_container = get_container(_new_deployment(other_route["parent"]))
+
+    assert container is not other_container
+    assert container["livenessProbe"] is other_container["livenessProbe"]
+    assert container["env"] is not other_container["env"]
+
+
+def test_pod_templates_with_different_tls_do_not_share_probes(full_route):
+    no_tls_route = copy.deepcopy(full_route)
+    del no_tls_route["parent"]["spec"]["tls"]
+
+    container = get_container(_new_deployment(full_route["parent"]))
+    no_tls_container = get_container(_new_deployment(no_tls_route["parent"]))
+
+    assert container["livenessProbe"]["httpGet"]["scheme"] == "HTTPS"
+    assert no_tls_container["livenessProbe"]["httpGet"]["scheme"] == "HTTP"
+
+
+def test_pod_template_class_data_sharing(full_route):
+    full_route["parent"]["spec"]["jvm"] = {"classDataSharing": {"claimName": "cds"}}
+
+    deployment = _new_deployment(full_route["parent"])
+    pod_spec = deployment["spec"]["template"]["spec"]
+    container = get_container(deployment)
+
+    (init_container,) = pod_spec["initContainers"]
+    assert init_container["image"] == container["image"]
+    assert {"name": "jvm-cds", "persistentVolumeClaim": {"claimName": "cds"}} in (
+        pod_spec["volumes"]
+    )
+    assert {"jvm-cds", "jvm-options"} <= {m["name"] for m in container["volumeMounts"]}
+    assert container["startupProbe"]["periodSeconds"] == 2
+    assert container["startupProbe"]["failureThreshold"] == 60
+    (options,) = [e for e in container["env"] if e["name"] == JDK_OPTIONS_ENV_NAME]
+    assert options["value"].startswith("-XX:VMOptionsFile=/var/jvm/options/cds ")
+
+
+def test_pod_template_no_class_data_sharing(full_route):
+    deployment = _new_deployment(full_route["parent"])
+
+    assert "initContainers" not in deployment["spec"]["template"]["spec"]
+    check_volume_absent(deployment, "jvm-cds")
+    assert "periodSeconds" not in get_container(deployment)["startupProbe"]
+
+
 def check_pod_probe_protocol(deployment: Mapping, scheme: str, port: int):
     liveness_probe = get_container(deployment)["livenessProbe"]
     readiness_probe = get_container(deployment)["readinessProbe"]
@@ -603,3 +724,32 @@ def check_volume_mounts_absent(deployment: Mapping, name: str):
 def get_container(deployment: Mapping) -> Mapping:
     pod_template = deployment["spec"]["template"]
     return pod_template["spec"]["containers"][0]
+
+
+@pytest.mark.parametrize(
+    "ready_status,priority",
+    [("True", PRIORITY_LOW), ("False", PRIORITY_HIGH), (None, PRIORITY_HIGH)],
+)
+def test_admission_priority(full_route, ready_status, priority):
+    full_route["parent"]["status"] = (
+        {"conditions": [{"type": "Ready", "status": ready_status}]}
+        if ready_status
+        else {}
+    )
+
+    assert admission_priority(full_route) == priority
+
+
+def test_sync_abandoned_before_generate_after_deadline(full_route, monkeypatch):
+    generated = []
+    monkeypatch.setattr(
+        "webhook.core.sync._get_children", lambda *args: generated.append(args)
+    )
+    token = deadlines.set_deadline(0, elapsed=1)
+    try:
+        with pytest.raises(deadlines.DeadlineExceeded):
+            sync(full_route)
+    finally:
+        deadlines.reset_deadline(token)
+
+    assert generated == []
@@ -0,0 +1,63 @@
+import pytest
+
+import webhook.core.sync
+from webhook.core.sync import sync, _children_cache
+
+
+def test_repeat_sync_reuses_cached_children(full_route):
+    first = sync(full_route)
+    second = sync(full_route)
+
+    stats = _children_cache.stats()
+    assert second["children"] is first["children"]
+    assert stats.misses == 1
+    assert stats.hits == 1
+
+
+def test_status_computed_fresh_on_cache_hit(full_route):
+    sync(full_route)
+    full_route["children"]["Deployment.apps/v1"]["testroute"]["status"][
+        "readyReplicas"
+    ] = 1
+
+    status = sync(full_route)["status"]
+
+    assert _children_cache.stats().hits == 1
+    assert status["readyReplicas"] == 1
+
+
+def test_spec_change_misses_cache(full_route):
+    first = sync(full_route)
+    full_route["parent"]["spec"]["replicas"] = 5
+
+    second = sync(full_route)
+
+    assert _children_cache.stats().misses == 2
+    assert second["children"][0]["spec"]["replicas"] == 5
+    assert first["children"][0]["spec"]["replicas"] == 2
+
+
+def test_namespace_change_misses_cache(full_route):
+    sync(full_route)
+    full_route["parent"]["metadata"]["namespace"] = "other"
+
+    sync(full_route)
+
+    assert _children_cache.stats().misses == 2
+
+
+def test_integration_image_change_misses_cache(monkeypatch, full_route):
+    sync(full_route)
+    monkeypatch.setattr(webhook.core.sync.cfg, "INTEGRATION_CONTAINER_IMAGE", "new")
+
+    children = sync(full_route)["children"]
+
+    assert _children_cache.stats().misses == 2
+    assert children[0]["spec"]["template"]["spec"]["containers"][0]["image"] == "new"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    _children_cache.clear()
+    yield
+    _children_cache.clear()
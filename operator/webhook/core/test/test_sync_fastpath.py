@@ -0,0 +1,104 @@
+import pytest
+
+import webhook.core.sync
+from webhook.cache import LRUCache
+from webhook.core.sync import SYNC_FASTPATH, sync, _children_cache
+
+
+def test_unchanged_resync_returns_indexed_desired_state(monkeypatch, steady_route):
+    first = sync(steady_route)
+
+    def fail(*args):
+        raise AssertionError("desired state recomputed")
+
+    monkeypatch.setattr(webhook.core.sync, "_compute_status", fail)
+    monkeypatch.setattr(webhook.core.sync, "_get_children", fail)
+    hits = fastpath_count("hit")
+
+    second = sync(steady_route)
+
+    assert second is first
+    assert fastpath_count("hit") == hits + 1
+
+
+def test_deployment_status_change_recomputes_status(steady_route):
+    sync(steady_route)
+    changed = fastpath_count("changed")
+    steady_route["children"]["Deployment.apps/v1"]["testroute"]["status"][
+        "readyReplicas"
+    ] = 1
+
+    status = sync(steady_route)["status"]
+
+    assert status["readyReplicas"] == 1
+    assert fastpath_count("changed") == changed + 1
+
+
+def test_parent_update_recomputes_desired_state(steady_route):
+    sync(steady_route)
+    steady_route["parent"]["metadata"]["generation"] = 2
+    steady_route["parent"]["metadata"]["resourceVersion"] = "1600000"
+    steady_route["parent"]["spec"]["replicas"] = 5
+
+    children = sync(steady_route)["children"]
+
+    assert children[0]["spec"]["replicas"] == 5
+
+
+def test_integration_image_change_recomputes_desired_state(monkeypatch, steady_route):
+    sync(steady_route)
+    monkeypatch.setattr(webhook.core.sync.cfg, "INTEGRATION_CONTAINER_IMAGE", "new")
+
+    children = sync(steady_route)["children"]
+
+    assert children[0]["spec"]["template"]["spec"]["containers"][0]["image"] == "new"
+
+
+def test_routes_indexed_separately(steady_route):
+    first = sync(steady_route)
+    steady_route["parent"]["metadata"]["namespace"] = "other"
+
+    second = sync(steady_route)
+
+    assert second is not first
+    assert sync(steady_route) is second
+
+
+def test_parent_without_resource_version_not_indexed(full_route):
+    misses = fastpath_count("miss")
+
+    first = sync(full_route)
+    second = sync(full_route)
+
+    assert second is not first
+    assert fastpath_count("miss") == misses
+
+
+def test_disabled_index_recomputes_desired_state(monkeypatch, steady_route):
+    monkeypatch.setattr(
+        webhook.core.sync, "_steady_state_index", LRUCache(max_entries=0)
+    )
+
+    first = sync(steady_route)
+    second = sync(steady_route)
+
+    assert second is not first
+
+
+def fastpath_count(result: str) -> float:
+    return SYNC_FASTPATH.labels(result).value()
+
+
+@pytest.fixture()
+def steady_route(full_route):
+    full_route["parent"]["metadata"]["resourceVersion"] = "1517000"
+    return full_route
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    webhook.core.sync._steady_state_index.clear()
+    _children_cache.clear()
+    yield
+    webhook.core.sync._steady_state_index.clear()
+    _children_cache.clear()
@@ -0,0 +1,46 @@
+"""
+Per-request deadlines for sync work.
+
+Metacontroller gives up on a sync hook call after its timeout (10s in controller/core-controller.yaml), so work on a
+request past that point is wasted. The webhook endpoints set a deadline for each request, carried to the sync call in
+a context variable, and the work is abandoned with DeadlineExceeded when a check between phases finds it passed.
+
+Context variables are copied to the thread execution mode's pool, but not to the process pool: calls run in a
+process are only checked before they are submitted and after they return.
+"""
+
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from webhook import metrics
+
+# Monotonic time past which the current request's work is abandoned
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passed before a phase of its sync work."""
+
+
+def set_deadline(timeout: float, elapsed: float = 0) -> Token:
+    """Sets the current request's deadline to `timeout` seconds after it was received, `elapsed` seconds ago."""
+    return _deadline.set(time.monotonic() + timeout - elapsed)
+
+
+def reset_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, if any."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check(phase: str) -> None:
+    """Raises DeadlineExceeded if the current request's deadline passed, abandoning it before the given phase."""
+    deadline = _deadline.get()
+    if deadline is not None and time.monotonic() > deadline:
+        metrics.ABANDONED_REQUESTS.labels(metrics.current_route.get(), phase).inc()
+        raise DeadlineExceeded(f"Deadline exceeded before the {phase} phase")
@@ -0,0 +1,104 @@
+"""
+Selective decoding of webhook request bodies.
+
+Metacontroller sends every observed child object with each sync request, most of which the sync functions never
+read. A request shape describes the parts of a body a sync function consumes, as nested dicts of the field names to
+keep, where:
+    - ANY keeps the whole value of a field
+    - an EACH key gives the shape of every value of an object with arbitrary keys (e.g. children by name)
+
+Other fields are skipped by the msgspec parser without being materialized. Without msgspec installed, bodies are
+decoded in full: pruning them after parsing costs more than it saves.
+"""
+
+import importlib.util
+from json import JSONDecodeError
+from typing import Any, Dict, List, Mapping, Optional, TypedDict
+
+from webhook import encoding
+
+ANY = None
+
+EACH = "*"
+
+# The object metadata fields read by the sync functions
+OBJECT_METADATA_SHAPE = {
+    "name": ANY,
+    "namespace": ANY,
+    "uid": ANY,
+    "generation": ANY,
+    "resourceVersion": ANY,
+    "labels": ANY,
+    "annotations": ANY,
+}
+
+
+def msgspec_installed() -> bool:
+    return importlib.util.find_spec("msgspec") is not None
+
+
+def _msgspec_type(shape: Optional[Mapping], name: str = "Request") -> Any:
+    if shape is ANY:
+        return Any
+
+    if EACH in shape:
+        return Dict[str, _msgspec_type(shape[EACH], name)]
+
+    # Unknown fields of a TypedDict are skipped by msgspec, and it decodes into plain dicts
+    fields = {
+        k: _msgspec_type(field_shape, f"{name}_{k}") for k, field_shape in shape.items()
+    }
+    return TypedDict(name, fields, total=False)
+
+
+class FullDecoder:
+    """Decodes whole webhook request bodies."""
+
+    def loads(self, data: bytes) -> Any:
+        return encoding.loads(data)
+
+    def split_batch(self, data: bytes) -> Any:
+        """Returns the items of a batch body to be passed to decode_item, or the decoded body if not an array."""
+        return encoding.loads(data)
+
+    def decode_item(self, item: Any) -> Any:
+        return item
+
+
+class SelectiveDecoder(FullDecoder):
+    """
+    Decodes webhook request bodies, keeping only the fields of the given request shape. Batch bodies are split into
+    their raw items first, so each item is decoded (and can fail to decode) on its own. Requires msgspec.
+    """
+
+    def __init__(self, shape: Mapping) -> None:
+        import msgspec
+
+        self._msgspec = msgspec
+        self._decoder = msgspec.json.Decoder(_msgspec_type(shape))
+        self._batch_decoder = msgspec.json.Decoder(List[msgspec.Raw])
+
+    def loads(self, data: bytes) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._msgspec.DecodeError as e:
+            raise JSONDecodeError(str(e), "", 0) from e
+
+    def split_batch(self, data: bytes) -> Any:
+        try:
+            return self._batch_decoder.decode(data)
+        except self._msgspec.ValidationError:
+            # Valid JSON but not an array, left for the caller to reject
+            return encoding.loads(data)
+        except self._msgspec.DecodeError as e:
+            raise JSONDecodeError(str(e), "", 0) from e
+
+    def decode_item(self, item: Any) -> Any:
+        return self.loads(item)
+
+
+def get_decoder(shape: Mapping, selective: bool = True) -> FullDecoder:
+    """Returns a selective decoder for the request shape if enabled and msgspec is installed, else a full decoder."""
+    if selective and msgspec_installed():
+        return SelectiveDecoder(shape)
+    return FullDecoder()
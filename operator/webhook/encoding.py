@@ -0,0 +1,117 @@
+import importlib.util
+import json
+from json import JSONDecodeError
+from typing import Any, Callable, List, Mapping, NamedTuple, Optional
+
+from webhook import config as cfg
+
+
+class JsonCodec(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes | str], Any]
+
+
+def _stdlib_codec() -> JsonCodec:
+    def dumps(obj: Any) -> bytes:
+        # Matches the output of starlette.responses.JSONResponse
+        return json.dumps(
+            obj,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    return JsonCodec("stdlib", dumps, json.loads)
+
+
+def _orjson_codec() -> JsonCodec:
+    import orjson
+
+    # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+    return JsonCodec("orjson", orjson.dumps, orjson.loads)
+
+
+def _msgspec_codec() -> JsonCodec:
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def loads(data: bytes | str) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise JSONDecodeError(str(e), str(data), 0) from e
+
+    return JsonCodec("msgspec", encoder.encode, loads)
+
+
+_CODECS = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "stdlib": _stdlib_codec,
+}
+
+
+def installed_codecs() -> List[str]:
+    return [n for n in _CODECS if n == "stdlib" or importlib.util.find_spec(n)]
+
+
+def get_codec(name: str) -> JsonCodec:
+    """
+    Returns the JSON codec with the given name. 'auto' selects the fastest installed codec, falling back to the
+    standard library json module.
+    """
+    if name == "auto":
+        name = installed_codecs()[0]
+
+    if name not in _CODECS:
+        raise ValueError(
+            f"Unknown JSON codec '{name}', expected one of: auto, {', '.join(_CODECS)}"
+        )
+
+    return _CODECS[name]()
+
+
+codec = get_codec(cfg.JSON_CODEC)
+
+dumps = codec.dumps
+
+loads = codec.loads
+
+
+class PreEncodedList(list):
+    """
+    A list that remembers its own JSON encoding so it is serialized at most once. Intended for cached values that
+    are shared between responses, and must not be mutated after the first call to encoded().
+    """
+
+    __slots__ = ("_encoded",)
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self._encoded: Optional[bytes] = None
+
+    def encoded(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = dumps(self)
+        return self._encoded
+
+
+def encode_response(content: Mapping[str, Any]) -> bytes:
+    """
+    Encodes a webhook response, splicing in the cached encoding of any top-level PreEncodedList value instead of
+    serializing it again. The output is byte-for-byte identical to dumps(content).
+    """
+    if not any(isinstance(v, PreEncodedList) for v in content.values()):
+        return dumps(content)
+
+    fields = [
+        dumps(key)
+        + b":"
+        + (value.encoded() if isinstance(value, PreEncodedList) else dumps(value))
+        for key, value in content.items()
+    ]
+    return b"{" + b",".join(fields) + b"}"
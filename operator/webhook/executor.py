@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Mapping, Optional
+
+from webhook import config as cfg
+from webhook import deadlines
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a sync function is submitted while the executor's pending queue is full."""
+
+
+class SyncExecutor:
+    """
+    Runs webhook sync functions using one of the following execution modes:
+        - inline: directly on the event loop (lowest overhead, but a slow sync blocks every other request)
+        - thread: in a thread pool, keeping the event loop responsive
+        - process: in a process pool, for CPU parallelism. Caches are per worker process.
+
+    When pooled, at most max_pending calls can be queued or running at once. Further submissions raise
+    ExecutorSaturated so the caller can apply backpressure. The pool is created on first use.
+    """
+
+    def __init__(
+        self,
+        mode: str = cfg.SYNC_EXECUTION_MODE,
+        workers: int = cfg.SYNC_WORKERS,
+        max_pending: int = cfg.SYNC_MAX_PENDING,
+    ) -> None:
+        if mode not in EXECUTION_MODES:
+            raise ValueError(
+                f"Unknown sync execution mode '{mode}', expected one of: {', '.join(EXECUTION_MODES)}"
+            )
+        if workers < 1:
+            raise ValueError(f"Sync workers must be at least 1, got {workers}")
+
+        self._mode = mode
+        self._workers = workers
+        self._max_pending = max_pending
+        self._pending = 0
+        self._pool: Optional[Executor] = None
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, sync_func: Callable[[Mapping], Mapping], body: Mapping):
+        """Runs a sync function, unless the current request's deadline passed (see webhook.deadlines)."""
+        if self._mode == "inline":
+            return _run_before_deadline(sync_func, body)
+
+        if self._max_pending and self._pending >= self._max_pending:
+            raise ExecutorSaturated(
+                f"{self._pending} sync calls already pending (max {self._max_pending})"
+            )
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self._mode == "thread":
+                # Checked once picked up by the pool, as the deadline may pass while queued for it
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(
+                    self._get_pool(), context.run, _run_before_deadline, sync_func, body
+                )
+            deadlines.check("sync")
+            return await loop.run_in_executor(self._get_pool(), sync_func, body)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self._mode == "thread":
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="sync"
+                )
+            else:
+                self._pool = ProcessPoolExecutor(max_workers=self._workers)
+        return self._pool
+
+
+def _run_before_deadline(sync_func: Callable[[Mapping], Mapping], body: Mapping):
+    deadlines.check("sync")
+    return sync_func(body)
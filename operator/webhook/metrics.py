@@ -0,0 +1,363 @@
+"""
+Minimal Prometheus metrics, rendered in the text exposition format by the /metrics endpoint.
+
+Metric values are sharded per thread: each thread only ever writes to its own shard, so recording a value needs no
+lock even when sync functions run in a thread pool. Shards are summed when the metrics are rendered. Values recorded
+in process pool workers are not visible to the server process.
+"""
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+SIZE_BUCKETS = tuple(2**i for i in range(8, 22, 2))
+
+REGISTRY: List["_Metric"] = []
+
+# The webhook route handling the current request, used to label metrics recorded outside of app.py
+current_route: ContextVar[str] = ContextVar("current_route", default="")
+
+
+class _Shards:
+    """Per-thread arrays of values, summed column-wise on read."""
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._local = threading.local()
+        self._all: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> List[float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self._size
+            # Only taken once per thread, when it first records a value
+            with self._lock:
+                self._all.append(values)
+            self._local.values = values
+            return values
+
+    def sum(self) -> List[float]:
+        with self._lock:
+            shards = list(self._all)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self._size
+
+
+class _Metric(ABC):
+    metric_type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        registry: List["_Metric"] = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Returns the metric's lines in the text exposition format."""
+
+
+class _LabeledMetric(_Metric):
+    """A metric with a child value per combination of label values."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: List[_Metric] = REGISTRY,
+    ) -> None:
+        super().__init__(name, documentation, registry)
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *labelvalues: str):
+        child = self._children.get(labelvalues)
+        if child is None:
+            # setdefault is atomic, so concurrent threads end up sharing one child
+            child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Returns the value recorded for a new combination of label values."""
+
+    def _format_labels(self, labelvalues: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"'
+            for name, value in zip(self.labelnames, labelvalues)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labelvalues, child in list(self._children.items()):
+            lines.extend(self._render_child(labelvalues, child))
+        return lines
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        return [f"{self.name}{self._format_labels(labelvalues)} {child.value()}"]
+
+
+class _Value:
+    __slots__ = ("_shards",)
+
+    def __init__(self) -> None:
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.local()[0] += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._shards.local()[0] -= amount
+
+    def value(self) -> float:
+        return self._shards.sum()[0]
+
+
+class Counter(_LabeledMetric):
+    metric_type = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+
+class _HistogramValue:
+    __slots__ = ("_buckets", "_shards")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self._buckets = buckets
+        # One count per bucket, the +Inf bucket count, then the sum of observations
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        values = self._shards.local()
+        values[bisect.bisect_left(self._buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self) -> List[float]:
+        return self._shards.sum()
+
+
+class Histogram(_LabeledMetric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        registry: List[_Metric] = REGISTRY,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        values = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), values):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            labels = self._format_labels(labelvalues, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = self._format_labels(labelvalues)
+        lines.append(f"{self.name}_sum{labels} {values[-1]}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A metric without labels whose value is read from a callback when rendered."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        callback: Callable[[], float],
+    ) -> None:
+        super().__init__(name, documentation)
+        self.metric_type = metric_type
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        return self._header() + [f"{self.name} {self._callback()}"]
+
+
+class PhaseTimer:
+    """Context manager recording the duration of a sync phase for the current route."""
+
+    __slots__ = ("_phase", "_start")
+
+    def __init__(self, phase: str) -> None:
+        self._phase = phase
+
+    def __enter__(self) -> "PhaseTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        PHASE_DURATION.labels(current_route.get(), self._phase).observe(
+            time.perf_counter() - self._start
+        )
+
+
+def phase(name: str) -> PhaseTimer:
+    return PhaseTimer(name)
+
+
+def register_cache(name: str, cache) -> None:
+    """Exposes the stats of an LRUCache as webhook_<name>_cache_* metrics."""
+    for stat, metric_type in (
+        ("hits", "counter"),
+        ("misses", "counter"),
+        ("evictions", "counter"),
+        ("entries", "gauge"),
+        ("bytes", "gauge"),
+    ):
+        suffix = "_total" if metric_type == "counter" else ""
+        CallbackMetric(
+            f"webhook_{name}_cache_{stat}{suffix}",
+            f"{name} cache {stat}",
+            metric_type,
+            lambda stat=stat: getattr(cache.stats(), stat),
+        )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(registry: List[_Metric] = REGISTRY) -> bytes:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode()
+
+
+REQUESTS = Counter(
+    "webhook_requests_total", "Webhook requests handled", ["route", "code"]
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "webhook_requests_in_flight", "Webhook requests being handled", ["route"]
+)
+
+REQUEST_DURATION = Histogram(
+    "webhook_request_duration_seconds", "Webhook request latency", ["route"]
+)
+
+PHASE_DURATION = Histogram(
+    "webhook_phase_duration_seconds",
+    "Latency of each webhook request phase (decode, status, generate, encode)",
+    ["route", "phase"],
+)
+
+REQUEST_SIZE = Histogram(
+    "webhook_request_size_bytes",
+    "Webhook request body size",
+    ["route"],
+    buckets=SIZE_BUCKETS,
+)
+
+RESPONSE_SIZE = Histogram(
+    "webhook_response_size_bytes",
+    "Webhook response body size",
+    ["route"],
+    buckets=SIZE_BUCKETS,
+)
+
+COALESCED_REQUESTS = Counter(
+    "webhook_coalesced_requests_total",
+    "Requests that shared the sync call of a concurrent request for the same parent state",
+    ["route"],
+)
+
+SHED_REQUESTS = Counter(
+    "webhook_shed_requests_total",
+    "Sync requests shed by admission control, by priority",
+    ["route", "priority"],
+)
+
+ABANDONED_REQUESTS = Counter(
+    "webhook_abandoned_requests_total",
+    "Sync requests abandoned once their deadline passed, by the phase they were abandoned before",
+    ["route", "phase"],
+)
+
+REQUEST_ERRORS = Counter(
+    "webhook_request_errors_total",
+    "Rejected webhook requests by cause",
+    ["route", "cause"],
+)
+
+COMPRESSED_BYTES = Counter(
+    "webhook_compressed_bytes_total",
+    "Compressed size of compressed request and response bodies",
+    ["route", "direction", "encoding"],
+)
+
+UNCOMPRESSED_BYTES = Counter(
+    "webhook_uncompressed_bytes_total",
+    "Uncompressed size of compressed request and response bodies",
+    ["route", "direction", "encoding"],
+)
+
+COMPRESSION_CPU = Counter(
+    "webhook_compression_cpu_seconds_total",
+    "CPU time spent decompressing requests and compressing responses",
+    ["route", "direction", "encoding"],
+)
@@ -0,0 +1,54 @@
+import logging
+import random
+from typing import Any
+
+from webhook import config as cfg
+from webhook.encoding import dumps
+
+
+class LazyPayload:
+    """
+    Defers encoding a JSON payload until the log record is actually formatted, truncating the output to max_bytes
+    when set.
+    """
+
+    __slots__ = ("_payload", "_max_bytes")
+
+    def __init__(self, payload: Any, max_bytes: int = 0) -> None:
+        self._payload = payload
+        self._max_bytes = max_bytes
+
+    def __str__(self) -> str:
+        encoded = (
+            self._payload if isinstance(self._payload, bytes) else dumps(self._payload)
+        )
+        if self._max_bytes and len(encoded) > self._max_bytes:
+            truncated = len(encoded) - self._max_bytes
+            return f"{encoded[:self._max_bytes].decode(errors='replace')}... ({truncated} bytes truncated)"
+        return encoded.decode(errors="replace")
+
+
+class PayloadLogger:
+    """
+    Logs webhook request and response payloads at DEBUG level. When DEBUG is disabled the level check is the only
+    cost, payloads are never serialized. A sample_rate below 1 logs only that fraction of payloads.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        sample_rate: float = cfg.LOG_PAYLOAD_SAMPLE_RATE,
+        max_bytes: int = cfg.LOG_PAYLOAD_MAX_BYTES,
+    ) -> None:
+        self._logger = logger
+        self._sample_rate = sample_rate
+        self._max_bytes = max_bytes
+
+    def log(self, label: str, payload: Any) -> None:
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+
+        if self._sample_rate < 1 and random.random() >= self._sample_rate:
+            return
+
+        self._logger.debug("%s:\n %s", label, LazyPayload(payload, self._max_bytes))
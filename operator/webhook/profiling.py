@@ -0,0 +1,273 @@
+"""
+Opt-in profiling of webhook sync calls, enabled with PROFILING_ENABLED.
+
+A capture is armed through the /debug/profile admin endpoint (or SIGUSR1), and profiles the next N sync calls,
+optionally only those for a parent with a given name. Each capture writes two files to PROFILING_OUTPUT_DIR:
+    - <id>.prof: cProfile stats of the captured calls, loadable by snakeviz or pstats
+    - <id>.speedscope.json: the timing spans recorded in the sync hot paths, loadable by https://www.speedscope.app
+
+Only one call is profiled at a time, and captures do not see calls made in the process execution mode's pool.
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Callable, List, Mapping, Optional
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse
+from starlette.routing import Route
+from starlette.status import (
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+)
+
+from webhook import config as cfg
+
+_LOGGER = logging.getLogger(__name__)
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+_active_recorder: ContextVar[Optional["SpanRecorder"]] = ContextVar(
+    "active_recorder", default=None
+)
+
+
+class SpanRecorder:
+    """Records open/close events of the timing spans hit during one profiled sync call."""
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.start = time.perf_counter()
+        self.end = self.start
+        self.events: List[tuple] = []
+
+    def open(self, name: str) -> None:
+        self.events.append(("O", name, time.perf_counter()))
+
+    def close(self, name: str) -> None:
+        self.events.append(("C", name, time.perf_counter()))
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+
+def span(func: Callable) -> Callable:
+    """
+    Decorates a hot-path function to be recorded as a timing span while its call is being profiled. Costs a single
+    context variable lookup otherwise.
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder = _active_recorder.get()
+        if recorder is None:
+            return func(*args, **kwargs)
+
+        recorder.open(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            recorder.close(name)
+
+    return wrapper
+
+
+def _parent_name(body: Mapping) -> Optional[str]:
+    # CompositeController requests have a 'parent', DecoratorController requests an 'object'
+    if not isinstance(body, Mapping):
+        return None
+    obj = body.get("parent") or body.get("object") or {}
+    return obj.get("metadata", {}).get("name")
+
+
+class Capture:
+    def __init__(self, requests: int, name: Optional[str], output_dir: str) -> None:
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.requests = requests
+        self.name = name
+        self.output_dir = output_dir
+        self.remaining = requests
+        self.profile = cProfile.Profile()
+        self.recorders: List[SpanRecorder] = []
+        self.lock = threading.Lock()
+        self.files: List[str] = []
+
+    def matches(self, body: Mapping) -> bool:
+        return self.remaining > 0 and (
+            self.name is None or _parent_name(body) == self.name
+        )
+
+    def add(self, recorder: SpanRecorder) -> None:
+        self.recorders.append(recorder)
+        self.remaining -= 1
+        if self.remaining == 0:
+            self._write()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "requests": self.requests,
+            "name": self.name,
+            "remaining": self.remaining,
+            "files": [os.path.basename(f) for f in self.files],
+        }
+
+    def _write(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        prof_path = os.path.join(self.output_dir, f"{self.id}.prof")
+        self.profile.dump_stats(prof_path)
+
+        speedscope_path = os.path.join(self.output_dir, f"{self.id}.speedscope.json")
+        with open(speedscope_path, "w") as f:
+            json.dump(to_speedscope(self.recorders, self.id), f)
+
+        self.files = [prof_path, speedscope_path]
+        _LOGGER.info("Profile capture %s written to %s", self.id, self.output_dir)
+
+
+def to_speedscope(recorders: List[SpanRecorder], name: str) -> dict:
+    frames: List[dict] = []
+    frame_index = {}
+
+    profiles = []
+    for recorder in recorders:
+        events = []
+        for event_type, frame_name, at in recorder.events:
+            if frame_name not in frame_index:
+                frame_index[frame_name] = len(frames)
+                frames.append({"name": frame_name})
+            events.append(
+                {
+                    "type": event_type,
+                    "frame": frame_index[frame_name],
+                    "at": (at - recorder.start) * 1e6,
+                }
+            )
+        profiles.append(
+            {
+                "type": "evented",
+                "name": recorder.label,
+                "unit": "microseconds",
+                "startValue": 0,
+                "endValue": (recorder.end - recorder.start) * 1e6,
+                "events": events,
+            }
+        )
+
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "keip-webhook",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+_armed: Optional[Capture] = None
+
+_last: Optional[Capture] = None
+
+
+def arm(requests: int, name: Optional[str] = None) -> Capture:
+    global _armed, _last
+    if _armed is not None and _armed.remaining > 0:
+        raise RuntimeError(f"Profile capture {_armed.id} is already in progress")
+
+    _armed = _last = Capture(requests, name, cfg.PROFILING_OUTPUT_DIR)
+    _LOGGER.info(
+        "Armed profile capture %s for %s requests (name: %s)", _armed.id, requests, name
+    )
+    return _armed
+
+
+class Profiled:
+    """Wraps a sync function so its calls are profiled while a matching capture is armed."""
+
+    def __init__(self, sync_func: Callable[[Mapping], Mapping]) -> None:
+        self.sync_func = sync_func
+
+    def __call__(self, body: Mapping) -> Mapping:
+        capture = _armed
+        if capture is None or not capture.matches(body):
+            return self.sync_func(body)
+
+        # Profile one call at a time, concurrent calls are served unprofiled
+        if not capture.lock.acquire(blocking=False):
+            return self.sync_func(body)
+
+        try:
+            if not capture.matches(body):
+                return self.sync_func(body)
+
+            recorder = SpanRecorder(
+                f"{self.sync_func.__name__} {_parent_name(body)} "
+                f"#{capture.requests - capture.remaining + 1}"
+            )
+            token = _active_recorder.set(recorder)
+            recorder.open(self.sync_func.__qualname__)
+            capture.profile.enable()
+            try:
+                return self.sync_func(body)
+            finally:
+                capture.profile.disable()
+                recorder.close(self.sync_func.__qualname__)
+                recorder.finish()
+                _active_recorder.reset(token)
+                capture.add(recorder)
+        finally:
+            capture.lock.release()
+
+
+async def start_capture(request: Request):
+    try:
+        requests = int(request.query_params.get("requests", "1"))
+    except ValueError:
+        requests = 0
+    if requests < 1:
+        return JSONResponse(
+            {"detail": "'requests' must be a positive integer"},
+            status_code=HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        capture = arm(requests, request.query_params.get("name"))
+    except RuntimeError as e:
+        return JSONResponse({"detail": str(e)}, status_code=HTTP_409_CONFLICT)
+
+    return JSONResponse(capture.to_dict(), status_code=HTTP_202_ACCEPTED)
+
+
+async def capture_status(request: Request):
+    if _last is None:
+        return JSONResponse(
+            {"detail": "No profile captured"}, status_code=HTTP_404_NOT_FOUND
+        )
+    return JSONResponse(_last.to_dict())
+
+
+async def download_capture(request: Request):
+    filename = request.path_params["filename"]
+    output_dir = os.path.abspath(cfg.PROFILING_OUTPUT_DIR)
+    path = os.path.abspath(os.path.join(output_dir, filename))
+
+    if os.path.dirname(path) != output_dir or not os.path.isfile(path):
+        return JSONResponse({"detail": "Not found"}, status_code=HTTP_404_NOT_FOUND)
+    return FileResponse(path, filename=filename)
+
+
+routes = [
+    Route("/debug/profile", endpoint=start_capture, methods=["POST"]),
+    Route("/debug/profile", endpoint=capture_status, methods=["GET"]),
+    Route("/debug/profile/{filename}", endpoint=download_capture, methods=["GET"]),
+]
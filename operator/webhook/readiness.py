@@ -0,0 +1,29 @@
+from typing import MutableSequence, Optional
+
+# Per-worker warm-up flags and the draining flag are shared memory when running multiple server workers, see
+# webhook.server. A single in-process worker uses plain local state.
+_worker_flags: MutableSequence[int] = [0]
+_worker_index = 0
+_draining: Optional[MutableSequence[int]] = None
+
+
+def configure_worker(
+    worker_flags: MutableSequence[int],
+    draining: Optional[MutableSequence[int]],
+    index: int,
+) -> None:
+    global _worker_flags, _worker_index, _draining
+    _worker_flags = worker_flags
+    _worker_index = index
+    _draining = draining
+
+
+def mark_warm() -> None:
+    _worker_flags[_worker_index] = 1
+
+
+def is_ready() -> bool:
+    """Ready once every server worker has warmed up, and until the server starts draining."""
+    if _draining is not None and _draining[0]:
+        return False
+    return all(_worker_flags)
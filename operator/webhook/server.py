@@ -0,0 +1,208 @@
+"""
+Serving entry point for the webhook, run with:
+
+    python -m webhook.server
+
+With SERVER_WORKERS > 1 a supervisor process starts that many uvicorn workers. Each worker binds the port with
+SO_REUSEPORT, so the kernel balances connections between them, and keeps its own (shared-nothing) caches. The
+readiness endpoint only reports ready once every worker has warmed up. On SIGTERM the supervisor reports not-ready
+for SERVER_DRAIN_SECONDS, then stops the workers, which finish their in-flight requests before exiting. A single
+worker runs in process (see DrainingServer), and drains the same way.
+"""
+
+import importlib.util
+import logging.config
+import multiprocessing
+import signal
+import socket
+import threading
+import time
+from typing import List, Optional
+
+import uvicorn
+
+from webhook import config as cfg
+from webhook import readiness
+from webhook.logconf import LOG_CONF
+
+_LOGGER = logging.getLogger(__name__)
+
+APP = "webhook.app:app"
+
+_WORKER_POLL_SECONDS = 0.5
+
+# Implementations by name, and the package each one needs
+HTTP_IMPLEMENTATIONS = {"auto": None, "h11": "h11", "httptools": "httptools"}
+
+LOOP_IMPLEMENTATIONS = {"auto": None, "asyncio": None, "uvloop": "uvloop"}
+
+
+def validate_server_settings() -> None:
+    """Raises a ValueError describing the first invalid SERVER_* setting."""
+    if cfg.SERVER_WORKERS < 1:
+        raise ValueError(f"SERVER_WORKERS must be at least 1, got {cfg.SERVER_WORKERS}")
+    if cfg.SERVER_WORKERS > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        raise ValueError(
+            "SERVER_WORKERS > 1 requires SO_REUSEPORT, which this platform does not support"
+        )
+    if cfg.SERVER_BACKLOG < 1:
+        raise ValueError(f"SERVER_BACKLOG must be at least 1, got {cfg.SERVER_BACKLOG}")
+    if cfg.SERVER_LIMIT_CONCURRENCY < 0:
+        raise ValueError(
+            f"SERVER_LIMIT_CONCURRENCY must be 0 (no limit) or more, got {cfg.SERVER_LIMIT_CONCURRENCY}"
+        )
+    if cfg.SERVER_KEEP_ALIVE_SECONDS < 0:
+        raise ValueError(
+            f"SERVER_KEEP_ALIVE_SECONDS must be 0 or more, got {cfg.SERVER_KEEP_ALIVE_SECONDS}"
+        )
+
+    for setting, value, implementations in (
+        ("SERVER_HTTP", cfg.SERVER_HTTP, HTTP_IMPLEMENTATIONS),
+        ("SERVER_LOOP", cfg.SERVER_LOOP, LOOP_IMPLEMENTATIONS),
+    ):
+        if value not in implementations:
+            raise ValueError(
+                f"Unknown {setting} '{value}', expected one of: {', '.join(implementations)}"
+            )
+        package = implementations[value]
+        if package and importlib.util.find_spec(package) is None:
+            raise ValueError(f"{setting} '{value}' requires {package} to be installed")
+
+
+def uvicorn_config() -> uvicorn.Config:
+    validate_server_settings()
+    return uvicorn.Config(
+        APP,
+        host=cfg.SERVER_HOST,
+        port=cfg.SERVER_PORT,
+        backlog=cfg.SERVER_BACKLOG,
+        limit_concurrency=cfg.SERVER_LIMIT_CONCURRENCY or None,
+        timeout_keep_alive=cfg.SERVER_KEEP_ALIVE_SECONDS,
+        http=cfg.SERVER_HTTP,
+        loop=cfg.SERVER_LOOP,
+        timeout_graceful_shutdown=cfg.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+def _run_worker(index: int, worker_flags, draining) -> None:
+    readiness.configure_worker(worker_flags, draining, index)
+    config = uvicorn_config()
+    sock = bind_socket(config.host, config.port)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    Runs the single in-process server worker. On the first SIGTERM or SIGINT it reports not-ready for
+    SERVER_DRAIN_SECONDS before shutting down, and a second signal shuts it down at once.
+    """
+
+    def __init__(self, config: uvicorn.Config) -> None:
+        super().__init__(config)
+        self._draining = [0]
+        readiness.configure_worker([0], self._draining, 0)
+
+    def handle_exit(self, sig, frame) -> None:
+        if self._draining[0] or cfg.SERVER_DRAIN_SECONDS <= 0:
+            super().handle_exit(sig, frame)
+            return
+
+        self._draining[0] = 1
+        _LOGGER.info("Shutting down, draining for %s seconds", cfg.SERVER_DRAIN_SECONDS)
+        timer = threading.Timer(
+            cfg.SERVER_DRAIN_SECONDS, super().handle_exit, args=(sig, frame)
+        )
+        timer.daemon = True
+        timer.start()
+
+
+class Supervisor:
+    """Starts the server workers, restarts any that exit unexpectedly, and drains them on shutdown."""
+
+    def __init__(self, workers: int) -> None:
+        self._ctx = multiprocessing.get_context("spawn")
+        self._worker_flags = self._ctx.RawArray("b", workers)
+        self._draining = self._ctx.RawArray("b", 1)
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+
+        for index in range(len(self._processes)):
+            self._start_worker(index)
+
+        while not self._stopping.wait(_WORKER_POLL_SECONDS):
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    _LOGGER.warning(
+                        "Worker %s exited with code %s, restarting",
+                        process.name,
+                        process.exitcode,
+                    )
+                    self._start_worker(index)
+
+        self._drain()
+
+    def _start_worker(self, index: int) -> None:
+        self._worker_flags[index] = 0
+        process = self._ctx.Process(
+            target=_run_worker,
+            args=(index, self._worker_flags, self._draining),
+            name=f"webhook-worker-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _handle_exit(self, sig, frame) -> None:
+        self._stopping.set()
+
+    def _drain(self) -> None:
+        self._draining[0] = 1
+        _LOGGER.info("Shutting down, draining for %s seconds", cfg.SERVER_DRAIN_SECONDS)
+        time.sleep(cfg.SERVER_DRAIN_SECONDS)
+
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+
+        for process in self._processes:
+            process.join(timeout=cfg.SERVER_GRACEFUL_TIMEOUT_SECONDS + 5)
+            if process.is_alive():
+                _LOGGER.warning("Worker %s did not stop in time, killing", process.name)
+                process.kill()
+
+
+def main() -> None:
+    logging.config.dictConfig(LOG_CONF)
+
+    validate_server_settings()
+    _LOGGER.info(
+        "Server settings: http=%s loop=%s backlog=%s limit_concurrency=%s keep_alive=%ss",
+        cfg.SERVER_HTTP,
+        cfg.SERVER_LOOP,
+        cfg.SERVER_BACKLOG,
+        cfg.SERVER_LIMIT_CONCURRENCY or "none",
+        cfg.SERVER_KEEP_ALIVE_SECONDS,
+    )
+
+    if cfg.SERVER_WORKERS == 1:
+        DrainingServer(uvicorn_config()).run()
+    else:
+        _LOGGER.info("Starting %s server workers", cfg.SERVER_WORKERS)
+        Supervisor(cfg.SERVER_WORKERS).run()
+
+
+if __name__ == "__main__":
+    main()
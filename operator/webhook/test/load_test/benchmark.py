@@ -0,0 +1,374 @@
+"""
+Benchmark suite for the webhook's sync functions, encoding and HTTP layer. Run from the operator directory:
+
+    python -m webhook.test.load_test.benchmark [--output results.json] [--compare baseline.json]
+
+Results can be saved as JSON and compared against a previous run, failing (exit code 1) if any benchmark is slower
+than the baseline by more than the regression threshold.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple
+
+from webhook.addons.certmanager.main import sync_certificate
+from webhook.app import app
+from webhook.core.sync import _compute_status, _gen_children, sync
+from webhook.core.sync import REQUEST_SHAPE
+from webhook.decoding import SelectiveDecoder, msgspec_installed
+from webhook.encoding import (
+    codec,
+    dumps,
+    encode_response,
+    get_codec,
+    installed_codecs,
+)
+from webhook.payload_log import PayloadLogger
+from webhook.test.load_test.synthetic import (
+    cert_request_with_alt_names,
+    scaled_sync_request,
+    sync_request_with_managed_fields,
+)
+from webhook.test.test_webapp import load_json_as_dict
+
+_WEBHOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+FULL_IROUTE_REQUEST = os.path.join(
+    _WEBHOOK_DIR, "core", "test", "json", "full-iroute-request.json"
+)
+
+FULL_CERT_REQUEST = os.path.join(_WEBHOOK_DIR, "test", "json", "full-cert-request.json")
+
+MINIMAL_IROUTE_REQUEST = {
+    "parent": {
+        "metadata": {"name": "minimal", "namespace": "default"},
+        "spec": {"routeConfigMap": "minimal-xml", "replicas": 1},
+    },
+    "children": {"Deployment.apps/v1": {}},
+}
+
+SYNC_SCALES = (10, 100, 500)
+
+MANAGED_FIELDS_COUNTS = (10, 100)
+
+ALT_NAME_COUNTS = (10, 100, 1000)
+
+DEFAULT_THRESHOLD = 0.15
+
+
+def _uncached_sync(body: Mapping) -> bytes:
+    # Generates and encodes the full desired state, bypassing the children cache
+    parent = body["parent"]
+    return dumps(
+        {
+            "status": _compute_status(parent, body["children"]),
+            "children": _gen_children(parent),
+        }
+    )
+
+
+def _cached_sync(body: Mapping) -> bytes:
+    return encode_response(sync(body))
+
+
+def time_per_call(func: Callable[[], object], repeat: int = 5) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def allocations_per_call(func: Callable[[], object], calls: int = 200) -> dict:
+    """Measures the memory blocks and bytes allocated, and still referenced by the results, per call of func."""
+    func()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        results = [func() for _ in range(calls)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    del results
+    return {
+        "blocks_per_call": sum(s.count_diff for s in stats) / calls,
+        "bytes_per_call": sum(s.size_diff for s in stats) / calls,
+    }
+
+
+def allocation_benchmarks() -> Dict[str, Callable[[], object]]:
+    full_request = load_json_as_dict(FULL_IROUTE_REQUEST)
+    return {
+        "alloc/children/minimal": lambda: _gen_children(
+            MINIMAL_IROUTE_REQUEST["parent"]
+        ),
+        "alloc/children/full": lambda: _gen_children(full_request["parent"]),
+    }
+
+
+def micro_benchmarks() -> Dict[str, Callable[[], object]]:
+    full_request = load_json_as_dict(FULL_IROUTE_REQUEST)
+    cert_request = load_json_as_dict(FULL_CERT_REQUEST)
+    # A resourceVersion makes repeat syncs of the same request hit the steady-state fast path
+    steady_request = copy.deepcopy(full_request)
+    steady_request["parent"]["metadata"]["resourceVersion"] = "1"
+
+    benchmarks = {
+        "sync/minimal/uncached": lambda: _uncached_sync(MINIMAL_IROUTE_REQUEST),
+        "sync/minimal/cached": lambda: _cached_sync(MINIMAL_IROUTE_REQUEST),
+        "sync/full/uncached": lambda: _uncached_sync(full_request),
+        "sync/full/cached": lambda: _cached_sync(full_request),
+        "sync/full/steady-state": lambda: _cached_sync(steady_request),
+    }
+
+    for scale in SYNC_SCALES:
+        scaled = scaled_sync_request(full_request, scale)
+        benchmarks[f"sync/scaled-{scale}/uncached"] = lambda r=scaled: _uncached_sync(r)
+        benchmarks[f"sync/scaled-{scale}/cached"] = lambda r=scaled: _cached_sync(r)
+
+    for count in ALT_NAME_COUNTS:
+        request = cert_request_with_alt_names(cert_request, count)
+        benchmarks[f"sync_certificate/alt-names-{count}"] = (
+            lambda r=request: encode_response(sync_certificate(r))
+        )
+
+    response = sync(full_request)
+    plain_response = {
+        "status": response["status"],
+        "children": list(response["children"]),
+    }
+    benchmarks["encode/full-response"] = lambda: dumps(plain_response)
+    benchmarks["encode/pre-encoded-children"] = lambda: encode_response(response)
+
+    with open(FULL_IROUTE_REQUEST, "rb") as f:
+        raw_body = f.read()
+
+    for c in (get_codec(name) for name in installed_codecs()):
+        benchmarks[f"codec/{c.name}/decode"] = lambda c=c: c.loads(raw_body)
+        benchmarks[f"codec/{c.name}/encode"] = lambda c=c: c.dumps(plain_response)
+
+    decoders = {"full": codec.loads}
+    if msgspec_installed():
+        decoders["selective"] = SelectiveDecoder(REQUEST_SHAPE).loads
+
+    for count in MANAGED_FIELDS_COUNTS:
+        body = dumps(sync_request_with_managed_fields(full_request, count))
+        for name, loads in decoders.items():
+            benchmarks[f"decode/managed-fields-{count}/{name}"] = (
+                lambda loads=loads, body=body: loads(body)
+            )
+
+    # Payload logging with DEBUG disabled, as in production
+    logger = logging.getLogger("webhook.benchmark")
+    logger.setLevel(logging.INFO)
+    payload_logger = PayloadLogger(logger)
+
+    benchmarks["log/info/eager-f-string"] = lambda: logger.debug(
+        f"Webhook response:\n {dumps(plain_response).decode()}"
+    )
+    benchmarks["log/info/payload-logger"] = lambda: payload_logger.log(
+        "Webhook response", plain_response
+    )
+
+    return benchmarks
+
+
+async def asgi_post(
+    asgi_app, path: str, body: bytes, headers: Sequence[Tuple[bytes, bytes]] = ()
+) -> int:
+    """Sends a POST request directly through the ASGI app, returning the response status code."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 7080),
+    }
+    request_sent = False
+    status_code = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await asgi_app(scope, receive, send)
+    return status_code
+
+
+async def _run_http_load(
+    path: str,
+    body: bytes,
+    requests: int,
+    concurrency: int,
+    headers: Sequence[Tuple[bytes, bytes]],
+) -> List[float]:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with semaphore:
+            start = time.perf_counter()
+            status_code = await asgi_post(app, path, body, headers)
+            latencies.append(time.perf_counter() - start)
+            if status_code != 200:
+                raise RuntimeError(f"{path} responded with status {status_code}")
+
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    return latencies
+
+
+def http_benchmark(
+    path: str,
+    body: bytes,
+    requests: int,
+    concurrency: int,
+    headers: Sequence[Tuple[bytes, bytes]] = (),
+) -> dict:
+    start = time.perf_counter()
+    latencies = asyncio.run(_run_http_load(path, body, requests, concurrency, headers))
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "us_per_call": elapsed / requests * 1e6,
+        "p50_us": percentiles[49] * 1e6,
+        "p99_us": percentiles[98] * 1e6,
+        "requests_per_second": requests / elapsed,
+    }
+
+
+def run(name_filter: str, http_requests: int, concurrency: int) -> dict:
+    results = {}
+
+    for name, func in micro_benchmarks().items():
+        if name_filter in name:
+            results[name] = {"us_per_call": time_per_call(func) * 1e6}
+            print(f"{name:<45} {results[name]['us_per_call']:>10.1f} us/call")
+
+    for name, func in allocation_benchmarks().items():
+        if name_filter in name:
+            results[name] = allocations_per_call(func)
+            print(
+                f"{name:<45} {results[name]['blocks_per_call']:>10.1f} blocks/call"
+                f"  {results[name]['bytes_per_call']:.0f} bytes/call"
+            )
+
+    with open(FULL_IROUTE_REQUEST, "rb") as f:
+        iroute_body = f.read()
+    with open(FULL_CERT_REQUEST, "rb") as f:
+        cert_body = f.read()
+
+    gzip_headers = [(b"accept-encoding", b"gzip")]
+    http_benchmarks = {
+        "http/sync": ("/sync", iroute_body, ()),
+        "http/sync-gzip": ("/sync", iroute_body, gzip_headers),
+        "http/sync-batch-10": (
+            "/sync/batch",
+            b"[" + b",".join([iroute_body] * 10) + b"]",
+            (),
+        ),
+        "http/certmanager-sync": ("/addons/certmanager/sync", cert_body, ()),
+    }
+
+    for name, (path, body, headers) in http_benchmarks.items():
+        if name_filter in name:
+            results[name] = http_benchmark(
+                path, body, http_requests, concurrency, headers
+            )
+            print(
+                f"{name:<45} {results[name]['us_per_call']:>10.1f} us/call"
+                f"  p50 {results[name]['p50_us']:.0f}us"
+                f"  p99 {results[name]['p99_us']:.0f}us"
+                f"  {results[name]['requests_per_second']:.0f} req/s"
+            )
+
+    return {
+        "python": platform.python_version(),
+        "codec": codec.name,
+        "results": results,
+    }
+
+
+def find_regressions(
+    current: Mapping, baseline: Mapping, threshold: float
+) -> List[str]:
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or "us_per_call" not in base:
+            continue
+        ratio = result["us_per_call"] / base["us_per_call"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {base['us_per_call']:.1f}us -> {result['us_per_call']:.1f}us ({ratio - 1:+.0%})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON file to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slowdown vs the baseline considered a regression",
+    )
+    parser.add_argument(
+        "--filter", default="", help="Only run benchmarks whose name contains this"
+    )
+    parser.add_argument("--http-requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.http_requests, args.concurrency)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions above {args.threshold:.0%}:")
+            print("\n".join(regressions))
+            return 1
+        print(f"\nNo regressions above {args.threshold:.0%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
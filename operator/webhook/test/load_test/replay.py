@@ -0,0 +1,427 @@
+"""
+Cluster-scale replay of Metacontroller sync requests against the webhook. Run from the operator directory:
+
+    python -m webhook.test.load_test.replay [--routes 1000] [--rounds 5] [--concurrency 32] [--server | --url URL]
+
+A local stand-in for Metacontroller drives a synthetic cluster of IntegrationRoutes (see synthetic.py) through
+`--rounds` resync rounds. Each round, every route is synced through /sync, and routes with cert-manager annotations
+through /addons/certmanager/sync as well, from `--concurrency` concurrent clients. Like Metacontroller and the API
+server, the stand-in:
+    - writes the returned status back to the route, bumping its resourceVersion when the status changed
+    - creates the route's Deployment once it is first returned as a child, and brings up one more ready replica
+      per round until the route is Ready
+    - updates the spec of `--change-rate` of the routes every round, bumping their generation
+
+Requests are sent to `webhook.app:app` in-process by default, to a `python -m webhook.server` started locally with
+`--server`, or to a running webhook with `--url`. The p50/p95/p99 latency, throughput and the webhook's RSS (when
+it runs locally) are reported, and can be written as JSON with `--output`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import urllib.parse
+from collections import Counter
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from webhook.test.load_test.server_load import free_port, start_server
+from webhook.test.load_test.synthetic import (
+    certificate_sync_request,
+    deployment_status,
+    route_sync_request,
+    synthetic_cluster,
+)
+
+SYNC_PATH = "/sync"
+
+CERTIFICATE_SYNC_PATH = "/addons/certmanager/sync"
+
+
+def _descendants(pid: int) -> List[int]:
+    """Returns the pids of a process's children, grandchildren etc., read from /proc (Linux only)."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces and parentheses, the parent pid is the second field after it
+                ppid = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    descendants = []
+    pending = list(children.get(pid, []))
+    while pending:
+        child = pending.pop()
+        descendants.append(child)
+        pending += children.get(child, [])
+    return descendants
+
+
+def _rss_mb(pids: List[int]) -> Dict[str, Optional[float]]:
+    """
+    Returns the total current and peak RSS of processes in MB, read from /proc (Linux only). The peak is the sum of
+    each process's own peak.
+    """
+    rss = {"rss_mb": None, "peak_rss_mb": None}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        key = "rss_mb"
+                    elif line.startswith("VmHWM:"):
+                        key = "peak_rss_mb"
+                    else:
+                        continue
+                    rss[key] = (rss[key] or 0) + int(line.split()[1]) / 1024
+        except OSError:
+            # Not on Linux, or the process exited since it was listed
+            pass
+    return rss
+
+
+class InProcessTransport:
+    """Sends requests directly through the ASGI app, running its lifespan like the server does."""
+
+    name = "in-process"
+
+    def __init__(self) -> None:
+        from webhook.app import app, lifespan
+
+        self._app = app
+        self._lifespan = lifespan(app)
+
+    async def __aenter__(self) -> "InProcessTransport":
+        await self._lifespan.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._lifespan.__aexit__(*exc_info)
+
+    async def post(self, path: str, body: bytes) -> Tuple[int, bytes]:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("127.0.0.1", 7080),
+        }
+        request_sent = False
+        status_code = 0
+        chunks = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self._app(scope, receive, send)
+        return status_code, b"".join(chunks)
+
+    def rss(self) -> Dict[str, Optional[float]]:
+        return _rss_mb([os.getpid()])
+
+
+class HttpTransport:
+    """Sends requests over keep-alive HTTP/1.1 connections, with a minimal client to leave the CPU to the server."""
+
+    name = "http"
+
+    def __init__(self, host: str, port: int, pid: Optional[int] = None) -> None:
+        self._host = host
+        self._port = port
+        self._pid = pid
+        self._connections: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def __aenter__(self) -> "HttpTransport":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        for _, writer in self._connections:
+            writer.close()
+        self._connections.clear()
+
+    async def post(self, path: str, body: bytes) -> Tuple[int, bytes]:
+        if self._connections:
+            reader, writer = self._connections.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self._host, self._port)
+
+        writer.write(
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self._host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+        head = await reader.readuntil(b"\r\n\r\n")
+        status_code = int(head.split(b" ", 2)[1])
+        content_length = 0
+        keep_alive = True
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                content_length = int(value)
+            elif name == b"connection" and value.strip().lower() == b"close":
+                keep_alive = False
+        content = await reader.readexactly(content_length)
+
+        if keep_alive:
+            self._connections.append((reader, writer))
+        else:
+            writer.close()
+        return status_code, content
+
+    def rss(self) -> Dict[str, Optional[float]]:
+        if self._pid is None:
+            return {"rss_mb": None, "peak_rss_mb": None}
+        # With SERVER_WORKERS > 1 the workers are children of the supervisor process
+        try:
+            pids = [self._pid] + _descendants(self._pid)
+        except OSError:
+            pids = [self._pid]
+        return _rss_mb(pids)
+
+
+class MetacontrollerStandIn:
+    """Keeps the state of a synthetic cluster, and turns it into sync requests like Metacontroller would."""
+
+    def __init__(self, routes: List[dict], change_rate: float, seed: int) -> None:
+        self.routes = routes
+        self.change_rate = change_rate
+        self._rng = random.Random(seed)
+        # Observed Deployment status by route name, None until the Deployment is created
+        self.deployments: Dict[str, Optional[dict]] = {
+            r["metadata"]["name"]: None for r in routes
+        }
+
+    def requests(self) -> List[Tuple[str, dict]]:
+        """Returns the sync calls of one resync round."""
+        calls = []
+        for route in self.routes:
+            name = route["metadata"]["name"]
+            calls.append((SYNC_PATH, route_sync_request(route, self.deployments[name])))
+            if any("cert-manager.io" in a for a in route["metadata"]["annotations"]):
+                calls.append((CERTIFICATE_SYNC_PATH, certificate_sync_request(route)))
+        return calls
+
+    def apply(self, path: str, request: Mapping, response: Mapping) -> None:
+        """Writes the result of a sync call back to the cluster state."""
+        if path != SYNC_PATH:
+            return
+
+        route = request["parent"]
+        name = route["metadata"]["name"]
+        if route.get("status") != response["status"]:
+            route["status"] = response["status"]
+            _bump_resource_version(route)
+
+        has_deployment = any(c["kind"] == "Deployment" for c in response["children"])
+        if has_deployment and self.deployments[name] is None:
+            self.deployments[name] = deployment_status(route["spec"]["replicas"], 0)
+
+    def end_round(self) -> None:
+        """Brings up one more replica of each rolling out route, and updates the spec of some routes."""
+        for route in self.routes:
+            name = route["metadata"]["name"]
+            status = self.deployments[name]
+            replicas = route["spec"]["replicas"]
+            if status is not None and status["readyReplicas"] != replicas:
+                ready = min(status["readyReplicas"] + 1, replicas)
+                self.deployments[name] = deployment_status(replicas, ready)
+
+            if self._rng.random() < self.change_rate:
+                route["spec"]["replicas"] = self._rng.choice((1, 2, 3))
+                route["metadata"]["generation"] += 1
+                _bump_resource_version(route)
+
+    def ready_routes(self) -> int:
+        return sum(
+            1
+            for route in self.routes
+            for c in route.get("status", {}).get("conditions", [])
+            if c["type"] == "Ready" and c["status"] == "True"
+        )
+
+
+def _bump_resource_version(route: dict) -> None:
+    metadata = route["metadata"]
+    metadata["resourceVersion"] = str(int(metadata["resourceVersion"]) + 1)
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    if len(latencies) < 2:
+        value = latencies[0] * 1e3 if latencies else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "p50_ms": percentiles[49] * 1e3,
+        "p95_ms": percentiles[94] * 1e3,
+        "p99_ms": percentiles[98] * 1e3,
+    }
+
+
+async def replay(
+    transport,
+    stand_in: MetacontrollerStandIn,
+    rounds: int,
+    concurrency: int,
+) -> dict:
+    latencies: Dict[str, List[float]] = {SYNC_PATH: [], CERTIFICATE_SYNC_PATH: []}
+    status_codes: Counter = Counter()
+    elapsed = 0.0
+
+    async def client(queue: asyncio.Queue):
+        while not queue.empty():
+            path, request = queue.get_nowait()
+            body = json.dumps(request).encode()
+            start = time.perf_counter()
+            status_code, content = await transport.post(path, body)
+            latencies[path].append(time.perf_counter() - start)
+            status_codes[status_code] += 1
+            if status_code == 200:
+                stand_in.apply(path, request, json.loads(content))
+
+    for _ in range(rounds):
+        queue: asyncio.Queue = asyncio.Queue()
+        for call in stand_in.requests():
+            queue.put_nowait(call)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(queue) for _ in range(concurrency)))
+        elapsed += time.perf_counter() - start
+        stand_in.end_round()
+
+    all_latencies = [t for path_latencies in latencies.values() for t in path_latencies]
+    requests = len(all_latencies)
+    return {
+        "transport": transport.name,
+        "routes": len(stand_in.routes),
+        "rounds": rounds,
+        "concurrency": concurrency,
+        "requests": requests,
+        "status_codes": {str(k): v for k, v in sorted(status_codes.items())},
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "latency": {
+            "all": _percentiles(all_latencies),
+            **{path: _percentiles(t) for path, t in latencies.items() if t},
+        },
+        "ready_routes": stand_in.ready_routes(),
+        **transport.rss(),
+    }
+
+
+async def _run(args, server_pid: Optional[int] = None, port: int = 0) -> dict:
+    stand_in = MetacontrollerStandIn(
+        synthetic_cluster(args.routes, args.seed), args.change_rate, args.seed
+    )
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        transport = HttpTransport(url.hostname, url.port or 80)
+    elif args.server:
+        transport = HttpTransport("127.0.0.1", port, server_pid)
+    else:
+        transport = InProcessTransport()
+
+    async with transport:
+        return await replay(transport, stand_in, args.rounds, args.concurrency)
+
+
+def format_result(result: Mapping) -> str:
+    lines = [
+        f"{result['transport']}: {result['routes']} routes, {result['rounds']} rounds, "
+        f"concurrency {result['concurrency']}",
+        f"  {result['requests']} requests, {result['requests_per_second']:.0f} req/s, "
+        f"status codes {result['status_codes']}, {result['ready_routes']} routes Ready",
+    ]
+    for path, p in result["latency"].items():
+        lines.append(
+            f"  {path:<26} p50 {p['p50_ms']:.2f}ms  p95 {p['p95_ms']:.2f}ms  p99 {p['p99_ms']:.2f}ms"
+        )
+    if result["rss_mb"] is not None:
+        lines.append(
+            f"  webhook RSS {result['rss_mb']:.1f} MB (peak {result['peak_rss_mb']:.1f} MB)"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--routes", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--change-rate",
+        type=float,
+        default=0.05,
+        help="Fraction of the routes whose spec is updated each round",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--server",
+        action="store_true",
+        help="Start a local webhook server and send requests over HTTP",
+    )
+    target.add_argument("--url", help="Base URL of a running webhook")
+    parser.add_argument(
+        "--server-env",
+        nargs="*",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Settings of the server started with --server",
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.server:
+        port = free_port()
+        env = dict(item.split("=", 1) for item in args.server_env)
+        process = start_server(env, port)
+        try:
+            result = asyncio.run(_run(args, process.pid, port))
+        finally:
+            process.terminate()
+            process.wait()
+    else:
+        result = asyncio.run(_run(args))
+
+    print(format_result(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
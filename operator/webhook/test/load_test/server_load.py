@@ -0,0 +1,204 @@
+"""
+Load test comparing webhook server configurations over real HTTP connections. Run from the operator directory:
+
+    python -m webhook.test.load_test.server_load [--requests 5000] [--concurrency 50] [--config NAME ...]
+
+Each configuration starts `python -m webhook.server` on a free local port with its SERVER_* settings as environment
+variables, waits for it to be ready, and sends it the full IntegrationRoute sync request from `--concurrency`
+concurrent clients. Responses other than 200 (e.g. 503s past SERVER_LIMIT_CONCURRENCY) are counted as rejected.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Mapping, NamedTuple
+
+import httpx
+
+_OPERATOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), *[".."] * 3)
+
+FULL_IROUTE_REQUEST = os.path.join(
+    _OPERATOR_DIR, "webhook", "core", "test", "json", "full-iroute-request.json"
+)
+
+_READY_TIMEOUT_SECONDS = 30
+
+
+class Configuration(NamedTuple):
+    # Server settings, passed as environment variables
+    env: Mapping[str, str]
+    # Whether the clients reuse connections
+    keep_alive: bool = True
+
+
+CONFIGURATIONS: Dict[str, Configuration] = {
+    "h11-asyncio": Configuration({"SERVER_HTTP": "h11", "SERVER_LOOP": "asyncio"}),
+    "httptools-uvloop": Configuration(
+        {"SERVER_HTTP": "httptools", "SERVER_LOOP": "uvloop"}
+    ),
+    "httptools-uvloop-no-keep-alive": Configuration(
+        {"SERVER_HTTP": "httptools", "SERVER_LOOP": "uvloop"}, keep_alive=False
+    ),
+    "httptools-uvloop-limit-16": Configuration(
+        {
+            "SERVER_HTTP": "httptools",
+            "SERVER_LOOP": "uvloop",
+            "SERVER_LIMIT_CONCURRENCY": "16",
+        }
+    ),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env: Mapping[str, str], port: int) -> subprocess.Popen:
+    server_env = os.environ | {
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "LOG_LEVEL": "WARNING",
+        **env,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "webhook.server"],
+        cwd=_OPERATOR_DIR,
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + _READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+
+    process.terminate()
+    raise RuntimeError(f"Server not ready after {_READY_TIMEOUT_SECONDS} seconds")
+
+
+async def _post(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes
+) -> int:
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_code = int(head.split(b" ", 2)[1])
+    for line in head.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            await reader.readexactly(int(value))
+            break
+    return status_code
+
+
+async def _run_load(
+    port: int, body: bytes, requests: int, concurrency: int, keep_alive: bool
+) -> dict:
+    """
+    Sends the requests from `concurrency` clients. A minimal HTTP/1.1 client is used, so that the client (sharing the
+    CPU with the server) costs as little as possible.
+    """
+    latencies: List[float] = []
+    rejected = 0
+    remaining = requests
+
+    request = (
+        b"POST /sync HTTP/1.1\r\n"
+        b"Host: 127.0.0.1\r\n"
+        b"Content-Type: application/json\r\n"
+        + (b"" if keep_alive else b"Connection: close\r\n")
+        + f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+
+    async def client():
+        nonlocal rejected, remaining
+        connection = None
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            if connection is None:
+                connection = await asyncio.open_connection("127.0.0.1", port)
+            status_code = await _post(*connection, request)
+            latencies.append(time.perf_counter() - start)
+            if status_code != 200:
+                rejected += 1
+            if not keep_alive or status_code != 200:
+                connection[1].close()
+                connection = None
+        if connection:
+            connection[1].close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": percentiles[49] * 1e3,
+        "p99_ms": percentiles[98] * 1e3,
+        "rejected": rejected,
+    }
+
+
+def run_configuration(
+    config: Configuration, body: bytes, requests: int, concurrency: int
+) -> dict:
+    port = free_port()
+    process = start_server(config.env, port)
+    try:
+        # Warms up the server before measuring
+        asyncio.run(_run_load(port, body, concurrency * 4, concurrency, True))
+        return asyncio.run(
+            _run_load(port, body, requests, concurrency, config.keep_alive)
+        )
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--config",
+        nargs="+",
+        choices=list(CONFIGURATIONS),
+        default=list(CONFIGURATIONS),
+        help="Configurations to run (default: all)",
+    )
+    args = parser.parse_args(argv)
+
+    with open(FULL_IROUTE_REQUEST, "rb") as f:
+        body = f.read()
+
+    for name in args.config:
+        result = run_configuration(
+            CONFIGURATIONS[name], body, args.requests, args.concurrency
+        )
+        print(
+            f"{name:<35} {result['requests_per_second']:>8.0f} req/s"
+            f"  p50 {result['p50_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms"
+            f"  rejected {result['rejected']}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
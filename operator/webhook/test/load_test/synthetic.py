@@ -0,0 +1,214 @@
+"""Builders for synthetic Metacontroller sync requests, used by the benchmarks and load tests."""
+
+import copy
+import random
+import uuid
+from typing import Any, List, Mapping, Optional
+
+_KEYSTORE_TYPES = ("jks", "pkcs12")
+
+
+def scaled_sync_request(base: Mapping[str, Any], scale: int) -> dict:
+    """
+    Returns a copy of an IntegrationRoute sync request with `scale` env vars, PVCs, configMaps, secretSources and
+    propSources added to the parent spec.
+    """
+    request = copy.deepcopy(base)
+    spec = request["parent"]["spec"]
+
+    spec["env"] = spec.get("env", []) + [
+        {"name": f"SYNTHETIC_ENV_{i}", "value": f"value-{i}"} for i in range(scale)
+    ]
+    spec["persistentVolumeClaims"] = spec.get("persistentVolumeClaims", []) + [
+        {"claimName": f"synthetic-pvc-{i}", "mountPath": f"/mnt/pvc-{i}"}
+        for i in range(scale)
+    ]
+    spec["configMaps"] = spec.get("configMaps", []) + [
+        {"name": f"synthetic-cm-{i}", "mountPath": f"/mnt/cm-{i}"} for i in range(scale)
+    ]
+    spec["secretSources"] = spec.get("secretSources", []) + [
+        f"synthetic-secret-{i}" for i in range(scale)
+    ]
+    spec["propSources"] = spec.get("propSources", []) + [
+        {"name": f"synthetic-props-{i}"} for i in range(scale)
+    ]
+
+    return request
+
+
+def cert_request_with_alt_names(base: Mapping[str, Any], count: int) -> dict:
+    """Returns a copy of a certificate sync request with `count` cert-manager alt-names."""
+    request = copy.deepcopy(base)
+    annotations = request["object"]["metadata"].setdefault("annotations", {})
+    annotations["cert-manager.io/alt-names"] = ",".join(
+        f"alt-{i}.example.com" for i in range(count)
+    )
+    return request
+
+
+def sync_request_with_managed_fields(base: Mapping[str, Any], count: int) -> dict:
+    """
+    Returns a copy of a sync request with `count` managedFields entries added to the parent (or decorated object) and
+    to each observed child, as found in the bodies of long-lived, frequently updated routes.
+    """
+    request = copy.deepcopy(base)
+
+    def managed_fields():
+        return [
+            {
+                "apiVersion": "apps/v1",
+                "fieldsType": "FieldsV1",
+                "fieldsV1": {
+                    "f:spec": {f"f:synthetic-field-{j}": {} for j in range(20)}
+                },
+                "manager": f"synthetic-manager-{i}",
+                "operation": "Update",
+                "time": "2023-09-06T01:25:12Z",
+            }
+            for i in range(count)
+        ]
+
+    request.get("parent", request.get("object"))["metadata"][
+        "managedFields"
+    ] = managed_fields()
+    for children in request.get("children", {}).values():
+        for child in children.values():
+            child.setdefault("metadata", {})["managedFields"] = managed_fields()
+
+    return request
+
+
+def synthetic_route(index: int, rng: random.Random) -> dict:
+    """
+    Returns an IntegrationRoute with a random mix of the spec features seen in clusters: TLS keystores and
+    truststores of either type, propSources, secretSources, PVCs, configMaps, env vars and cert-manager annotations
+    (for routes with a keystore).
+    """
+    name = f"route-{index}"
+    namespace = f"namespace-{index % 10}"
+    spec: dict = {"routeConfigMap": f"{name}-xml", "replicas": rng.choice((1, 2, 3))}
+
+    if rng.random() < 0.5:
+        spec["propSources"] = [
+            {"name": f"{name}-props"},
+            {"labels": {"group": "common"}},
+        ]
+    if rng.random() < 0.5:
+        spec["secretSources"] = [f"{name}-secret-{i}" for i in range(rng.randint(1, 3))]
+    if rng.random() < 0.3:
+        spec["persistentVolumeClaims"] = [
+            {"claimName": f"{name}-pvc", "mountPath": "/var/data"}
+        ]
+    if rng.random() < 0.3:
+        spec["configMaps"] = [
+            {"name": f"{name}-cm-{i}", "mountPath": f"/etc/cm-{i}"}
+            for i in range(rng.randint(1, 3))
+        ]
+    if rng.random() < 0.5:
+        spec["env"] = [
+            {"name": f"ENV_VAR_{i}", "value": f"value-{i}"}
+            for i in range(rng.randint(1, 10))
+        ]
+
+    annotations = {}
+    tls = {}
+    if rng.random() < 0.5:
+        keystore_type = rng.choice(_KEYSTORE_TYPES)
+        tls["keystore"] = {
+            keystore_type: {
+                "secretName": f"{name}-certstore",
+                "key": f"keystore.{keystore_type}",
+                "passwordSecretRef": f"{name}-keystore-password",
+            }
+        }
+        if rng.random() < 0.7:
+            annotations["cert-manager.io/cluster-issuer"] = "cluster-ca"
+            annotations["cert-manager.io/alt-names"] = ",".join(
+                f"{name}-{i}.example.com" for i in range(rng.randint(0, 5))
+            )
+    if rng.random() < 0.5:
+        truststore_type = rng.choice(_KEYSTORE_TYPES)
+        tls["truststore"] = {
+            truststore_type: {
+                "configMapName": "cluster-truststore",
+                "key": f"truststore.{truststore_type}",
+            }
+        }
+    if tls:
+        spec["tls"] = tls
+
+    return {
+        "apiVersion": "keip.octo.com/v1alpha1",
+        "kind": "IntegrationRoute",
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "uid": str(uuid.UUID(int=rng.getrandbits(128))),
+            "generation": 1,
+            "resourceVersion": str(rng.randint(1, 10**6)),
+            "annotations": annotations,
+        },
+        "spec": spec,
+    }
+
+
+def synthetic_cluster(routes: int, seed: int = 0) -> List[dict]:
+    """Returns `routes` synthetic IntegrationRoutes, the same ones for a given seed."""
+    rng = random.Random(seed)
+    return [synthetic_route(i, rng) for i in range(routes)]
+
+
+def deployment_status(replicas: int, ready_replicas: int) -> dict:
+    """Returns the status of a route's Deployment with `ready_replicas` of `replicas` ready."""
+    available = ready_replicas > 0
+    return {
+        "replicas": replicas,
+        "readyReplicas": ready_replicas,
+        "availableReplicas": ready_replicas,
+        "conditions": [
+            {
+                "type": "Available",
+                "status": str(available),
+                "reason": (
+                    "MinimumReplicasAvailable"
+                    if available
+                    else "MinimumReplicasUnavailable"
+                ),
+                "lastTransitionTime": "2023-09-06T01:25:12Z",
+            }
+        ],
+    }
+
+
+def route_sync_request(route: Mapping[str, Any], status: Optional[dict]) -> dict:
+    """
+    Returns the CompositeController sync request for a route, observing its Deployment with the given status (or no
+    Deployment if None).
+    """
+    name = route["metadata"]["name"]
+    deployments = {}
+    if status is not None:
+        deployments[name] = {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": {"name": name, "namespace": route["metadata"]["namespace"]},
+            "status": status,
+        }
+    return {
+        "controller": {"kind": "CompositeController"},
+        "parent": route,
+        "children": {"Deployment.apps/v1": deployments, "Service.v1": {}},
+        "related": {},
+        "finalizing": False,
+    }
+
+
+def certificate_sync_request(route: Mapping[str, Any]) -> dict:
+    """Returns the DecoratorController sync request for a route."""
+    return {
+        "controller": {"kind": "DecoratorController"},
+        "object": route,
+        "attachments": {"Certificate.cert-manager.io/v1": {}},
+        "related": {},
+        "finalizing": False,
+    }
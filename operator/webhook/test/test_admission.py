@@ -0,0 +1,183 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+import webhook.app
+from webhook import metrics
+from webhook.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    AdmissionController,
+    Overloaded,
+)
+from webhook.app import app
+
+CERT_REQUEST = {"object": {"metadata": {"name": "route", "namespace": "default"}}}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def busy_controller(interval: float, **kwargs) -> AdmissionController:
+    """Returns a controller whose moving average converged on requests taking `interval` each."""
+    admission = AdmissionController(clock=FakeClock(), **kwargs)
+    for _ in range(200):
+        with admission.track():
+            admission._clock.now += interval
+    return admission
+
+
+def test_first_sample_smoothed():
+    clock = FakeClock()
+    admission = AdmissionController(deadline=8, clock=clock)
+
+    with admission.track():
+        clock.now += 5
+
+    assert admission.interval == pytest.approx(0.5)
+
+
+def test_service_time_while_busy_is_interval_between_completions():
+    admission = busy_controller(1.0, deadline=8)
+    clock = admission._clock
+
+    # Started together, the second request completes 0.2s after the first
+    for _ in range(200):
+        with admission.track():
+            with admission.track():
+                clock.now += 0.2
+            clock.now += 0.2
+
+    assert admission.interval == pytest.approx(0.2)
+    assert admission.in_flight == 0
+
+
+@pytest.mark.parametrize("in_flight,expected", [(0, 0.5), (1, 0.5), (4, 2.0)])
+def test_estimated_delay(in_flight, expected):
+    admission = busy_controller(0.5, deadline=8)
+
+    with contextlib.ExitStack() as stack:
+        for _ in range(in_flight):
+            stack.enter_context(admission.track())
+
+        assert admission.estimated_delay() == pytest.approx(expected)
+
+
+def test_estimate_decays_while_idle():
+    admission = busy_controller(4.0, deadline=8)
+
+    admission._clock.now += 3
+    with admission.track():
+        assert admission.interval == pytest.approx(0.5)
+
+
+def test_admission_recovers_after_slow_burst():
+    admission = busy_controller(5.0, deadline=8, low_priority_fraction=0.5)
+    clock = admission._clock
+
+    shed = 0
+    for _ in range(1000):
+        clock.now += 0.01
+        with contextlib.suppress(Overloaded), admission.track():
+            try:
+                admission.admit(PRIORITY_LOW)
+            except Overloaded:
+                shed += 1
+                raise
+            clock.now += 0.001
+
+    assert 0 < shed < 100
+    assert admission.interval < 0.01
+
+
+def test_low_priority_shed_first():
+    admission = busy_controller(1.0, deadline=4, low_priority_fraction=0.5)
+
+    with admission.track(), admission.track(), admission.track():
+        admission.admit(PRIORITY_HIGH)
+        with pytest.raises(Overloaded):
+            admission.admit(PRIORITY_LOW)
+
+        with admission.track(), admission.track():
+            with pytest.raises(Overloaded):
+                admission.admit(PRIORITY_HIGH)
+
+    assert admission.in_flight == 0
+
+
+def test_shed_requests_not_counted_as_completions():
+    admission = busy_controller(1.0, deadline=0.5)
+
+    with pytest.raises(Overloaded):
+        with admission.track():
+            admission.admit(PRIORITY_HIGH)
+
+    assert admission.interval == pytest.approx(1.0)
+
+
+def test_admission_disabled():
+    admission = busy_controller(100.0, deadline=0)
+
+    with admission.track():
+        admission.admit(PRIORITY_LOW)
+
+    assert not admission.enabled
+
+
+def test_loop_lag_probe():
+    admission = AdmissionController(deadline=8, probe_interval=0.01)
+
+    async def run():
+        admission.start()
+        await asyncio.sleep(0)
+        # Blocks the event loop, as an inline sync call would
+        time.sleep(0.05)
+        await asyncio.sleep(0.005)
+        lag = admission.loop_lag
+        await admission.stop()
+        return lag
+
+    assert asyncio.run(run()) >= 0.03
+    assert admission.loop_lag == 0
+
+
+def test_sync_endpoint_sheds_when_overloaded(monkeypatch):
+    monkeypatch.setattr(webhook.app, "_ADMISSION", busy_controller(10.0, deadline=8))
+    shed = metrics.SHED_REQUESTS.labels("/addons/certmanager/sync", PRIORITY_HIGH)
+    shed_before = shed.value()
+
+    response = TestClient(app).post("/addons/certmanager/sync", json=CERT_REQUEST)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert shed.value() == shed_before + 1
+
+
+def test_sync_endpoint_admits_under_deadline(monkeypatch):
+    monkeypatch.setattr(webhook.app, "_ADMISSION", busy_controller(1.0, deadline=8))
+
+    response = TestClient(app).post("/addons/certmanager/sync", json=CERT_REQUEST)
+
+    assert response.status_code == 200
+
+
+def test_batch_endpoint_sheds_items_when_overloaded(monkeypatch):
+    monkeypatch.setattr(webhook.app, "_ADMISSION", busy_controller(10.0, deadline=8))
+    shed = metrics.SHED_REQUESTS.labels("/addons/certmanager/sync/batch", PRIORITY_HIGH)
+    shed_before = shed.value()
+
+    response = TestClient(app).post(
+        "/addons/certmanager/sync/batch", json=[CERT_REQUEST, CERT_REQUEST]
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [{"error": "Webhook is overloaded, retry later"}] * 2
+    assert shed.value() == shed_before + 2
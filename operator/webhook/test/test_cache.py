@@ -0,0 +1,111 @@
+import json
+
+from webhook.cache import LRUCache, retained_size
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_and_miss_counters():
+    cache = LRUCache(max_entries=2)
+
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.entries == 1
+
+
+def test_cache_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats().evictions == 1
+
+
+def test_cache_evicts_when_max_bytes_exceeded():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", 1, size=60)
+    cache.put("b", 2, size=60)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats().bytes == 60
+
+
+def test_cache_rejects_entry_larger_than_max_bytes():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", 1, size=101)
+
+    assert cache.get("a") is None
+    assert cache.stats().entries == 0
+
+
+def test_cache_replacing_key_updates_size():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", 1, size=60)
+    cache.put("a", 2, size=30)
+
+    stats = cache.stats()
+    assert cache.get("a") == 2
+    assert stats.entries == 1
+    assert stats.bytes == 30
+
+
+def test_cache_entry_expires_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 4.9
+    assert cache.get("a") == 1
+
+    clock.now = 5
+    assert cache.get("a") is None
+    assert cache.stats().evictions == 1
+
+
+def test_cache_disabled_with_zero_max_entries():
+    cache = LRUCache(max_entries=0)
+    cache.put("a", 1)
+
+    assert not cache.enabled
+    assert cache.get("a") is None
+
+
+def test_cache_clear_resets_stats():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.get("a")
+
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.stats().hits == 0
+
+
+def test_retained_size_counts_nested_values():
+    value = [{"name": "route", "replicas": 2}, ("a", "b")]
+
+    assert retained_size(value) > 2 * len(json.dumps(value))
+
+
+def test_retained_size_counts_shared_values_once():
+    shared = "x" * 1000
+
+    assert retained_size([shared, shared]) < retained_size([shared, "y" * 1000])
@@ -0,0 +1,291 @@
+import asyncio
+import copy
+import threading
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+import webhook.app
+from webhook import config as cfg
+from webhook import metrics
+from webhook.addons.certmanager.main import coalescing_key as certificate_key
+from webhook.coalescing import SingleFlight
+from webhook.core.sync import REQUEST_SHAPE
+from webhook.core.sync import coalescing_key as sync_key
+from webhook.executor import SyncExecutor
+
+ROUTE_REQUEST = {
+    "parent": {
+        "metadata": {
+            "name": "route",
+            "namespace": "default",
+            "uid": "1234",
+            "resourceVersion": "1",
+        },
+        "spec": {"routeConfigMap": "route-xml", "replicas": 1},
+    },
+    "children": {"Deployment.apps/v1": {"route": {"status": {"replicas": 1}}}},
+}
+
+
+def test_concurrent_calls_with_same_key_share_result():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def run():
+        return await asyncio.gather(
+            single_flight.run("key", compute),
+            single_flight.run("key", compute),
+            single_flight.run("other", compute),
+        )
+
+    coalesced = coalesced_count()
+    first, second, other = asyncio.run(run())
+
+    assert first is second
+    assert other is not first
+    assert len(calls) == 2
+    assert coalesced_count() == coalesced + 1
+    assert single_flight.in_flight == 0
+
+
+def test_calls_without_key_not_coalesced():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+
+    async def run():
+        await asyncio.gather(
+            single_flight.run(None, compute), single_flight.run(None, compute)
+        )
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
+
+
+def test_exception_shared_with_coalesced_calls():
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise KeyError("parent")
+
+    async def run():
+        return await asyncio.gather(
+            single_flight.run("key", fail),
+            single_flight.run("key", fail),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, KeyError) for r in results)
+    assert single_flight.in_flight == 0
+
+
+def test_waiting_call_retried_when_shared_call_cancelled():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        leader = asyncio.create_task(single_flight.run("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.run("key", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(run())
+
+    assert isinstance(leader, asyncio.CancelledError)
+    assert follower == 2
+    assert single_flight.in_flight == 0
+
+
+def test_waiting_call_cancelled():
+    single_flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        leader = asyncio.create_task(single_flight.run("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.run("key", compute))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(run())
+
+    assert leader == "result"
+    assert isinstance(follower, asyncio.CancelledError)
+
+
+def test_unshared_exception_retried_by_waiting_calls():
+    single_flight = SingleFlight(unshared=(TimeoutError,))
+    calls = []
+
+    async def compute(deadline_exceeded):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if deadline_exceeded:
+            raise TimeoutError()
+        return "result"
+
+    async def run():
+        return await asyncio.gather(
+            single_flight.run("key", lambda: compute(True)),
+            single_flight.run("key", lambda: compute(False)),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(run())
+
+    assert isinstance(first, TimeoutError)
+    assert second == "result"
+    assert len(calls) == 2
+
+
+def test_sync_coalescing_key_identifies_parent_state():
+    other_status = copy.deepcopy(ROUTE_REQUEST)
+    other_status["children"]["Deployment.apps/v1"]["route"]["status"]["replicas"] = 2
+    other_version = copy.deepcopy(ROUTE_REQUEST)
+    other_version["parent"]["metadata"]["resourceVersion"] = "2"
+
+    key = sync_key(ROUTE_REQUEST)
+
+    assert key == sync_key(copy.deepcopy(ROUTE_REQUEST))
+    assert key != sync_key(other_status)
+    assert key != sync_key(other_version)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"parent": {"metadata": {"name": "route"}}, "children": {}},
+        {"parent": {"metadata": {"name": "route"}}, "children": {"a": 1}},
+    ],
+)
+def test_sync_coalescing_key_none_for_incomplete_requests(body):
+    assert sync_key(body) is None
+
+
+def test_certificate_coalescing_key():
+    metadata = {"name": "route", "uid": "1234", "resourceVersion": "7"}
+
+    assert certificate_key({"object": {"metadata": metadata}}) == ("1234", "7")
+    assert certificate_key({"object": {"metadata": {"name": "route"}}}) is None
+    assert certificate_key({}) is None
+
+
+def test_webhook_coalesces_concurrent_identical_requests(monkeypatch):
+    executor = SyncExecutor(mode="thread", workers=2, max_pending=8)
+    monkeypatch.setattr(webhook.app, "_SYNC_EXECUTOR", executor)
+    release = threading.Event()
+    calls = []
+
+    def blocking_sync(body):
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"children": [body["parent"]["metadata"]["name"]]}
+
+    app = Starlette(
+        routes=[
+            Route(
+                "/sync",
+                endpoint=webhook.app.build_webhook(
+                    blocking_sync, REQUEST_SHAPE, sync_key
+                ),
+                methods=["POST"],
+            )
+        ]
+    )
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            requests = [
+                asyncio.create_task(c.post("/sync", json=ROUTE_REQUEST))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.1)
+            release.set()
+            return await asyncio.gather(*requests)
+
+    try:
+        responses = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert [r.json() for r in responses] == [{"children": ["route"]}] * 3
+    assert len(calls) == 1
+
+
+def test_webhook_coalesced_request_not_failed_by_leader_deadline(monkeypatch):
+    executor = SyncExecutor(mode="thread", workers=2, max_pending=8)
+    monkeypatch.setattr(webhook.app, "_SYNC_EXECUTOR", executor)
+    calls = []
+
+    def slow_sync(body):
+        calls.append(1)
+        time.sleep(0.2)
+        return {"children": []}
+
+    app = Starlette(
+        routes=[
+            Route(
+                "/sync",
+                endpoint=webhook.app.build_webhook(slow_sync, REQUEST_SHAPE, sync_key),
+                methods=["POST"],
+            )
+        ]
+    )
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            leader = asyncio.create_task(
+                c.post(
+                    "/sync",
+                    json=ROUTE_REQUEST,
+                    headers={cfg.SYNC_DEADLINE_HEADER: "0.1"},
+                )
+            )
+            await asyncio.sleep(0.05)
+            follower = c.post(
+                "/sync", json=ROUTE_REQUEST, headers={cfg.SYNC_DEADLINE_HEADER: "60"}
+            )
+            return await asyncio.gather(leader, follower)
+
+    try:
+        leader, follower = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert leader.status_code == 504
+    assert follower.status_code == 200
+    assert len(calls) == 2
+
+
+def coalesced_count() -> float:
+    return metrics.COALESCED_REQUESTS.labels("").value()
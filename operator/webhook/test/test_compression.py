@@ -0,0 +1,164 @@
+import gzip
+import importlib.util
+import os
+
+import pytest
+from starlette.testclient import TestClient
+
+from webhook import metrics
+from webhook.app import app
+from webhook.compression import negotiate
+
+JSON_DIR = f"{os.path.dirname(os.path.abspath(__file__))}/json"
+
+ZSTD_INSTALLED = importlib.util.find_spec("zstandard") is not None
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "gzip"),
+        ("zstd;q=0.5, gzip", "zstd"),
+        ("zstd;q=0, gzip;q=0.1", "gzip"),
+        ("GZIP", "gzip"),
+        ("*", "zstd"),
+        ("*, zstd;q=0", "gzip"),
+        ("br", None),
+        ("", None),
+        ("gzip;q=0", None),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, ["zstd", "gzip"]) == expected
+
+
+def test_gzip_request_body_decompressed(test_client, route_request):
+    response = test_client.post(
+        "/sync",
+        content=gzip.compress(route_request.encode()),
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+
+    assert response.status_code == 200
+    assert "children" in response.json()
+
+
+def test_unrouted_path_passed_through(test_client, route_request):
+    response = test_client.post(
+        "/unrouted-1",
+        content=gzip.compress(route_request.encode()),
+        headers={"Content-Encoding": "gzip", "Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 404
+    assert "Content-Encoding" not in response.headers
+    for metric in (metrics.COMPRESSED_BYTES, metrics.REQUEST_ERRORS):
+        assert not any(labels[0] == "/unrouted-1" for labels in metric._children)
+
+
+@pytest.mark.skipif(not ZSTD_INSTALLED, reason="zstd requires zstandard")
+def test_zstd_request_body_decompressed(test_client, route_request):
+    import zstandard
+
+    response = test_client.post(
+        "/sync",
+        content=zstandard.ZstdCompressor().compress(route_request.encode()),
+        headers={"Content-Encoding": "zstd"},
+    )
+
+    assert response.status_code == 200
+    assert "children" in response.json()
+
+
+def test_unsupported_request_encoding_rejected(test_client, route_request):
+    response = test_client.post(
+        "/sync", content=route_request, headers={"Content-Encoding": "br"}
+    )
+
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize("body", [b"not gzip", gzip.compress(b'{"parent": {}}')[:-10]])
+def test_corrupt_gzip_request_body_rejected(test_client, body):
+    response = test_client.post(
+        "/sync", content=body, headers={"Content-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 400
+
+
+def test_decompressed_request_body_too_large(monkeypatch, test_client):
+    monkeypatch.setattr("webhook.compression.cfg.REQUEST_MAX_BYTES", 1024)
+
+    response = test_client.post(
+        "/sync",
+        content=gzip.compress(b" " * 1024 * 1024),
+        headers={"Content-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 413
+
+
+def test_response_compressed_when_accepted(test_client, route_request):
+    labels = ("/sync", "response", "gzip")
+    compressed = metrics.COMPRESSED_BYTES.labels(*labels).value()
+    uncompressed = metrics.UNCOMPRESSED_BYTES.labels(*labels).value()
+
+    response = test_client.post(
+        "/sync", content=route_request, headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert "children" in response.json()
+
+    compressed = metrics.COMPRESSED_BYTES.labels(*labels).value() - compressed
+    uncompressed = metrics.UNCOMPRESSED_BYTES.labels(*labels).value() - uncompressed
+    assert compressed == int(response.headers["Content-Length"])
+    assert uncompressed == len(response.content)
+    assert compressed < uncompressed
+
+
+def test_streamed_batch_response_compressed(test_client, route_request):
+    response = test_client.post(
+        "/sync/batch",
+        content=f"[{route_request},{route_request}]",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == 2
+
+
+@pytest.mark.parametrize(
+    "method, path, accept_encoding",
+    [
+        ("get", "/status", "gzip"),
+        ("post", "/sync", "identity"),
+    ],
+)
+def test_response_not_compressed(
+    test_client, route_request, method, path, accept_encoding
+):
+    kwargs = {"content": route_request} if method == "post" else {}
+
+    response = getattr(test_client, method)(
+        path, headers={"Accept-Encoding": accept_encoding}, **kwargs
+    )
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+@pytest.fixture(scope="module")
+def route_request() -> str:
+    with open(f"{JSON_DIR}/full-route-request.json") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="module")
+def test_client():
+    return TestClient(app)
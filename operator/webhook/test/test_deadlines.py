@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from webhook import config as cfg
+from webhook import deadlines
+from webhook import metrics
+from webhook.addons.certmanager.main import sync_certificate
+from webhook.app import app
+from webhook.executor import SyncExecutor
+
+CERT_REQUEST = {"object": {"metadata": {"name": "route", "namespace": "default"}}}
+
+
+@pytest.fixture
+def expired_deadline():
+    token = deadlines.set_deadline(0, elapsed=1)
+    yield
+    deadlines.reset_deadline(token)
+
+
+def test_check_without_deadline():
+    deadlines.check("sync")
+
+    assert deadlines.remaining() is None
+
+
+def test_check_before_deadline():
+    token = deadlines.set_deadline(60)
+    try:
+        deadlines.check("sync")
+        assert 0 < deadlines.remaining() <= 60
+    finally:
+        deadlines.reset_deadline(token)
+
+
+def test_check_after_deadline(expired_deadline):
+    abandoned = metrics.ABANDONED_REQUESTS.labels("", "generate")
+    abandoned_before = abandoned.value()
+
+    with pytest.raises(deadlines.DeadlineExceeded):
+        deadlines.check("generate")
+
+    assert abandoned.value() == abandoned_before + 1
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_executor_abandons_sync_after_deadline(expired_deadline, mode):
+    executor = SyncExecutor(mode=mode, workers=1, max_pending=1)
+
+    try:
+        with pytest.raises(deadlines.DeadlineExceeded):
+            asyncio.run(executor.run(sync_certificate, CERT_REQUEST))
+    finally:
+        executor.shutdown()
+
+    assert executor.pending == 0
+
+
+def test_sync_endpoint_abandons_request_after_deadline(monkeypatch):
+    monkeypatch.setattr(cfg, "SYNC_DEADLINE_SECONDS", 1e-9)
+    abandoned = metrics.ABANDONED_REQUESTS.labels("/addons/certmanager/sync", "sync")
+    abandoned_before = abandoned.value()
+
+    response = TestClient(app).post("/addons/certmanager/sync", json=CERT_REQUEST)
+
+    assert response.status_code == 504
+    assert abandoned.value() == abandoned_before + 1
+
+
+@pytest.mark.parametrize(
+    "header,status_code", [("1e-9", 504), ("60", 200), ("invalid", 200)]
+)
+def test_sync_endpoint_deadline_header(header, status_code):
+    response = TestClient(app).post(
+        "/addons/certmanager/sync",
+        json=CERT_REQUEST,
+        headers={cfg.SYNC_DEADLINE_HEADER: header},
+    )
+
+    assert response.status_code == status_code
+
+
+def test_batch_endpoint_abandons_items_after_deadline(monkeypatch):
+    monkeypatch.setattr(cfg, "SYNC_DEADLINE_SECONDS", 1e-9)
+    abandoned = metrics.ABANDONED_REQUESTS.labels(
+        "/addons/certmanager/sync/batch", "sync"
+    )
+    abandoned_before = abandoned.value()
+
+    response = TestClient(app).post(
+        "/addons/certmanager/sync/batch", json=[CERT_REQUEST, CERT_REQUEST]
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [{"error": "Deadline exceeded before the sync phase"}] * 2
+    assert abandoned.value() == abandoned_before + 2
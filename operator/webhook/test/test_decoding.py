@@ -0,0 +1,106 @@
+import os
+from json import JSONDecodeError
+
+import pytest
+
+from webhook.addons.certmanager.main import (
+    REQUEST_SHAPE as CERTIFICATE_REQUEST_SHAPE,
+    sync_certificate,
+)
+from webhook.core.sync import REQUEST_SHAPE, sync
+from webhook.decoding import (
+    ANY,
+    EACH,
+    FullDecoder,
+    SelectiveDecoder,
+    get_decoder,
+    msgspec_installed,
+)
+from webhook.encoding import dumps
+from webhook.test.load_test.synthetic import sync_request_with_managed_fields
+from webhook.test.test_webapp import load_json_as_dict
+
+JSON_DIR = f"{os.path.dirname(os.path.abspath(__file__))}/json"
+
+pytestmark = pytest.mark.skipif(
+    not msgspec_installed(), reason="Selective decoding requires msgspec"
+)
+
+
+def test_selective_decoder_keeps_only_shaped_fields():
+    decoder = SelectiveDecoder({"a": {"b": ANY}, "c": {EACH: {"d": ANY}}})
+
+    body = decoder.loads(
+        dumps(
+            {
+                "a": {"b": [1, {"x": 2}], "skipped": 1},
+                "c": {"one": {"d": 1, "e": 2}, "two": {}},
+                "skipped": {"f": 3},
+            }
+        )
+    )
+
+    assert body == {"a": {"b": [1, {"x": 2}]}, "c": {"one": {"d": 1}, "two": {}}}
+
+
+def test_selective_decoder_skips_managed_fields():
+    request = sync_request_with_managed_fields(
+        load_json_as_dict(f"{JSON_DIR}/../../core/test/json/full-iroute-request.json"),
+        10,
+    )
+
+    body = SelectiveDecoder(REQUEST_SHAPE).loads(dumps(request))
+
+    assert "managedFields" not in body["parent"]["metadata"]
+    assert body["children"]["Deployment.apps/v1"]
+    for deployment in body["children"]["Deployment.apps/v1"].values():
+        assert deployment.keys() <= {"metadata", "spec", "status"}
+        assert deployment.get("metadata", {}).keys() <= {"generation"}
+
+
+@pytest.mark.parametrize(
+    "sync_func, shape, request_file",
+    [
+        (sync, REQUEST_SHAPE, "full-route-request.json"),
+        (sync_certificate, CERTIFICATE_REQUEST_SHAPE, "full-cert-request.json"),
+    ],
+)
+def test_selective_decode_sync_output_unchanged(sync_func, shape, request_file):
+    request = load_json_as_dict(f"{JSON_DIR}/{request_file}")
+    raw_body = dumps(sync_request_with_managed_fields(request, 5))
+
+    selective = sync_func(SelectiveDecoder(shape).loads(raw_body))
+    full = sync_func(FullDecoder().loads(raw_body))
+
+    assert dumps(selective) == dumps(full)
+
+
+@pytest.mark.parametrize("raw_body", [b"{", b"[]", b'{"parent": []}'])
+def test_selective_decoder_invalid_body_raises_decode_error(raw_body):
+    with pytest.raises(JSONDecodeError):
+        SelectiveDecoder(REQUEST_SHAPE).loads(raw_body)
+
+
+def test_selective_decoder_batch_items_decoded_separately():
+    decoder = SelectiveDecoder({"a": ANY})
+
+    items = decoder.split_batch(b'[{"a": 1, "b": 2}, "not-an-object"]')
+
+    assert decoder.decode_item(items[0]) == {"a": 1}
+    with pytest.raises(JSONDecodeError):
+        decoder.decode_item(items[1])
+
+
+@pytest.mark.parametrize("raw_body, expected", [(b"{}", {}), (b"null", None)])
+def test_selective_decoder_batch_not_array_returned_decoded(raw_body, expected):
+    assert SelectiveDecoder({"a": ANY}).split_batch(raw_body) == expected
+
+
+def test_selective_decoder_batch_invalid_json_raises_decode_error():
+    with pytest.raises(JSONDecodeError):
+        SelectiveDecoder({"a": ANY}).split_batch(b"[{")
+
+
+def test_get_decoder_disabled_returns_full_decoder():
+    assert type(get_decoder(REQUEST_SHAPE, selective=False)) is FullDecoder
+    assert type(get_decoder(REQUEST_SHAPE)) is SelectiveDecoder
@@ -0,0 +1,109 @@
+import json
+import os
+from json import JSONDecodeError
+
+import pytest
+
+from webhook.core.sync import sync
+from webhook.encoding import (
+    PreEncodedList,
+    dumps,
+    encode_response,
+    get_codec,
+    installed_codecs,
+)
+from webhook.test.test_webapp import load_json_as_dict
+
+JSON_DIR = f"{os.path.dirname(os.path.abspath(__file__))}/json"
+
+JSON_FIXTURES = [
+    "full-route-request.json",
+    "full-route-response.json",
+    "full-cert-request.json",
+    "full-cert-response.json",
+]
+
+INSTALLED_CODECS = installed_codecs()
+
+
+def test_dumps_matches_compact_stdlib_encoding():
+    obj = {"name": "résumé", "items": [1, 2.5, None, True]}
+
+    assert dumps(obj) == json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def test_pre_encoded_list_behaves_as_list():
+    items = PreEncodedList([{"a": 1}, {"b": 2}])
+
+    assert items == [{"a": 1}, {"b": 2}]
+    assert json.loads(items.encoded()) == items
+
+
+def test_pre_encoded_list_encodes_once():
+    items = PreEncodedList([{"a": 1}])
+    encoded = items.encoded()
+    items.append({"b": 2})
+
+    assert items.encoded() is encoded
+
+
+def test_encode_response_splices_pre_encoded_fragment():
+    children = PreEncodedList([{"kind": "Service"}])
+    children._encoded = b'[{"kind":"Cached"}]'
+
+    encoded = encode_response({"status": {"ready": True}, "children": children})
+
+    assert encoded == b'{"status":{"ready":true},"children":[{"kind":"Cached"}]}'
+
+
+def test_encode_response_identical_to_plain_encoding():
+    request = load_json_as_dict(f"{JSON_DIR}/full-route-request.json")
+    response = sync(request)
+
+    assert isinstance(response["children"], PreEncodedList)
+    assert encode_response(response) == dumps(
+        {"status": response["status"], "children": list(response["children"])}
+    )
+
+
+@pytest.mark.parametrize("codec_name", INSTALLED_CODECS)
+@pytest.mark.parametrize("fixture", JSON_FIXTURES)
+def test_codec_output_identical_to_stdlib(codec_name, fixture):
+    with open(f"{JSON_DIR}/{fixture}", "rb") as f:
+        raw = f.read()
+    stdlib = get_codec("stdlib")
+    codec = get_codec(codec_name)
+
+    obj = codec.loads(raw)
+
+    assert obj == stdlib.loads(raw)
+    assert codec.dumps(obj) == stdlib.dumps(obj)
+
+
+@pytest.mark.parametrize("codec_name", INSTALLED_CODECS)
+def test_codec_encodes_pre_encoded_list(codec_name):
+    codec = get_codec(codec_name)
+
+    assert (
+        codec.dumps({"children": PreEncodedList([{"a": 1}])})
+        == b'{"children":[{"a":1}]}'
+    )
+
+
+@pytest.mark.parametrize("codec_name", INSTALLED_CODECS)
+def test_codec_decode_error_is_json_decode_error(codec_name):
+    with pytest.raises(JSONDecodeError):
+        get_codec(codec_name).loads(b"{not json")
+
+
+def test_auto_codec_prefers_installed_fast_codec():
+    expected = next(n for n in ("orjson", "msgspec", "stdlib") if n in INSTALLED_CODECS)
+
+    assert get_codec("auto").name == expected
+
+
+def test_unknown_codec_raises_error():
+    with pytest.raises(ValueError):
+        get_codec("simplejson")
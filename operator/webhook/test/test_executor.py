@@ -0,0 +1,89 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+import webhook.app
+from webhook.addons.certmanager.main import sync_certificate
+from webhook.executor import ExecutorSaturated, SyncExecutor
+
+_request_var = contextvars.ContextVar("request_var", default=None)
+
+CERT_REQUEST = {"object": {"metadata": {"name": "route", "namespace": "default"}}}
+
+
+def echo_context(body):
+    return {"body": body, "context": _request_var.get()}
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_executor_runs_sync_function(mode):
+    executor = SyncExecutor(mode=mode, workers=1, max_pending=1)
+
+    try:
+        response = asyncio.run(executor.run(sync_certificate, CERT_REQUEST))
+    finally:
+        executor.shutdown()
+
+    assert response == {"attachments": []}
+    assert executor.pending == 0
+
+
+def test_thread_executor_propagates_context():
+    executor = SyncExecutor(mode="thread", workers=1, max_pending=1)
+
+    async def run():
+        _request_var.set("ctx")
+        return await executor.run(echo_context, {"a": 1})
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert response == {"body": {"a": 1}, "context": "ctx"}
+
+
+def test_executor_rejects_when_saturated():
+    executor = SyncExecutor(mode="thread", workers=1, max_pending=1)
+    release = threading.Event()
+
+    def blocking_sync(body):
+        release.wait(timeout=5)
+        return body
+
+    async def run():
+        first = asyncio.create_task(executor.run(blocking_sync, {}))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(blocking_sync, {})
+        release.set()
+        return await first
+
+    try:
+        assert asyncio.run(run()) == {}
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "mode, workers", [("fibers", 1), ("thread", 0), ("process", -1)]
+)
+def test_executor_invalid_config_raises_error(mode, workers):
+    with pytest.raises(ValueError):
+        SyncExecutor(mode=mode, workers=workers)
+
+
+def test_saturated_webhook_returns_503_with_retry_after(monkeypatch):
+    class SaturatedExecutor:
+        async def run(self, sync_func, body):
+            raise ExecutorSaturated("full")
+
+    monkeypatch.setattr(webhook.app, "_SYNC_EXECUTOR", SaturatedExecutor())
+
+    response = TestClient(webhook.app.app).post("/sync", json={"parent": {}})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+from webhook import metrics
+from webhook.app import app
+
+
+def test_counter_sums_increments_from_all_threads(registry):
+    counter = metrics.Counter("test_total", "Test counter", registry=registry)
+
+    def increment():
+        for _ in range(10000):
+            counter.inc()
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counter.labels().value() == 40000
+
+
+def test_gauge_inc_and_dec(registry):
+    gauge = metrics.Gauge("test_gauge", "Test gauge", ["route"], registry=registry)
+
+    gauge.labels("/sync").inc()
+    gauge.labels("/sync").inc()
+    gauge.labels("/sync").dec()
+
+    assert gauge.labels("/sync").value() == 1
+
+
+def test_render_counter_with_labels(registry):
+    counter = metrics.Counter(
+        "test_total", "Test counter", ["route", "code"], registry=registry
+    )
+    counter.labels("/sync", "200").inc(3)
+
+    assert metrics.render(registry).decode() == (
+        "# HELP test_total Test counter\n"
+        "# TYPE test_total counter\n"
+        'test_total{route="/sync",code="200"} 3\n'
+    )
+
+
+def test_render_histogram_buckets_are_cumulative(registry):
+    histogram = metrics.Histogram(
+        "test_seconds", "Test histogram", buckets=(0.1, 1), registry=registry
+    )
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = metrics.render(registry).decode().splitlines()
+
+    assert lines[2:] == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1.0"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 5.65",
+        "test_seconds_count 4",
+    ]
+
+
+def test_render_escapes_label_values(registry):
+    counter = metrics.Counter("test_total", "Test counter", ["name"], registry=registry)
+    counter.labels('a"b\\c\n').inc()
+
+    assert 'test_total{name="a\\"b\\\\c\\n"} 1' in metrics.render(registry).decode()
+
+
+def test_metrics_endpoint_reports_requests_and_errors():
+    client = TestClient(app)
+    client.post("/addons/certmanager/sync", content=b"{")
+    client.post("/addons/certmanager/sync", json={})
+
+    response = client.get("/metrics")
+    text = response.text
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'webhook_request_errors_total{route="/addons/certmanager/sync",cause="JSONDecodeError"}'
+        in text
+    )
+    assert (
+        'webhook_request_errors_total{route="/addons/certmanager/sync",cause="KeyError"}'
+        in text
+    )
+    assert 'webhook_requests_total{route="/addons/certmanager/sync",code="400"}' in text
+    assert (
+        'webhook_phase_duration_seconds_count{route="/addons/certmanager/sync",phase="decode"}'
+        in text
+    )
+    assert "webhook_sync_children_cache_hits_total" in text
+
+
+def test_labeled_metric_requires_new_child(registry):
+    class Incomplete(metrics._LabeledMetric):
+        metric_type = "gauge"
+
+    with pytest.raises(TypeError, match="_new_child"):
+        Incomplete("test_incomplete", "Incomplete metric", registry=registry)
+
+
+@pytest.fixture()
+def registry():
+    return []
@@ -0,0 +1,56 @@
+import logging
+
+import pytest
+
+from webhook.payload_log import LazyPayload, PayloadLogger
+
+LOGGER_NAME = "webhook.test.payload"
+
+
+class ExplodingPayload(dict):
+    def __iter__(self):
+        raise AssertionError("payload should not be serialized")
+
+
+def test_payload_not_serialized_when_debug_disabled(caplog):
+    caplog.set_level(logging.INFO, logger=LOGGER_NAME)
+    payload_logger = PayloadLogger(logging.getLogger(LOGGER_NAME))
+
+    payload_logger.log("Webhook request", ExplodingPayload(a=1))
+
+    assert caplog.records == []
+
+
+def test_payload_logged_when_debug_enabled(caplog):
+    caplog.set_level(logging.DEBUG, logger=LOGGER_NAME)
+    payload_logger = PayloadLogger(logging.getLogger(LOGGER_NAME))
+
+    payload_logger.log("Webhook request", {"a": 1})
+
+    assert caplog.messages == ['Webhook request:\n {"a":1}']
+
+
+def test_payload_sampled_out(caplog, monkeypatch):
+    caplog.set_level(logging.DEBUG, logger=LOGGER_NAME)
+    monkeypatch.setattr("webhook.payload_log.random.random", lambda: 0.5)
+
+    PayloadLogger(logging.getLogger(LOGGER_NAME), sample_rate=0.25).log("req", b"{}")
+    PayloadLogger(logging.getLogger(LOGGER_NAME), sample_rate=0.75).log("res", b"{}")
+
+    assert caplog.messages == ["res:\n {}"]
+
+
+@pytest.mark.parametrize(
+    "max_bytes, expected",
+    [
+        (0, '{"key":"value"}'),
+        (20, '{"key":"value"}'),
+        (6, '{"key"... (9 bytes truncated)'),
+    ],
+)
+def test_lazy_payload_truncation(max_bytes, expected):
+    assert str(LazyPayload({"key": "value"}, max_bytes)) == expected
+
+
+def test_lazy_payload_bytes_not_reencoded():
+    assert str(LazyPayload(b'{"a": 1}')) == '{"a": 1}'
@@ -0,0 +1,114 @@
+import json
+import os
+import pstats
+
+import pytest
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from webhook import profiling
+from webhook.core.sync import _children_cache, _steady_state_index, sync
+from webhook.test.test_webapp import load_json_as_dict
+
+JSON_DIR = f"{os.path.dirname(os.path.abspath(__file__))}/json"
+
+
+def test_span_not_recorded_without_capture():
+    calls = []
+
+    @profiling.span
+    def traced(x):
+        calls.append(x)
+        return x * 2
+
+    assert traced(2) == 4
+    assert calls == [2]
+
+
+def test_capture_profiles_next_matching_requests(output_dir):
+    route_request = load_json_as_dict(f"{JSON_DIR}/full-route-request.json")
+    other_request = {"object": {"metadata": {"name": "other"}}}
+    profiled_sync = profiling.Profiled(sync)
+    profiled_other = profiling.Profiled(lambda body: {})
+
+    capture = profiling.arm(2, name="testroute")
+    profiled_other(other_request)
+    profiled_sync(route_request)
+    assert capture.remaining == 1
+    assert capture.files == []
+
+    profiled_sync(route_request)
+
+    assert capture.remaining == 0
+    assert sorted(os.listdir(output_dir)) == [
+        f"{capture.id}.prof",
+        f"{capture.id}.speedscope.json",
+    ]
+
+    stats = pstats.Stats(os.path.join(output_dir, f"{capture.id}.prof"))
+    assert any(func[2] == "_compute_status" for func in stats.stats)
+
+    with open(os.path.join(output_dir, f"{capture.id}.speedscope.json")) as f:
+        speedscope = json.load(f)
+    frame_names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+    assert len(speedscope["profiles"]) == 2
+    assert {
+        "sync",
+        "_compute_status",
+        "_create_pod_template",
+        "VolumeConfig.get_volumes",
+        "VolumeConfig.get_mounts",
+    } <= frame_names
+
+
+def test_arm_while_capture_in_progress_raises_error(output_dir):
+    profiling.arm(1)
+
+    with pytest.raises(RuntimeError):
+        profiling.arm(1)
+
+
+def test_profile_endpoints(output_dir):
+    client = TestClient(Starlette(routes=profiling.routes))
+
+    assert client.get("/debug/profile").status_code == 404
+
+    response = client.post("/debug/profile", params={"requests": 1})
+    assert response.status_code == 202
+    assert client.post("/debug/profile").status_code == 409
+
+    profiling.Profiled(sync)(load_json_as_dict(f"{JSON_DIR}/full-route-request.json"))
+
+    status = client.get("/debug/profile").json()
+    assert status["remaining"] == 0
+    assert len(status["files"]) == 2
+
+    download = client.get(f"/debug/profile/{status['files'][1]}")
+    assert download.status_code == 200
+    assert "profiles" in download.json()
+
+
+@pytest.mark.parametrize("requests", ["0", "abc"])
+def test_profile_endpoint_invalid_request_count(output_dir, requests):
+    client = TestClient(Starlette(routes=profiling.routes))
+
+    response = client.post("/debug/profile", params={"requests": requests})
+
+    assert response.status_code == 400
+
+
+def test_profile_download_outside_output_dir_not_found(output_dir):
+    client = TestClient(Starlette(routes=profiling.routes))
+
+    assert client.get("/debug/profile/..%2Fsecret").status_code == 404
+
+
+@pytest.fixture()
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling.cfg, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_armed", None)
+    monkeypatch.setattr(profiling, "_last", None)
+    # Make sure the desired state is generated so its spans are recorded
+    _children_cache.clear()
+    _steady_state_index.clear()
+    return tmp_path
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from webhook import readiness
+from webhook.test.load_test.replay import (
+    CERTIFICATE_SYNC_PATH,
+    SYNC_PATH,
+    InProcessTransport,
+    MetacontrollerStandIn,
+    _descendants,
+    _rss_mb,
+    replay,
+)
+from webhook.test.load_test.synthetic import synthetic_cluster
+
+
+async def replay_in_process(stand_in: MetacontrollerStandIn, rounds: int) -> dict:
+    async with InProcessTransport() as transport:
+        return await replay(transport, stand_in, rounds, concurrency=4)
+
+
+def test_synthetic_cluster_is_deterministic():
+    assert synthetic_cluster(20, seed=1) == synthetic_cluster(20, seed=1)
+    assert synthetic_cluster(20, seed=1) != synthetic_cluster(20, seed=2)
+
+
+def test_replay_brings_routes_to_ready(monkeypatch):
+    # The lifespan marks the worker warm
+    monkeypatch.setattr(readiness, "_worker_flags", [0])
+    stand_in = MetacontrollerStandIn(synthetic_cluster(20), change_rate=0, seed=0)
+
+    # The Deployment is created in the first round, and brings up one replica (of at most 3) per round
+    result = asyncio.run(replay_in_process(stand_in, rounds=4))
+
+    assert result["status_codes"] == {"200": result["requests"]}
+    assert result["ready_routes"] == 20
+    assert set(result["latency"]) == {"all", SYNC_PATH, CERTIFICATE_SYNC_PATH}
+    assert result["rss_mb"] > 0
+
+
+def test_status_written_back_bumps_resource_version():
+    stand_in = MetacontrollerStandIn(synthetic_cluster(1), change_rate=0, seed=0)
+    route = stand_in.routes[0]
+    resource_version = int(route["metadata"]["resourceVersion"])
+    request = {"parent": route}
+    response = {"status": {"readyReplicas": 0}, "children": [{"kind": "Deployment"}]}
+
+    stand_in.apply(SYNC_PATH, request, response)
+    stand_in.apply(SYNC_PATH, request, response)
+
+    assert route["status"] == {"readyReplicas": 0}
+    assert int(route["metadata"]["resourceVersion"]) == resource_version + 1
+    assert stand_in.deployments[route["metadata"]["name"]]["readyReplicas"] == 0
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="requires /proc")
+def test_rss_includes_child_processes():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        assert child.pid in _descendants(os.getpid())
+        assert (
+            _rss_mb([os.getpid(), child.pid])["rss_mb"]
+            > _rss_mb([os.getpid()])["rss_mb"]
+        )
+    finally:
+        child.kill()
+        child.wait()
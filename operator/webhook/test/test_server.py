@@ -0,0 +1,149 @@
+import signal
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from webhook import readiness
+from webhook.app import app
+import webhook.server
+from webhook.server import (
+    DrainingServer,
+    bind_socket,
+    uvicorn_config,
+    validate_server_settings,
+)
+
+
+def test_ready_endpoint_not_ready_before_warm_up():
+    response = TestClient(app).get("/ready")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "NOT_READY"}
+
+
+def test_ready_endpoint_ready_after_warm_up():
+    with TestClient(app) as client:
+        response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "READY"}
+
+
+def test_readiness_waits_for_all_workers():
+    worker_flags = [0, 0]
+    readiness.configure_worker(worker_flags, [0], index=1)
+
+    readiness.mark_warm()
+    assert not readiness.is_ready()
+
+    worker_flags[0] = 1
+    assert readiness.is_ready()
+
+
+def test_readiness_not_ready_when_draining():
+    draining = [0]
+    readiness.configure_worker([1], draining, index=0)
+    assert readiness.is_ready()
+
+    draining[0] = 1
+
+    assert not readiness.is_ready()
+
+
+def test_workers_can_bind_same_port():
+    first = bind_socket("127.0.0.1", 0)
+    port = first.getsockname()[1]
+
+    second = bind_socket("127.0.0.1", port)
+
+    try:
+        assert second.getsockname()[1] == port
+    finally:
+        first.close()
+        second.close()
+
+
+def test_single_worker_drains_before_shutdown(monkeypatch):
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_DRAIN_SECONDS", 0.2)
+    server = DrainingServer(uvicorn_config())
+    readiness.mark_warm()
+    assert readiness.is_ready()
+
+    server.handle_exit(signal.SIGTERM, None)
+
+    assert not readiness.is_ready()
+    assert not server.should_exit
+    time.sleep(0.4)
+    assert server.should_exit
+
+
+def test_single_worker_second_signal_shuts_down_at_once(monkeypatch):
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_DRAIN_SECONDS", 30)
+    server = DrainingServer(uvicorn_config())
+
+    server.handle_exit(signal.SIGTERM, None)
+    server.handle_exit(signal.SIGTERM, None)
+
+    assert server.should_exit
+
+
+def test_multiple_workers_require_reuse_port(monkeypatch):
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_WORKERS", 2)
+    monkeypatch.delattr(webhook.server.socket, "SO_REUSEPORT")
+
+    with pytest.raises(ValueError, match="SO_REUSEPORT"):
+        validate_server_settings()
+
+
+def test_uvicorn_config_applies_server_settings(monkeypatch):
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_BACKLOG", 128)
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_LIMIT_CONCURRENCY", 32)
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_KEEP_ALIVE_SECONDS", 75)
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_HTTP", "h11")
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_LOOP", "asyncio")
+
+    config = uvicorn_config()
+
+    assert config.backlog == 128
+    assert config.limit_concurrency == 32
+    assert config.timeout_keep_alive == 75
+    assert config.http == "h11"
+    assert config.loop == "asyncio"
+
+
+def test_uvicorn_config_no_concurrency_limit_by_default():
+    assert uvicorn_config().limit_concurrency is None
+
+
+@pytest.mark.parametrize(
+    "setting, value",
+    [
+        ("SERVER_WORKERS", 0),
+        ("SERVER_BACKLOG", 0),
+        ("SERVER_LIMIT_CONCURRENCY", -1),
+        ("SERVER_KEEP_ALIVE_SECONDS", -1),
+        ("SERVER_HTTP", "h2"),
+        ("SERVER_LOOP", "trio"),
+    ],
+)
+def test_invalid_server_settings_raise_error(monkeypatch, setting, value):
+    monkeypatch.setattr(webhook.server.cfg, setting, value)
+
+    with pytest.raises(ValueError, match=setting):
+        validate_server_settings()
+
+
+def test_server_implementation_not_installed_raises_error(monkeypatch):
+    monkeypatch.setattr(webhook.server.cfg, "SERVER_LOOP", "uvloop")
+    monkeypatch.setitem(webhook.server.LOOP_IMPLEMENTATIONS, "uvloop", "not_a_package")
+
+    with pytest.raises(ValueError, match="requires not_a_package"):
+        validate_server_settings()
+
+
+@pytest.fixture(autouse=True)
+def reset_readiness():
+    readiness.configure_worker([0], None, index=0)
+    yield
+    readiness.configure_worker([0], None, index=0)
@@ -5,6 +5,7 @@ from typing import Mapping
 import pytest
 from starlette.testclient import TestClient
 
+import webhook.app
 from webhook.app import app
 
 
@@ -69,6 +70,87 @@ def test_sync_endpoint_empty_body(test_client, endpoint, status_code):
     assert response.status_code == status_code
 
 
+@pytest.mark.parametrize(
+    "endpoint, request_file, response_file",
+    [
+        ("/sync/batch", "full-route-request.json", "full-route-response.json"),
+        (
+            "/addons/certmanager/sync/batch",
+            "full-cert-request.json",
+            "full-cert-response.json",
+        ),
+    ],
+)
+def test_batch_sync_endpoint_success(
+    test_client, endpoint, request_file, response_file
+):
+    json_dir = f"{os.path.dirname(os.path.abspath(__file__))}/json"
+    request = load_json_as_dict(f"{json_dir}/{request_file}")
+    expected = load_json_as_dict(f"{json_dir}/{response_file}")
+
+    response = test_client.post(endpoint, json=[request, request])
+
+    assert response.status_code == 200
+    assert response.json() == [expected, expected]
+
+
+def test_batch_sync_endpoint_isolates_item_errors(test_client):
+    request = load_json_as_dict(
+        f"{os.path.dirname(os.path.abspath(__file__))}/json/full-route-request.json"
+    )
+
+    response = test_client.post("/sync/batch", json=[{}, request, "not-an-object"])
+    items = response.json()
+
+    assert response.status_code == 200
+    assert len(items) == 3
+    assert items[0] == {"error": "Missing field from request: KeyError('parent')"}
+    assert "children" in items[1]
+    assert "error" in items[2]
+
+
+def test_batch_sync_endpoint_empty_batch(test_client):
+    response = test_client.post("/sync/batch", json=[])
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.mark.parametrize("endpoint", ["/sync/batch", "/addons/certmanager/sync/batch"])
+def test_batch_sync_endpoint_invalid_json(test_client, endpoint):
+    response = test_client.post(endpoint, content=b"[{")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("body", [{}, None])
+def test_batch_sync_endpoint_body_not_array(test_client, body):
+    response = test_client.post("/sync/batch", json=body)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("endpoint", ["/sync", "/sync/batch"])
+def test_sync_endpoint_body_too_large(monkeypatch, test_client, endpoint):
+    monkeypatch.setattr(webhook.app.cfg, "REQUEST_MAX_BYTES", 10)
+
+    response = test_client.post(endpoint, content=b"[" + b" " * 10 + b"]")
+
+    assert response.status_code == 413
+
+
+def test_sync_endpoint_streamed_body_too_large(monkeypatch, test_client):
+    monkeypatch.setattr(webhook.app.cfg, "REQUEST_MAX_BYTES", 10)
+
+    def chunks():
+        for _ in range(5):
+            yield b"     "
+
+    response = test_client.post("/sync", content=chunks())
+
+    assert response.status_code == 413
+
+
 def load_json_as_dict(filepath: str) -> Mapping:
     with open(filepath, "r") as f:
         return json.load(f)